@@ -0,0 +1,390 @@
+# STDLIB
+import argparse
+import datetime
+import inspect
+import json
+import os
+import pathlib
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# run from the repository, without installing
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+# PROJ
+import lib_path                         # noqa: E402
+from lib_path import lib_path as lib_path_module   # noqa: E402
+
+# offline benchmark suite for every public function of lib_path.lib_path and the startup of lib_path_cli.
+# synthetic trees and path corpora are generated in a temporary directory, the results are written as json,
+# and can be compared against the json of an earlier run to find regressions.
+#
+# usage:
+#   python benchmarks/benchmark_lib_path.py --output results.json
+#   python benchmarks/benchmark_lib_path.py --output new.json --compare results.json --threshold 1.2
+
+CORPUS_KINDS = ('posix', 'drive', 'unc')
+TREE_KINDS = ('flat', 'deep', 'wide', 'symlinks', 'test_a')
+
+
+class BenchmarkResult(NamedTuple):
+    name: str
+    n_calls: int
+    best_s: float           # best time per call of all repeats
+    median_s: float         # median time per call of all repeats
+    skipped: Optional[str] = None
+
+
+class BenchmarkContext(NamedTuple):
+    path_root: pathlib.Path
+    d_trees: Dict[str, pathlib.Path]
+    d_corpora: Dict[str, List[str]]
+
+
+# Benchmark: name, function under test, factory (context -> (callable to time, number of calls in one run of the callable))
+Benchmark = Tuple[str, str, Callable[[BenchmarkContext], Tuple[Callable[[], Any], int]]]
+
+
+def generate_path_corpus(kind: str, n_paths: int, seed: int = 42) -> List[str]:
+    """
+    generates reproducible synthetic paths - kind is 'posix', 'drive' (windows drive letter) or 'unc'.
+    some paths have a leading blank, like paths read from inventories often have
+
+    >>> generate_path_corpus('posix', 2, seed=1) == generate_path_corpus('posix', 2, seed=1)
+    True
+    >>> all(path.lstrip().startswith('/') for path in generate_path_corpus('posix', 10))
+    True
+    >>> all(path.lstrip()[1:3] == ':\\\\' for path in generate_path_corpus('drive', 10))
+    True
+    >>> all(path.lstrip().startswith('\\\\\\\\') for path in generate_path_corpus('unc', 10))
+    True
+    """
+    rnd = random.Random(f'{kind}-{seed}')
+    l_names = ['data', 'spool', 'archive', 'Program Files', 'users', 'tmp', 'a.b', '..', '.', 'x' * 20, 'projekt', 'install']
+    l_paths = []
+    for _ in range(n_paths):
+        l_parts = [rnd.choice(l_names) for _ in range(rnd.randint(1, 8))]
+        if kind == 'posix':
+            path = '/' + '/'.join(l_parts) + rnd.choice(['', '/', '//'])
+        elif kind == 'drive':
+            path = rnd.choice('cdez') + ':\\' + '\\'.join(l_parts) + rnd.choice(['', '\\'])
+        elif kind == 'unc':
+            path = '\\\\' + rnd.choice(['main', 'srv01', 'nas']) + '\\' + '\\'.join(l_parts)
+        else:
+            raise ValueError(f'kind must be one of {CORPUS_KINDS}, got "{kind}"')
+        l_paths.append(rnd.choice(['', ' ']) + path)
+    return l_paths
+
+
+def generate_tree(path_root: pathlib.Path, kind: str, scale: int) -> pathlib.Path:
+    """
+    generates a synthetic directory tree below path_root and returns its top directory.
+    kind: 'flat' (many files in one directory), 'deep' (a long directory chain), 'wide' (many directories with few files),
+          'symlinks' (many symlinks to files and directories), 'test_a' (like tests/test_a, with hidden files and directories, repeated)
+
+    >>> # Setup
+    >>> path_temp_dir = pathlib.Path(tempfile.mkdtemp())
+
+    >>> # Test
+    >>> path_tree = generate_tree(path_temp_dir, 'test_a', scale=1)
+    >>> sorted(path.name for path in path_tree.iterdir())
+    ['test_a_0']
+    >>> len(list(path_tree.rglob('*')))
+    25
+
+    >>> # Teardown
+    >>> shutil.rmtree(path_temp_dir)
+
+    """
+    path_tree = path_root / kind
+    path_tree.mkdir(parents=True)
+    if kind == 'flat':
+        for n_file in range(scale * 1000):
+            (path_tree / f'file_{n_file:06d}.txt').touch()
+    elif kind == 'deep':
+        path_current = path_tree
+        for n_depth in range(scale * 50):
+            path_current = path_current / f'level_{n_depth:04d}'
+        path_current.mkdir(parents=True)
+        (path_current / 'leaf.txt').touch()
+    elif kind == 'wide':
+        for n_dir in range(scale * 200):
+            path_dir = path_tree / f'dir_{n_dir:05d}'
+            path_dir.mkdir()
+            for n_file in range(3):
+                (path_dir / f'file_{n_file}.txt').touch()
+    elif kind == 'symlinks':
+        path_targets = path_tree / 'targets'
+        (path_targets / 'sub').mkdir(parents=True)
+        (path_targets / 'file.txt').touch()
+        for n_link in range(scale * 200):
+            target = 'targets/sub' if n_link % 2 else 'targets/file.txt'
+            os.symlink(target, str(path_tree / f'link_{n_link:05d}'))
+    elif kind == 'test_a':
+        for n_copy in range(scale):
+            path_copy = path_tree / f'test_a_{n_copy}'
+            for dir_name in ('', 'test_a_a', 'test_a_b', '.test_a_a', '.test_a_b'):
+                path_dir = path_copy / dir_name if dir_name else path_copy
+                path_dir.mkdir(parents=True, exist_ok=True)
+                stem = dir_name.lstrip('.') or 'test_a'
+                for prefix in ('', '.'):
+                    for n_file in (1, 2):
+                        (path_dir / f'{prefix}file_{stem}_{n_file}.txt').touch()
+    else:
+        raise ValueError(f'kind must be one of {TREE_KINDS}, got "{kind}"')
+    return path_tree
+
+
+def create_context(path_root: pathlib.Path, scale: int, n_paths: int) -> BenchmarkContext:
+    d_trees = {kind: generate_tree(path_root, kind, scale) for kind in TREE_KINDS}
+    d_corpora = {kind: generate_path_corpus(kind, n_paths) for kind in CORPUS_KINDS}
+    return BenchmarkContext(path_root=path_root, d_trees=d_trees, d_corpora=d_corpora)
+
+
+def _corpus_benchmark(function: Callable[..., Any], kind: str, *args: Any) -> Callable[[BenchmarkContext], Tuple[Callable[[], Any], int]]:
+    def factory(context: BenchmarkContext) -> Tuple[Callable[[], Any], int]:
+        l_paths = context.d_corpora[kind]
+
+        def run() -> None:
+            for path in l_paths:
+                function(path, *args)
+        return run, len(l_paths)
+    return factory
+
+
+def _call_benchmark(get_call: Callable[[BenchmarkContext], Callable[[], Any]]) -> Callable[[BenchmarkContext], Tuple[Callable[[], Any], int]]:
+    def factory(context: BenchmarkContext) -> Tuple[Callable[[], Any], int]:
+        return get_call(context), 1
+    return factory
+
+
+def _get_current_dir_and_change_to_home() -> None:
+    path_cwd = pathlib.Path.cwd()
+    try:
+        lib_path_module.get_current_dir_and_change_to_home()
+    finally:
+        os.chdir(str(path_cwd))
+
+
+def _chdir(path_directory: pathlib.Path) -> None:
+    path_cwd = pathlib.Path.cwd()
+    try:
+        lib_path_module.chdir(path_directory)
+    finally:
+        os.chdir(str(path_cwd))
+
+
+def _ignore_errors(function: Callable[..., Any], *args: Any) -> Callable[[], None]:
+    def run() -> None:
+        try:
+            function(*args)
+        except OSError:
+            pass
+    return run
+
+
+def get_benchmarks() -> List[Benchmark]:
+    lp = lib_path_module
+    l_benchmarks: List[Benchmark] = []
+
+    # path string functions - one run processes the whole corpus
+    for kind in CORPUS_KINDS:
+        l_benchmarks.extend([
+            (f'path_join_posix[{kind}]', 'path_join_posix', _corpus_benchmark(lp.path_join_posix, kind, 'sub', '\\x\\y')),
+            (f'path_remove_trailing_slashes[{kind}]', 'path_remove_trailing_slashes', _corpus_benchmark(lp.path_remove_trailing_slashes, kind)),
+            (f'strip_and_replace_backslashes[{kind}]', 'strip_and_replace_backslashes', _corpus_benchmark(lp.strip_and_replace_backslashes, kind)),
+            (f'is_windows_network_unc[{kind}]', 'is_windows_network_unc', _corpus_benchmark(lp.is_windows_network_unc, kind)),
+            (f'substract_windows_drive_letter[{kind}]', 'substract_windows_drive_letter', _corpus_benchmark(lp.substract_windows_drive_letter, kind)),
+            (f'path_starts_with_windows_drive_letter[{kind}]', 'path_starts_with_windows_drive_letter',
+             _corpus_benchmark(lp.path_starts_with_windows_drive_letter, kind)),
+            (f'get_basename_without_extension[{kind}]', 'get_basename_without_extension',
+             _corpus_benchmark(lambda path: lp.get_basename_without_extension(pathlib.Path(path)), kind)),
+        ])
+
+    # directory functions - on every synthetic tree
+    for kind in TREE_KINDS:
+        l_benchmarks.extend([
+            (f'get_l_path_sub_directories[{kind}]', 'get_l_path_sub_directories',
+             _call_benchmark(lambda context, kind=kind: lambda: lp.get_l_path_sub_directories(context.d_trees[kind]))),  # type: ignore
+            (f'has_subdirs[{kind}]', 'has_subdirs',
+             _call_benchmark(lambda context, kind=kind: lambda: lp.has_subdirs(context.d_trees[kind]))),  # type: ignore
+            (f'is_directory_empty[{kind}]', 'is_directory_empty',
+             _call_benchmark(lambda context, kind=kind: lambda: lp.is_directory_empty(context.d_trees[kind]))),  # type: ignore
+        ])
+
+    l_benchmarks.extend([
+        ('log_and_raise_if_path_does_not_exist', 'log_and_raise_if_path_does_not_exist',
+         _call_benchmark(lambda context: lambda: lp.log_and_raise_if_path_does_not_exist(context.d_trees['flat']))),
+        ('log_and_raise_if_not_isdir', 'log_and_raise_if_not_isdir',
+         _call_benchmark(lambda context: lambda: lp.log_and_raise_if_not_isdir(context.d_trees['flat']))),
+        ('log_and_raise_if_not_isfile', 'log_and_raise_if_not_isfile',
+         _call_benchmark(lambda context: lambda: lp.log_and_raise_if_not_isfile(context.d_trees['flat'] / 'file_000000.txt'))),
+        ('is_target_directory_within_source_directory', 'is_target_directory_within_source_directory',
+         _call_benchmark(lambda context: lambda: lp.is_target_directory_within_source_directory(context.d_trees['wide'], context.d_trees['deep']))),
+        ('log_and_raise_if_target_directory_within_source_directory', 'log_and_raise_if_target_directory_within_source_directory',
+         _call_benchmark(lambda context: lambda: lp.log_and_raise_if_target_directory_within_source_directory(context.d_trees['wide'],
+                                                                                                              context.d_trees['deep']))),
+        ('get_current_dir', 'get_current_dir', _call_benchmark(lambda context: lp.get_current_dir)),
+        ('get_current_dir_and_change_to_home', 'get_current_dir_and_change_to_home', _call_benchmark(lambda context: _get_current_dir_and_change_to_home)),
+        ('chdir', 'chdir', _call_benchmark(lambda context: lambda: _chdir(context.d_trees['wide']))),
+        ('is_directory_writable', 'is_directory_writable', _call_benchmark(lambda context: lambda: lp.is_directory_writable(str(context.d_trees['flat'])))),
+        ('get_test_directory_path', 'get_test_directory_path', _call_benchmark(lambda context: lambda: lp.get_test_directory_path('lib_path'))),
+        ('make_test_directory_and_subdirs_fully_accessible_by_current_user[test_a]', 'make_test_directory_and_subdirs_fully_accessible_by_current_user',
+         _call_benchmark(lambda context: _ignore_errors(lp.make_test_directory_and_subdirs_fully_accessible_by_current_user, context.d_trees['test_a']))),
+        ('get_windows_system_drive_letter', 'get_windows_system_drive_letter', _call_benchmark(lambda context: lp.get_windows_system_drive_letter)),
+    ])
+    return l_benchmarks
+
+
+def get_public_function_names() -> List[str]:
+    """
+    the public functions of lib_path.lib_path - every one of them needs a benchmark
+
+    >>> set(get_public_function_names()) <= {function_name for _, function_name, _ in get_benchmarks()}
+    True
+    """
+    return sorted(name for name, function in inspect.getmembers(lib_path_module, inspect.isfunction)
+                  if function.__module__ == lib_path_module.__name__ and not name.startswith('_'))
+
+
+def _get_skip_reason(function_name: str) -> Optional[str]:
+    if function_name == 'get_windows_system_drive_letter' and not sys.platform.startswith('win'):
+        return 'windows only'
+    if function_name == 'make_test_directory_and_subdirs_fully_accessible_by_current_user' and not sys.platform.startswith('linux'):
+        return 'linux only'
+    return None
+
+
+def time_callable(function: Callable[[], Any], n_calls: int, repeat: int, min_run_time_s: float) -> Tuple[float, float]:
+    """ returns (best, median) seconds per call - every repeat runs the function until min_run_time_s has passed """
+    l_per_call_s = []
+    for _ in range(repeat):
+        n_runs = 0
+        start = time.perf_counter()
+        while True:
+            function()
+            n_runs += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_run_time_s:
+                break
+        l_per_call_s.append(elapsed / (n_runs * n_calls))
+    return min(l_per_call_s), statistics.median(l_per_call_s)
+
+
+def time_cli_startup(l_args: List[str], repeat: int) -> Tuple[float, float]:
+    """ (best, median) seconds for running lib_path_cli with l_args in a new process """
+    l_elapsed = []
+    path_repository = str(pathlib.Path(__file__).resolve().parent.parent)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [path_repository, os.environ.get('PYTHONPATH', '')])))
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-m', 'lib_path.lib_path_cli'] + l_args, check=True, stdout=subprocess.DEVNULL, env=env)
+        l_elapsed.append(time.perf_counter() - start)
+    return min(l_elapsed), statistics.median(l_elapsed)
+
+
+def run_benchmarks(scale: int = 1, n_paths: int = 2000, repeat: int = 5, min_run_time_s: float = 0.05,
+                   name_filter: str = '', cli_repeat: int = 5) -> List[BenchmarkResult]:
+    l_results: List[BenchmarkResult] = []
+    path_root = pathlib.Path(tempfile.mkdtemp(prefix='lib_path_benchmark_'))
+    try:
+        context = create_context(path_root, scale=scale, n_paths=n_paths)
+        for name, function_name, factory in get_benchmarks():
+            if name_filter not in name:
+                continue
+            skip_reason = _get_skip_reason(function_name)
+            if skip_reason:
+                l_results.append(BenchmarkResult(name=name, n_calls=0, best_s=0.0, median_s=0.0, skipped=skip_reason))
+                continue
+            function, n_calls = factory(context)
+            best_s, median_s = time_callable(function, n_calls=n_calls, repeat=repeat, min_run_time_s=min_run_time_s)
+            l_results.append(BenchmarkResult(name=name, n_calls=n_calls, best_s=best_s, median_s=median_s))
+    finally:
+        # make_test_directory_and_subdirs_fully_accessible_by_current_user might have changed the modes - rmtree copes with that
+        shutil.rmtree(str(path_root), ignore_errors=True)
+
+    for l_args in (['--version'], ['info']):
+        name = 'lib_path_cli[' + ' '.join(l_args) + ']'
+        if name_filter not in name:
+            continue
+        best_s, median_s = time_cli_startup(l_args, repeat=cli_repeat)
+        l_results.append(BenchmarkResult(name=name, n_calls=1, best_s=best_s, median_s=median_s))
+    return l_results
+
+
+def get_results_dict(l_results: List[BenchmarkResult], scale: int, n_paths: int) -> Dict[str, Any]:
+    return {
+        'meta': {
+            'lib_path_version': lib_path.__version__,
+            'python': sys.version,
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'scale': scale,
+            'n_paths': n_paths,
+        },
+        'results': {result.name: result._asdict() for result in l_results},
+    }
+
+
+def compare_results(d_new: Dict[str, Any], d_baseline: Dict[str, Any], threshold: float = 1.2) -> List[Tuple[str, float]]:
+    """
+    returns (name, ratio new / baseline) of every benchmark which got slower than threshold, using the best times
+
+    >>> d_baseline = {'results': {'a': {'best_s': 1.0, 'skipped': None}, 'b': {'best_s': 1.0, 'skipped': None}}}
+    >>> d_new = {'results': {'a': {'best_s': 1.5, 'skipped': None}, 'b': {'best_s': 1.1, 'skipped': None}, 'c': {'best_s': 9.0, 'skipped': None}}}
+    >>> compare_results(d_new, d_baseline, threshold=1.2)
+    [('a', 1.5)]
+    """
+    l_regressions = []
+    for name, d_result in d_new['results'].items():
+        d_baseline_result = d_baseline['results'].get(name)
+        if d_baseline_result is None or d_result['skipped'] or d_baseline_result['skipped'] or not d_baseline_result['best_s']:
+            continue
+        ratio = d_result['best_s'] / d_baseline_result['best_s']
+        if ratio > threshold:
+            l_regressions.append((name, round(ratio, 3)))
+    return l_regressions
+
+
+def main(l_args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='benchmarks for lib_path')
+    parser.add_argument('--output', help='write the results as json to this file')
+    parser.add_argument('--compare', help='json results of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=1.2, help='report benchmarks slower than threshold * baseline (default 1.2)')
+    parser.add_argument('--scale', type=int, default=1, help='size factor of the synthetic trees (default 1)')
+    parser.add_argument('--n-paths', type=int, default=2000, help='number of paths per corpus (default 2000)')
+    parser.add_argument('--repeat', type=int, default=5, help='repeats per benchmark (default 5)')
+    parser.add_argument('--filter', default='', help='only run benchmarks with this substring in their name')
+    args = parser.parse_args(l_args)
+
+    l_results = run_benchmarks(scale=args.scale, n_paths=args.n_paths, repeat=args.repeat, name_filter=args.filter)
+    for result in l_results:
+        if result.skipped:
+            print(f'{result.name:<90} skipped: {result.skipped}')
+        else:
+            print(f'{result.name:<90} {result.best_s * 1e6:12.3f} us/call (median {result.median_s * 1e6:.3f})')
+
+    d_results = get_results_dict(l_results, scale=args.scale, n_paths=args.n_paths)
+    if args.output:
+        pathlib.Path(args.output).write_text(json.dumps(d_results, indent=2))
+
+    if args.compare:
+        d_baseline = json.loads(pathlib.Path(args.compare).read_text())
+        l_regressions = compare_results(d_results, d_baseline, threshold=args.threshold)
+        for name, ratio in l_regressions:
+            print(f'REGRESSION {name}: {ratio:.2f} x baseline')
+        if l_regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,87 @@
+# STDLIB
+import importlib
+from typing import Any, Dict, List, TYPE_CHECKING
+
 from .lib_path import *
 
+# the names of the submodules are loaded on first access (PEP 562), so "import lib_path" stays fast.
+# the name -> submodule map is checked against the submodules in tests/test_import_time.py
+_D_LAZY_NAMES: Dict[str, str] = dict()
+for _module_name, _l_names in (
+        ('path_batch', ['strip_and_replace_backslashes_batch', 'is_windows_network_unc_batch', 'substract_windows_drive_letter_batch',
+                        'path_remove_trailing_slashes_batch', 'path_join_posix_batch']),
+        ('path_cache', ['DEFAULT_PATH_CACHE_MAXSIZE', 'CacheInfo', 'LruCache', 'path_join_posix_cached', 'path_remove_trailing_slashes_cached',
+                        'is_windows_network_unc_cached', 'path_starts_with_windows_drive_letter_cached', 'substract_windows_drive_letter_cached',
+                        'set_path_cache_maxsize', 'clear_path_caches', 'get_path_cache_info']),
+        ('dir_scan', ['SORT_KEYS', 'ScanEntry', 'iter_directory_entries', 'iter_directory_entry_pages']),
+        ('dir_probe', ['DirectoryProbe', 'probe_directory', 'probe_directories']),
+        ('tree_walk', ['WALK_ORDERS', 'WalkResult', 'walk_tree']),
+        ('tree_permissions', ['PermissionChangeSummary', 'change_tree_owner_and_mode']),
+        ('dir_writable', ['DEFAULT_WRITABLE_TTL_SECONDS', 'DEFAULT_WRITABLE_CACHE_MAXSIZE', 'DEFAULT_MAX_WORKERS', 'WritabilityOracle',
+                          'is_directory_writable_cached', 'are_directories_writable', 'invalidate_directory_writable_cache']),
+        ('path_index', ['SourceDirectoryIndex']),
+        ('marker_search', ['MARKER_TYPES', 'DEFAULT_MARKER_SEARCH_CACHE_MAXSIZE', 'find_marker_directory_upward', 'invalidate_marker_search_cache',
+                           'set_marker_search_cache_maxsize']),
+        ('path_validation', ['EXPECTATIONS', 'PathValidationFailure', 'PathValidationReport', 'PathValidationError', 'validate_paths']),
+        ('instrumentation', ['INSTRUMENTED_MODULE_NAMES', 'FunctionStats', 'InstrumentationStats', 'is_instrumentation_enabled', 'enable_instrumentation',
+                             'disable_instrumentation', 'reset_instrumentation_stats', 'get_instrumentation_stats', 'measure_instrumentation',
+                             'save_instrumentation_stats', 'load_instrumentation_stats', 'format_instrumentation_stats']),
+        ('path_stream', ['DEFAULT_READ_SIZE', 'StreamSummary', 'iter_path_blocks', 'stream_paths_batch', 'stream_paths']),
+        ('parsed_path', ['ParsedPath']),
+        ('dir_snapshot', ['SNAPSHOT_FORMAT_VERSION', 'DEFAULT_RACY_WINDOW_SECONDS', 'SnapshotDiff', 'DirectorySnapshot']),
+        ('dir_watch', ['DEFAULT_POLL_INTERVAL_SECONDS', 'DirectoryWatcher']),
+        ('tree_copy', ['CopyProgress', 'CopySummary', 'copy_file', 'copy_tree']),
+        ('disk_usage', ['DiskUsage', 'DiskUsageReport', 'DiskUsageCache', 'get_disk_usage']),
+        ('path_filter', ['PATTERN_SYNTAXES', 'PathFilter']),
+        ('tree_remove', ['RemoveSummary', 'remove_tree', 'prune_empty_directories']),
+        ('symlink_resolver', ['DEFAULT_SYMLINK_CACHE_TTL_SECONDS', 'DEFAULT_SYMLINK_CACHE_MAXSIZE', 'SymlinkResolver', 'enable_symlink_cache',
+                              'disable_symlink_cache', 'is_symlink_cache_enabled', 'get_symlink_resolver', 'invalidate_symlink_cache', 'resolve_path']),
+        ('dir_context', ['DirectoryContext']),
+        ('file_fingerprint', ['DEFAULT_HASH_ALGORITHM', 'FINGERPRINT_CACHE_FORMAT_VERSION', 'READ_BUFFER_SIZE', 'FingerprintReport', 'DuplicateReport',
+                              'FingerprintCache', 'hash_file', 'get_fingerprints', 'find_duplicate_files']),
+):
+    _D_LAZY_NAMES.update(dict.fromkeys(_l_names, _module_name))
+del _module_name, _l_names
+
+if TYPE_CHECKING:   # pragma: no cover
+    from .path_batch import *
+    from .path_cache import *
+    from .dir_scan import *
+    from .dir_probe import *
+    from .tree_walk import *
+    from .tree_permissions import *
+    from .dir_writable import *
+    from .path_index import *
+    from .marker_search import *
+    from .path_validation import *
+    from .instrumentation import *
+    from .path_stream import *
+    from .parsed_path import *
+    from .dir_snapshot import *
+    from .dir_watch import *
+    from .tree_copy import *
+    from .disk_usage import *
+    from .path_filter import *
+    from .tree_remove import *
+    from .file_fingerprint import *
+    from .symlink_resolver import *
+    from .dir_context import *
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _D_LAZY_NAMES.get(name)
+    if module_name is None:
+        raise AttributeError(f'module {__package__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'.{module_name}', __package__), name)
+    # cache it, next time the attribute is found without calling __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_D_LAZY_NAMES))
+
+
 # imports from __init__conf__ should happen after Your imports
 from . import __init__conf__
 __title__ = __init__conf__.title
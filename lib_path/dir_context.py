@@ -0,0 +1,290 @@
+# STDLIB
+import os
+import pathlib
+import stat
+from typing import IO, Any, List, Optional, Union
+
+# PROJ
+try:
+    from . import lib_path
+    from . import symlink_resolver
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import lib_path                         # type: ignore  # pragma: no cover
+    import symlink_resolver                 # type: ignore  # pragma: no cover
+
+# a virtual working directory, backed by a directory file descriptor (posix only).
+# relative paths are resolved against the descriptor with dir_fd relative calls - the process wide cwd is never read or changed,
+# so threads can work in parallel with their own "current directory", without a global lock around os.chdir.
+# the descriptor keeps pointing to the same directory, even if it is renamed meanwhile - DirectoryContext.path is the physical path
+# (symlinks resolved, like the kernel does for os.chdir) at opening time.
+# a context is not meant to be changed (chdir) by one thread while other threads use it - give every thread its own context.
+
+_DIRECTORY_OPEN_FLAGS = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0)
+
+_PathType = Union[str, pathlib.Path]
+
+
+class DirectoryContext(object):
+    """
+    a virtual working directory - path_directory None: the current directory at creation time.
+    relative paths are relative to the context, absolute paths are used as they are.
+
+    >>> # Setup
+    >>> import tempfile, shutil
+    >>> path_temp_dir = pathlib.Path(os.path.realpath(tempfile.mkdtemp()))
+    >>> (path_temp_dir / 'sub' / 'subsub').mkdir(parents=True)
+    >>> (path_temp_dir / 'sub' / 'file.txt').write_text('content')
+    7
+    >>> (path_temp_dir / 'link').symlink_to(path_temp_dir / 'sub' / 'subsub')
+    >>> path_cwd = os.getcwd()
+
+    >>> # Test
+    >>> with DirectoryContext(path_temp_dir) as context:
+    ...     context.chdir('sub')
+    ...     context.path == path_temp_dir / 'sub', sorted(context.listdir()), context.isfile('file.txt'), context.isdir('file.txt')
+    ...     context.get_l_path_sub_directories(), context.has_subdirs(), context.is_directory_empty('subsub')
+    ...     context.is_directory_writable(), context.get_absolute_path('../x') == path_temp_dir / 'x'
+    ...     with context.open('file.txt') as file:
+    ...         file.read()
+    (True, ['file.txt', 'subsub'], True, False)
+    ([...Path('subsub')], True, True)
+    (True, True)
+    'content'
+    >>> os.getcwd() == path_cwd
+    True
+
+    >>> # Test the path follows the directory of the descriptor - 'link/..' is 'sub', not the root
+    >>> with DirectoryContext(path_temp_dir) as context:
+    ...     context.chdir('link/..')
+    ...     context.path == path_temp_dir / 'sub', context.isfile('file.txt'), context.get_absolute_path('../link/..') == path_temp_dir / 'sub'
+    (True, True, True)
+
+    >>> # Test symlinks to directories are subdirectories, like lib_path.get_l_path_sub_directories
+    >>> with DirectoryContext(path_temp_dir) as context:
+    ...     sorted(path.name for path in context.get_l_path_sub_directories())
+    ['link', 'sub']
+
+    >>> # Test files are created with the mode of the builtin open (0o666 minus the umask)
+    >>> umask = os.umask(0o022)
+    >>> with DirectoryContext(path_temp_dir) as context:
+    ...     with context.open('new.txt', 'w') as file:
+    ...         _ = file.write('new')
+    ...     oct(stat.S_IMODE(context.stat('new.txt').st_mode))
+    '0o644'
+    >>> _ = os.umask(umask)
+
+    >>> # Test a context for each thread
+    >>> import concurrent.futures
+    >>> def list_directory(name):
+    ...     with DirectoryContext(path_temp_dir) as thread_context:
+    ...         thread_context.chdir(name)
+    ...         return sorted(thread_context.listdir())
+    >>> with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+    ...     list(executor.map(list_directory, ['.', 'sub', 'sub/subsub']))
+    [['link', 'new.txt', 'sub'], ['file.txt', 'subsub'], []]
+
+    >>> # Test not a directory
+    >>> DirectoryContext(path_temp_dir / 'sub' / 'file.txt')
+    Traceback (most recent call last):
+    ...
+    NotADirectoryError: ...
+
+    >>> # Test the errors are the same as of the lib_path functions
+    >>> with DirectoryContext(path_temp_dir) as context:
+    ...     context.has_subdirs('does_not_exist')
+    Traceback (most recent call last):
+    ...
+    NotADirectoryError: not a directory : .../does_not_exist
+    >>> with DirectoryContext(path_temp_dir) as context:
+    ...     context.is_directory_empty('sub/file.txt')
+    Traceback (most recent call last):
+    ...
+    NotADirectoryError: not a directory : .../sub/file.txt
+
+    >>> # Teardown
+    >>> shutil.rmtree(str(path_temp_dir))
+
+    """
+
+    def __init__(self, path_directory: Optional[_PathType] = None) -> None:
+        if os.name != 'posix':
+            raise NotImplementedError('DirectoryContext is only available on posix systems')
+        s_path = os.path.abspath(os.curdir if path_directory is None else str(path_directory))
+        self._fd = os.open(s_path, _DIRECTORY_OPEN_FLAGS)
+        self._path = _get_directory_path(self._fd, s_path)
+
+    @classmethod
+    def _from_fd(cls, fd: int, s_path: str) -> 'DirectoryContext':
+        context = cls.__new__(cls)
+        context._fd = fd
+        context._path = s_path
+        return context
+
+    @property
+    def path(self) -> pathlib.Path:
+        return pathlib.Path(self._path)
+
+    def fileno(self) -> int:
+        """ the directory file descriptor, for own dir_fd relative calls - it is closed with the context """
+        return self._fd
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def __enter__(self) -> 'DirectoryContext':
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self._path!r})'
+
+    def get_absolute_path(self, path: _PathType = os.curdir) -> pathlib.Path:
+        """ the resolved absolute path, relative to the context - like the kernel, '..' is applied after resolving the symlinks before it """
+        return symlink_resolver.resolve_path(os.path.join(self._path, str(path)))
+
+    def _open_directory(self, path: _PathType) -> int:
+        # always a new open file description - os.scandir on a shared (or dup-ed) descriptor would share the read position with other threads
+        return os.open(str(path), _DIRECTORY_OPEN_FLAGS, dir_fd=self._fd)
+
+    def _open_directory_checked(self, path: _PathType) -> int:
+        """ _open_directory, but a missing directory or a file raises NotADirectoryError, like lib_path.log_and_raise_if_not_isdir """
+        try:
+            return self._open_directory(path)
+        except (FileNotFoundError, NotADirectoryError):
+            lib_path.log_and_raise_if_not_isdir(self.get_absolute_path(path))
+            raise
+
+    def chdir(self, path: _PathType) -> None:
+        """ changes the directory of the context, like os.chdir """
+        fd = self._open_directory(path)
+        s_path = _get_directory_path(fd, os.path.join(self._path, str(path)))
+        os.close(self._fd)
+        self._fd, self._path = fd, s_path
+
+    def open_context(self, path: _PathType = os.curdir) -> 'DirectoryContext':
+        """ a new, independent context for path - for example for another thread """
+        fd = self._open_directory(path)
+        return DirectoryContext._from_fd(fd, _get_directory_path(fd, os.path.join(self._path, str(path))))
+
+    def stat(self, path: _PathType, follow_symlinks: bool = True) -> os.stat_result:
+        return os.stat(str(path), dir_fd=self._fd, follow_symlinks=follow_symlinks)
+
+    def exists(self, path: _PathType) -> bool:
+        try:
+            self.stat(path)
+            return True
+        except OSError:
+            return False
+
+    def isdir(self, path: _PathType) -> bool:
+        try:
+            return stat.S_ISDIR(self.stat(path).st_mode)
+        except OSError:
+            return False
+
+    def isfile(self, path: _PathType) -> bool:
+        try:
+            return stat.S_ISREG(self.stat(path).st_mode)
+        except OSError:
+            return False
+
+    def listdir(self, path: _PathType = os.curdir) -> List[str]:
+        """ like os.listdir """
+        fd = self._open_directory(path)
+        try:
+            with os.scandir(fd) as it_dir_entries:
+                return [dir_entry.name for dir_entry in it_dir_entries]
+        finally:
+            os.close(fd)
+
+    def get_l_path_sub_directories(self, path: _PathType = os.curdir) -> List[pathlib.Path]:
+        """
+        like lib_path.get_l_path_sub_directories - the names of the subdirectories, symlinks to directories count, like os.walk.
+        a directory which can not be listed has no subdirectories, the ones listed before an error are kept
+        """
+        fd = self._open_directory_checked(path)
+        l_path_sub_directories: List[pathlib.Path] = []
+        try:
+            with os.scandir(fd) as it_dir_entries:
+                for dir_entry in it_dir_entries:
+                    if _is_dir_entry_directory(dir_entry, follow_symlinks=True):
+                        l_path_sub_directories.append(pathlib.Path(dir_entry.name))
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+        return l_path_sub_directories
+
+    def has_subdirs(self, path: _PathType = os.curdir) -> bool:
+        """
+        like lib_path.has_subdirs, stops reading at the first subdirectory (symlinks to directories count, like os.walk).
+        a directory which can not be listed has no subdirectories
+        """
+        try:
+            fd = self._open_directory_checked(path)
+        except NotADirectoryError:
+            raise
+        except OSError:
+            return False
+        try:
+            with os.scandir(fd) as it_dir_entries:
+                return any(_is_dir_entry_directory(dir_entry, follow_symlinks=True) for dir_entry in it_dir_entries)
+        except OSError:
+            return False
+        finally:
+            os.close(fd)
+
+    def is_directory_empty(self, path: _PathType = os.curdir) -> bool:
+        """ like lib_path.is_directory_empty, reads at most one entry """
+        fd = self._open_directory_checked(path)
+        try:
+            with os.scandir(fd) as it_dir_entries:
+                return next(it_dir_entries, None) is None
+        finally:
+            os.close(fd)
+
+    def is_directory_writable(self, path: _PathType = os.curdir) -> bool:
+        """ like lib_path.is_directory_writable - creates and removes a probe file with O_EXCL """
+        try:
+            fd = self._open_directory(path)
+        except OSError:
+            return False
+        try:
+            while True:
+                temp_file = os.urandom(16).hex()
+                try:
+                    os.close(os.open(temp_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY, dir_fd=fd))
+                    break
+                except FileExistsError:
+                    pass
+            os.remove(temp_file, dir_fd=fd)
+            return True
+        except OSError:
+            return False
+        finally:
+            os.close(fd)
+
+    def open(self, path: _PathType, mode: str = 'r', **kwargs: Any) -> IO[Any]:
+        """ like the builtin open, relative to the context """
+        # 0o666 like the builtin open - the default of os.open is 0o777, new files would be executable
+        return open(str(path), mode, opener=lambda s_path, flags: os.open(s_path, flags, 0o666, dir_fd=self._fd), **kwargs)
+
+
+def _get_directory_path(fd: int, s_path: str) -> str:
+    """ the physical path of the opened directory - from /proc if available, otherwise s_path with the symlinks resolved """
+    try:
+        return os.readlink(f'/proc/self/fd/{fd}')
+    except OSError:
+        return str(symlink_resolver.resolve_path(s_path))
+
+
+def _is_dir_entry_directory(dir_entry: 'os.DirEntry[str]', follow_symlinks: bool) -> bool:
+    try:
+        return dir_entry.is_dir(follow_symlinks=follow_symlinks)
+    except OSError:
+        return False
@@ -0,0 +1,125 @@
+# STDLIB
+import fnmatch
+import os
+import pathlib
+from typing import Callable, Iterable, List, NamedTuple, Optional, Union
+
+# short circuiting directory probes - answer "is empty", "has subdirs", "count up to n" and "has entry matching x"
+# from one os.scandir pass, which stops as soon as all questions are decided.
+
+Matcher = Union[str, Callable[[str], bool]]
+
+
+class DirectoryProbe(NamedTuple):
+    path: str
+    is_empty: Optional[bool]
+    has_subdirs: Optional[bool]         # None if not asked for
+    n_entries: Optional[int]            # number of entries, counted up to count_limit - None if not asked for
+    has_match: Optional[bool]           # None if not asked for
+    error: Optional[OSError] = None     # only set by probe_directories
+
+
+def _get_name_matcher(match: Optional[Matcher]) -> Optional[Callable[[str], bool]]:
+    if match is None or callable(match):
+        return match
+    pattern = str(match)
+    return lambda name: fnmatch.fnmatch(name, pattern)
+
+
+def probe_directory(path_directory: Union[str, pathlib.Path],
+                    check_subdirs: bool = True,
+                    count_limit: int = 0,
+                    match: Optional[Matcher] = None) -> DirectoryProbe:
+    """
+    probes a directory with one os.scandir pass, and stops reading at the first decisive entry.
+
+    check_subdirs:  find out if the directory has subdirectories (symlinks to directories count, like os.walk)
+    count_limit:    count the entries up to count_limit (0 = don't count)
+    match:          glob pattern (fnmatch) or callable, which is called with the entry name
+
+    raises the OSError of os.scandir, like FileNotFoundError, NotADirectoryError or PermissionError
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent / 'tests'
+
+    >>> # Test
+    >>> probe = probe_directory(path_test_dir / 'dir_with_subdirs')
+    >>> probe.is_empty, probe.has_subdirs, probe.n_entries, probe.has_match
+    (False, True, None, None)
+    >>> probe = probe_directory(path_test_dir / 'dir_without_subdirs', count_limit=10, match='*.txt')
+    >>> probe.is_empty, probe.has_subdirs, probe.n_entries, probe.has_match
+    (False, False, 1, True)
+    >>> probe = probe_directory(path_test_dir / 'test_a', check_subdirs=False, count_limit=3, match=lambda name: name.startswith('xyz'))
+    >>> probe.n_entries, probe.has_match
+    (3, False)
+
+    >>> # Test not a directory
+    >>> probe_directory(path_test_dir / 'does_not_exist')
+    Traceback (most recent call last):
+    ...
+    FileNotFoundError: ...
+
+    """
+    if count_limit < 0:
+        raise ValueError(f'count_limit must be >= 0, got {count_limit}')
+    name_matcher = _get_name_matcher(match)
+    is_empty = True
+    has_subdirs = False
+    has_match = False
+    n_entries = 0
+
+    with os.scandir(str(path_directory)) as it_dir_entries:
+        for dir_entry in it_dir_entries:
+            is_empty = False
+            n_entries += 1
+            if check_subdirs and not has_subdirs:
+                try:
+                    has_subdirs = dir_entry.is_dir()
+                except OSError:
+                    pass
+            if name_matcher is not None and not has_match:
+                has_match = name_matcher(dir_entry.name)
+            if (not check_subdirs or has_subdirs) and (name_matcher is None or has_match) and n_entries >= count_limit:
+                break
+
+    return DirectoryProbe(path=str(path_directory),
+                          is_empty=is_empty,
+                          has_subdirs=has_subdirs if check_subdirs else None,
+                          n_entries=min(n_entries, count_limit) if count_limit else None,
+                          has_match=has_match if name_matcher is not None else None)
+
+
+def probe_directories(paths_directory: Iterable[Union[str, pathlib.Path]],
+                      check_subdirs: bool = True,
+                      count_limit: int = 0,
+                      match: Optional[Matcher] = None,
+                      max_workers: int = 1) -> List[DirectoryProbe]:
+    """
+    probes many directories, optionally in parallel threads (max_workers > 1).
+    the results are returned in the order of paths_directory.
+    a directory which can not be probed does not stop the others - the OSError is stored in DirectoryProbe.error,
+    and all other fields are None.
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent / 'tests'
+    >>> l_dirs = [path_test_dir / 'dir_with_subdirs', path_test_dir / 'dir_without_subdirs', path_test_dir / 'does_not_exist']
+
+    >>> # Test
+    >>> l_probes = probe_directories(l_dirs, max_workers=4)
+    >>> [probe.has_subdirs for probe in l_probes]
+    [True, False, None]
+    >>> isinstance(l_probes[2].error, FileNotFoundError)
+    True
+
+    """
+    def _probe(path_directory: Union[str, pathlib.Path]) -> DirectoryProbe:
+        try:
+            return probe_directory(path_directory, check_subdirs=check_subdirs, count_limit=count_limit, match=match)
+        except OSError as exc:
+            return DirectoryProbe(path=str(path_directory), is_empty=None, has_subdirs=None, n_entries=None, has_match=None, error=exc)
+
+    if max_workers <= 1:
+        return [_probe(path_directory) for path_directory in paths_directory]
+    import concurrent.futures
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_probe, paths_directory))
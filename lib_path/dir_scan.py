@@ -0,0 +1,162 @@
+# STDLIB
+import os
+import pathlib
+from typing import Iterator, List, NamedTuple, Optional, Union
+
+# lazy, os.scandir based directory listing.
+# the entries carry the file type information from the directory listing (d_type) and optionally the stat result,
+# so the caller does not need to stat the entries again.
+
+SORT_KEYS = ('name', 'size', 'mtime')
+
+
+class ScanEntry(NamedTuple):
+    name: str
+    path: str
+    is_dir: bool
+    is_file: bool
+    is_symlink: bool
+    inode: int
+    stat: Optional[os.stat_result]
+
+
+def _is_dir(dir_entry: 'os.DirEntry[str]', follow_symlinks: bool) -> bool:
+    # is_dir / is_file only raise OSError for broken entries, like os.walk we treat those as "not a directory"
+    try:
+        return dir_entry.is_dir(follow_symlinks=follow_symlinks)
+    except OSError:
+        return False
+
+
+def _get_scan_entry(dir_entry: 'os.DirEntry[str]', is_dir: bool, follow_symlinks: bool, with_stat: bool) -> ScanEntry:
+    """ is_dir: already known - a directory is no file, is_file needs no further call (and no stat for symlinks) then """
+    is_file = False
+    if not is_dir:
+        try:
+            is_file = dir_entry.is_file(follow_symlinks=follow_symlinks)
+        except OSError:
+            pass
+    try:
+        is_symlink = dir_entry.is_symlink()
+    except OSError:
+        is_symlink = False
+    # free on posix (from the directory listing), a stat on windows - which fails for entries removed meanwhile
+    try:
+        inode = dir_entry.inode()
+    except OSError:
+        inode = 0
+
+    stat_result: Optional[os.stat_result] = None
+    if with_stat:
+        try:
+            stat_result = dir_entry.stat(follow_symlinks=follow_symlinks)
+        except OSError:
+            # broken symlink - the link itself is all we can stat
+            try:
+                stat_result = dir_entry.stat(follow_symlinks=False)
+            except OSError:
+                stat_result = None
+
+    return ScanEntry(name=dir_entry.name, path=dir_entry.path, is_dir=is_dir, is_file=is_file,
+                     is_symlink=is_symlink, inode=inode, stat=stat_result)
+
+
+def _get_sort_value(scan_entry: ScanEntry, sort_by: str) -> Union[str, int, float]:
+    if sort_by == 'name':
+        return scan_entry.name
+    if scan_entry.stat is None:
+        return -1
+    if sort_by == 'size':
+        return scan_entry.stat.st_size
+    return scan_entry.stat.st_mtime_ns
+
+
+def iter_directory_entries(path_directory: Union[str, pathlib.Path],
+                           dirs_only: bool = False,
+                           with_stat: bool = False,
+                           follow_symlinks: bool = True,
+                           sort_by: Optional[str] = None,
+                           reverse: bool = False) -> Iterator[ScanEntry]:
+    """
+    yields the entries of a directory (non recursive), one at a time.
+
+    dirs_only:          yield only directories (like the directory list of os.walk)
+    with_stat:          include the stat result - costs one additional syscall per entry on posix
+    follow_symlinks:    follow symlinks for is_dir, is_file and stat
+    sort_by:            None (directory order, streaming), 'name', 'size' or 'mtime'
+                        sorting needs to read the whole directory first.
+                        'size' and 'mtime' imply with_stat
+    reverse:            reverse the sort order
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent / 'tests'
+    >>> path_dir_with_subdirs = path_test_dir / 'dir_with_subdirs'
+
+    >>> # Test
+    >>> [entry.name for entry in iter_directory_entries(path_dir_with_subdirs, dirs_only=True)]
+    ['subdir']
+    >>> entry = next(iter_directory_entries(path_dir_with_subdirs / 'subdir', with_stat=True))
+    >>> entry.name, entry.is_file, entry.is_dir, entry.stat is not None
+    ('test.txt', True, False, True)
+    >>> [entry.name for entry in iter_directory_entries(path_test_dir / 'test_a', sort_by='name') if entry.is_file]
+    ['.file_test_a_1.txt', '.file_test_a_2.txt', 'file_test_a_1.txt', 'file_test_a_2.txt']
+
+    >>> # Test invalid sort key
+    >>> next(iter_directory_entries(path_test_dir, sort_by='unknown'))
+    Traceback (most recent call last):
+    ...
+    ValueError: sort_by must be one of ('name', 'size', 'mtime'), got "unknown"
+
+    """
+    if sort_by is not None and sort_by not in SORT_KEYS:
+        raise ValueError(f'sort_by must be one of {SORT_KEYS}, got "{sort_by}"')
+    if sort_by in ('size', 'mtime'):
+        with_stat = True
+
+    if sort_by is None:
+        with os.scandir(str(path_directory)) as it_dir_entries:
+            for dir_entry in it_dir_entries:
+                # with dirs_only the other entries are skipped before anything else is looked up for them
+                is_dir = _is_dir(dir_entry, follow_symlinks=follow_symlinks)
+                if dirs_only and not is_dir:
+                    continue
+                yield _get_scan_entry(dir_entry, is_dir=is_dir, follow_symlinks=follow_symlinks, with_stat=with_stat)
+    else:
+        l_scan_entries = list(iter_directory_entries(path_directory, dirs_only=dirs_only, with_stat=with_stat, follow_symlinks=follow_symlinks))
+        l_scan_entries.sort(key=lambda scan_entry: _get_sort_value(scan_entry, sort_by), reverse=reverse)     # type: ignore
+        yield from l_scan_entries
+
+
+def iter_directory_entry_pages(path_directory: Union[str, pathlib.Path],
+                               page_size: int = 1000,
+                               dirs_only: bool = False,
+                               with_stat: bool = False,
+                               follow_symlinks: bool = True,
+                               sort_by: Optional[str] = None,
+                               reverse: bool = False) -> Iterator[List[ScanEntry]]:
+    """
+    like iter_directory_entries, but yields lists of up to page_size entries
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent / 'tests' / 'test_a'
+
+    >>> # Test
+    >>> [len(page) for page in iter_directory_entry_pages(path_test_dir, page_size=3)]
+    [3, 3, 2]
+    >>> iter_directory_entry_pages(path_test_dir, page_size=0).__next__()
+    Traceback (most recent call last):
+    ...
+    ValueError: page_size must be > 0, got 0
+
+    """
+    if page_size < 1:
+        raise ValueError(f'page_size must be > 0, got {page_size}')
+    l_page: List[ScanEntry] = []
+    for scan_entry in iter_directory_entries(path_directory, dirs_only=dirs_only, with_stat=with_stat,
+                                             follow_symlinks=follow_symlinks, sort_by=sort_by, reverse=reverse):
+        l_page.append(scan_entry)
+        if len(l_page) >= page_size:
+            yield l_page
+            l_page = []
+    if l_page:
+        yield l_page
@@ -0,0 +1,240 @@
+# STDLIB
+import logging
+import os
+import pathlib
+import sqlite3
+import time
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple, Union
+
+logger = logging.getLogger()
+
+# persistent snapshot of a directory tree in one sqlite file - the directories (device, inode, mtime) and their entries (name, type, inode).
+# a rescan stats every directory, but lists only the directories whose mtime (or inode) changed, and reports the difference.
+# the mtime of a directory changes when entries are added, removed or renamed - not when the content of a file changes,
+# so the diff is about names: added, removed, and changed (same name, but another inode or another type).
+
+SNAPSHOT_FORMAT_VERSION = '1'
+
+# directories modified that short before the scan might be modified again within the same mtime tick (like 'racy git'),
+# their mtime is not trusted and they are listed again on the next rescan
+DEFAULT_RACY_WINDOW_SECONDS = 2.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS directories (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, dev INTEGER, ino INTEGER, mtime_ns INTEGER);
+CREATE TABLE IF NOT EXISTS entries (directory_id INTEGER NOT NULL, name TEXT NOT NULL, is_dir INTEGER NOT NULL, inode INTEGER NOT NULL,
+                                    PRIMARY KEY (directory_id, name)) WITHOUT ROWID;
+"""
+
+
+class SnapshotDiff(NamedTuple):
+    added: List[str]                    # full paths, sorted
+    removed: List[str]
+    changed: List[str]
+    n_directories_listed: int           # directories which were listed (new or changed mtime)
+    n_directories_unchanged: int        # directories which were only stat-ed
+    errors: List[OSError]
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+class _StoredDirectory(NamedTuple):
+    id: int
+    dev: int
+    ino: int
+    mtime_ns: int
+
+
+def _join_relative(relative_path: str, name: str) -> str:
+    return f'{relative_path}/{name}' if relative_path else name
+
+
+class DirectorySnapshot(object):
+    """
+    a snapshot of the tree below path_root_directory, stored in path_snapshot_file (sqlite).
+    the first rescan reports all entries as added. symlinks are recorded, but not followed.
+
+    >>> # Setup
+    >>> import tempfile, shutil
+    >>> path_temp_dir = pathlib.Path(tempfile.mkdtemp())
+    >>> path_root = path_temp_dir / 'root'
+    >>> (path_root / 'a' / 'aa').mkdir(parents=True)
+    >>> (path_root / 'b').mkdir()
+    >>> (path_root / 'a' / 'file.txt').touch()
+    >>> def set_old_mtimes(mtime_ns):
+    ...     for path_dir in [path_root] + [path for path in path_root.rglob('*') if path.is_dir()]:
+    ...         os.utime(str(path_dir), ns=(mtime_ns, mtime_ns))
+
+    >>> # Test first scan
+    >>> set_old_mtimes(10 ** 18)
+    >>> snapshot = DirectorySnapshot(path_temp_dir / 'snapshot.sqlite', path_root)
+    >>> diff = snapshot.rescan()
+    >>> [os.path.relpath(path, str(path_root)) for path in diff.added], diff.n_directories_listed
+    (['a', 'a/aa', 'a/file.txt', 'b'], 4)
+    >>> snapshot.get_l_path_sub_directories(path_root / 'a')
+    [...Path('aa')]
+
+    >>> # Test nothing changed - the directories are only stat-ed
+    >>> diff = snapshot.rescan()
+    >>> diff.has_changes, diff.n_directories_listed, diff.n_directories_unchanged
+    (False, 0, 4)
+
+    >>> # Test changes, the snapshot is reopened
+    >>> snapshot.close()
+    >>> shutil.rmtree(str(path_root / 'a'))
+    >>> (path_root / 'a').touch()
+    >>> (path_root / 'b' / 'new.txt').touch()
+    >>> set_old_mtimes(10 ** 18 + 1)
+    >>> with DirectorySnapshot(path_temp_dir / 'snapshot.sqlite', path_root) as snapshot:
+    ...     diff = snapshot.rescan()
+    >>> [[os.path.relpath(path, str(path_root)) for path in paths] for paths in (diff.added, diff.removed, diff.changed)]
+    [['b/new.txt'], ['a/aa', 'a/file.txt'], ['a']]
+
+    >>> # Test another root
+    >>> DirectorySnapshot(path_temp_dir / 'snapshot.sqlite', path_temp_dir)
+    Traceback (most recent call last):
+    ...
+    ValueError: the snapshot ... was made for "...root", not for "..."
+
+    >>> # Teardown
+    >>> shutil.rmtree(str(path_temp_dir))
+
+    """
+
+    def __init__(self, path_snapshot_file: Union[str, pathlib.Path], path_root_directory: Union[str, pathlib.Path],
+                 racy_window_seconds: float = DEFAULT_RACY_WINDOW_SECONDS) -> None:
+        self.path_snapshot_file = pathlib.Path(path_snapshot_file)
+        self.path_root_directory = pathlib.Path(path_root_directory)
+        self.racy_window_seconds = racy_window_seconds
+        self._connection = sqlite3.connect(str(self.path_snapshot_file))
+        try:
+            self._connection.executescript(_SCHEMA)
+            self._check_meta()
+        except Exception:
+            self._connection.close()
+            raise
+
+    def _check_meta(self) -> None:
+        d_meta = dict(self._connection.execute('SELECT key, value FROM meta').fetchall())
+        if not d_meta:
+            with self._connection:
+                self._connection.executemany('INSERT INTO meta (key, value) VALUES (?, ?)',
+                                             [('version', SNAPSHOT_FORMAT_VERSION), ('root', str(self.path_root_directory))])
+            return
+        if d_meta.get('version') != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f'the snapshot "{self.path_snapshot_file}" has the format version "{d_meta.get("version")}", '
+                             f'expected "{SNAPSHOT_FORMAT_VERSION}"')
+        if d_meta.get('root') != str(self.path_root_directory):
+            raise ValueError(f'the snapshot "{self.path_snapshot_file}" was made for "{d_meta.get("root")}", not for "{self.path_root_directory}"')
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> 'DirectorySnapshot':
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def _get_full_path(self, relative_path: str) -> str:
+        return os.path.join(str(self.path_root_directory), relative_path) if relative_path else str(self.path_root_directory)
+
+    def get_l_path_sub_directories(self, path_directory: Union[str, pathlib.Path]) -> List[pathlib.Path]:
+        """ the names of the subdirectories, like lib_path.get_l_path_sub_directories - from the snapshot, without listing the directory """
+        relative_path = os.path.relpath(str(path_directory), str(self.path_root_directory)).replace(os.sep, '/')
+        if relative_path == '.':
+            relative_path = ''
+        l_rows = self._connection.execute('SELECT entries.name FROM entries JOIN directories ON entries.directory_id = directories.id '
+                                          'WHERE directories.path = ? AND entries.is_dir = 1 ORDER BY entries.name', (relative_path,)).fetchall()
+        return [pathlib.Path(name) for name, in l_rows]
+
+    def rescan(self) -> SnapshotDiff:
+        """ updates the snapshot and returns the difference to the last scan - all changes are written in one transaction """
+        racy_mtime_ns = time.time_ns() - int(self.racy_window_seconds * 1e9)
+        connection = self._connection
+        d_stored: Dict[str, _StoredDirectory] = {path: _StoredDirectory(*row) for path, *row in
+                                                 connection.execute('SELECT path, id, dev, ino, mtime_ns FROM directories')}
+        set_visited: Set[str] = set()
+        l_error_paths: List[str] = []
+        l_added: List[str] = []
+        l_removed: List[str] = []
+        l_changed: List[str] = []
+        errors: List[OSError] = []
+        n_listed = n_unchanged = 0
+
+        with connection:
+            l_stack = ['']
+            while l_stack:
+                relative_path = l_stack.pop()
+                path_directory = self._get_full_path(relative_path)
+                stored = d_stored.get(relative_path)
+                try:
+                    stat_result = os.stat(path_directory)
+                    if stored is not None and (stored.dev, stored.ino, stored.mtime_ns) == (stat_result.st_dev, stat_result.st_ino, stat_result.st_mtime_ns):
+                        set_visited.add(relative_path)
+                        n_unchanged += 1
+                        l_stack.extend(_join_relative(relative_path, name) for name, in
+                                       connection.execute('SELECT name FROM entries WHERE directory_id = ? AND is_dir = 1', (stored.id,)))
+                        continue
+                    with os.scandir(path_directory) as it_dir_entries:
+                        d_entries = {dir_entry.name: (int(dir_entry.is_dir(follow_symlinks=False)), dir_entry.inode()) for dir_entry in it_dir_entries}
+                except (FileNotFoundError, NotADirectoryError):
+                    if not relative_path:
+                        raise
+                    # gone, although the mtime of the parent directory did not change (coarse mtime resolution) -
+                    # it is removed from the snapshot below, and the parent directory is listed again on the next rescan
+                    connection.execute('UPDATE directories SET mtime_ns = -1 WHERE path = ?', (relative_path.rpartition('/')[0],))
+                    continue
+                except OSError as exc:
+                    # keep what we know about the directory and below
+                    errors.append(exc)
+                    l_error_paths.append(relative_path)
+                    set_visited.add(relative_path)
+                    continue
+
+                set_visited.add(relative_path)
+                n_listed += 1
+                # the mtime of a directory modified within the racy window is not trusted
+                mtime_ns = stat_result.st_mtime_ns if stat_result.st_mtime_ns < racy_mtime_ns else -1
+                if stored is None:
+                    directory_id = connection.execute('INSERT INTO directories (path, dev, ino, mtime_ns) VALUES (?, ?, ?, ?)',
+                                                      (relative_path, stat_result.st_dev, stat_result.st_ino, mtime_ns)).lastrowid
+                    d_stored_entries: Dict[str, Tuple[int, int]] = dict()
+                else:
+                    directory_id = stored.id
+                    connection.execute('UPDATE directories SET dev = ?, ino = ?, mtime_ns = ? WHERE id = ?',
+                                       (stat_result.st_dev, stat_result.st_ino, mtime_ns, directory_id))
+                    d_stored_entries = {name: (is_dir, inode) for name, is_dir, inode in
+                                        connection.execute('SELECT name, is_dir, inode FROM entries WHERE directory_id = ?', (directory_id,))}
+
+                l_upserts = []
+                for name, entry_info in d_entries.items():
+                    stored_entry_info = d_stored_entries.pop(name, None)
+                    if stored_entry_info is None:
+                        l_added.append(os.path.join(path_directory, name))
+                    elif stored_entry_info != entry_info:
+                        l_changed.append(os.path.join(path_directory, name))
+                    else:
+                        continue
+                    l_upserts.append((directory_id, name) + entry_info)
+                connection.executemany('INSERT OR REPLACE INTO entries (directory_id, name, is_dir, inode) VALUES (?, ?, ?, ?)', l_upserts)
+                connection.executemany('DELETE FROM entries WHERE directory_id = ? AND name = ?', [(directory_id, name) for name in d_stored_entries])
+                l_removed.extend(os.path.join(path_directory, name) for name in d_stored_entries)
+                l_stack.extend(_join_relative(relative_path, name) for name, (is_dir, _) in d_entries.items() if is_dir)
+
+            # directories which are gone (or are not directories any more) - their entries are removed
+            for relative_path, stored in d_stored.items():
+                if relative_path in set_visited or any(relative_path.startswith(error_path + '/') or not error_path for error_path in l_error_paths):
+                    continue
+                path_directory = self._get_full_path(relative_path)
+                l_removed.extend(os.path.join(path_directory, name) for name, in
+                                 connection.execute('SELECT name FROM entries WHERE directory_id = ?', (stored.id,)))
+                connection.execute('DELETE FROM entries WHERE directory_id = ?', (stored.id,))
+                connection.execute('DELETE FROM directories WHERE id = ?', (stored.id,))
+
+        if errors:
+            logger.warning(f'{len(errors)} directories of "{self.path_root_directory}" could not be scanned, the first error: {errors[0]}')
+        return SnapshotDiff(added=sorted(l_added), removed=sorted(l_removed), changed=sorted(l_changed),
+                            n_directories_listed=n_listed, n_directories_unchanged=n_unchanged, errors=errors)
@@ -0,0 +1,355 @@
+# STDLIB
+import errno
+import logging
+import os
+import pathlib
+import selectors
+import struct
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Set, Union
+
+# PROJ
+try:
+    from . import lib_path
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import lib_path                         # type: ignore  # pragma: no cover
+
+logger: logging.Logger = logging.getLogger()
+
+# live in-memory view of watched directories - the entry names and if the entries are directories.
+# on linux the view is kept up to date by inotify (via ctypes, in a background thread), queries are answered from memory.
+# elsewhere (or if inotify is not available, or the watch limit is reached) the view is listed again
+# when it is older than poll_interval_seconds.
+# notes:
+#   - the view is updated by the background thread, shortly after the change - not synchronously
+#   - like has_subdirs, symlinks to directories count as directories - a symlink which is changed later is not noticed
+#   - on an event queue overflow all watched directories are listed again
+
+DEFAULT_POLL_INTERVAL_SECONDS = 1.0
+
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = _IN_CREATE | _IN_DELETE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR
+# struct inotify_event: int wd, uint32 mask, uint32 cookie, uint32 len, char name[len]
+_EVENT_HEADER = struct.Struct('iIII')
+_READ_SIZE = 1 << 16
+
+
+class _Inotify(object):
+    """ the inotify syscalls via ctypes """
+
+    def __init__(self) -> None:
+        import ctypes
+        import ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self._check(self._libc.inotify_init1(_IN_CLOEXEC))
+
+    def _check(self, result: int) -> int:
+        if result < 0:
+            import ctypes
+            error_number = ctypes.get_errno()
+            raise OSError(error_number, os.strerror(error_number))
+        return result
+
+    def add_watch(self, path: str) -> int:
+        return self._check(self._libc.inotify_add_watch(self.fd, os.fsencode(path), _WATCH_MASK))
+
+    def rm_watch(self, wd: int) -> None:
+        # the watch might be gone already (IN_IGNORED), then EINVAL is fine
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class _DirectoryView(object):
+    __slots__ = ('path', 'd_entries', 'wd', 'time_listed')
+
+    def __init__(self, path: str, d_entries: Dict[str, bool], wd: Optional[int], time_listed: float) -> None:
+        self.path = path
+        self.d_entries = d_entries      # name -> is directory
+        self.wd = wd                    # the inotify watch descriptor, None if polled
+        self.time_listed = time_listed
+
+
+def _list_directory(path: str) -> Dict[str, bool]:
+    d_entries: Dict[str, bool] = dict()
+    with os.scandir(path) as it_dir_entries:
+        for dir_entry in it_dir_entries:
+            try:
+                d_entries[dir_entry.name] = dir_entry.is_dir()
+            except OSError:
+                d_entries[dir_entry.name] = False
+    return d_entries
+
+
+class DirectoryWatcher(object):
+    """
+    answers is_directory_empty / has_subdirs / entry listings of watched directories from memory - thread safe.
+    directories are watched on the first query (or with watch), until unwatch or close.
+
+    use_inotify:            use inotify on linux - if False, or inotify is not available, the directories are polled
+    poll_interval_seconds:  how old the view of a polled directory can get
+
+    >>> # Setup
+    >>> import tempfile
+    >>> path_temp_dir = pathlib.Path(tempfile.mkdtemp())
+    >>> def wait_for(condition):
+    ...     time_end = time.monotonic() + 5
+    ...     while not condition() and time.monotonic() < time_end:
+    ...         time.sleep(0.01)
+    ...     return condition()
+
+    >>> # Test
+    >>> for use_inotify in (True, False):
+    ...     with DirectoryWatcher(use_inotify=use_inotify, poll_interval_seconds=0.01) as watcher:
+    ...         assert watcher.is_directory_empty(path_temp_dir)
+    ...         (path_temp_dir / 'sub').mkdir()
+    ...         assert wait_for(lambda: watcher.has_subdirs(path_temp_dir))
+    ...         (path_temp_dir / 'file.txt').touch()
+    ...         assert wait_for(lambda: watcher.get_entry_names(path_temp_dir) == ['file.txt', 'sub'])
+    ...         (path_temp_dir / 'sub').rmdir()
+    ...         (path_temp_dir / 'file.txt').unlink()
+    ...         assert wait_for(lambda: watcher.is_directory_empty(path_temp_dir))
+    >>> with DirectoryWatcher() as watcher:
+    ...     watcher.is_using_inotify == sys.platform.startswith('linux')
+    True
+
+    >>> # Test an event queue overflow lists all directories again - also the ones watched under another path (symlink)
+    >>> (path_temp_dir / 'sub').mkdir()
+    >>> (path_temp_dir / 'link').symlink_to('sub')
+    >>> with DirectoryWatcher() as watcher:
+    ...     watcher.get_entry_names(path_temp_dir / 'sub'), watcher.get_entry_names(path_temp_dir / 'link')
+    ...     with watcher._lock:
+    ...         watcher._d_views[str(path_temp_dir / 'sub')].d_entries['lost_event'] = False
+    ...         watcher._process_events(_EVENT_HEADER.pack(-1, _IN_Q_OVERFLOW, 0, 0))
+    ...     watcher.get_entry_names(path_temp_dir / 'sub'), watcher.get_entry_names(path_temp_dir / 'link')
+    ([], [])
+    ([], [])
+    >>> (path_temp_dir / 'link').unlink()
+    >>> (path_temp_dir / 'sub').rmdir()
+
+    >>> # Test not a directory
+    >>> with DirectoryWatcher() as watcher:
+    ...     watcher.has_subdirs(path_temp_dir / 'does_not_exist')
+    Traceback (most recent call last):
+    ...
+    NotADirectoryError: ...
+
+    >>> # Teardown
+    >>> path_temp_dir.rmdir()
+
+    """
+
+    def __init__(self, use_inotify: bool = True, poll_interval_seconds: float = DEFAULT_POLL_INTERVAL_SECONDS) -> None:
+        self.poll_interval_seconds = poll_interval_seconds
+        self._lock = threading.RLock()
+        self._d_views: Dict[str, _DirectoryView] = dict()
+        # the same directory under different paths (symlinks) has one watch descriptor - the views share the entries
+        self._d_paths_by_wd: Dict[int, Set[str]] = dict()
+        self._inotify: Optional[_Inotify] = None
+        self._thread: Optional[threading.Thread] = None
+        self._wakeup_fd_read = self._wakeup_fd_write = -1
+        if use_inotify and sys.platform.startswith('linux'):
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError) as exc:
+                logger.warning(f'inotify is not available, directories are polled: {exc}')
+        if self._inotify is not None:
+            self._wakeup_fd_read, self._wakeup_fd_write = os.pipe()
+            self._thread = threading.Thread(target=self._read_events, name='lib_path_dir_watch', daemon=True)
+            self._thread.start()
+
+    @property
+    def is_using_inotify(self) -> bool:
+        return self._inotify is not None
+
+    def __enter__(self) -> 'DirectoryWatcher':
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """ stops watching all directories """
+        if self._inotify is not None and self._thread is not None:
+            os.write(self._wakeup_fd_write, b'\0')
+            self._thread.join()
+            self._thread = None
+            self._inotify.close()
+            self._inotify = None
+            os.close(self._wakeup_fd_read)
+            os.close(self._wakeup_fd_write)
+        with self._lock:
+            self._d_views.clear()
+            self._d_paths_by_wd.clear()
+
+    def watch(self, path_directory: Union[str, pathlib.Path]) -> None:
+        """ starts watching the directory, raises NotADirectoryError if it is not a directory """
+        self._get_view(path_directory)
+
+    def unwatch(self, path_directory: Union[str, pathlib.Path]) -> None:
+        with self._lock:
+            view = self._d_views.get(os.path.abspath(str(path_directory)))
+            if view is not None:
+                self._remove_view(view)
+
+    def invalidate(self, path_directory: Optional[Union[str, pathlib.Path]] = None) -> None:
+        """ lists the directory (all directories if None) again on the next query """
+        with self._lock:
+            if path_directory is None:
+                l_views = list(self._d_views.values())
+            else:
+                l_views = [view for view in (self._d_views.get(os.path.abspath(str(path_directory))),) if view is not None]
+            self._remove_views(l_views)
+
+    def is_directory_empty(self, path_directory: Union[str, pathlib.Path]) -> bool:
+        return not self._get_view(path_directory).d_entries
+
+    def has_subdirs(self, path_directory: Union[str, pathlib.Path]) -> bool:
+        with self._lock:
+            return any(self._get_view(path_directory).d_entries.values())
+
+    def get_entry_names(self, path_directory: Union[str, pathlib.Path]) -> List[str]:
+        """ the sorted names of the entries """
+        with self._lock:
+            return sorted(self._get_view(path_directory).d_entries)
+
+    def get_sub_directory_names(self, path_directory: Union[str, pathlib.Path]) -> List[str]:
+        """ the sorted names of the subdirectories """
+        with self._lock:
+            return sorted(name for name, is_dir in self._get_view(path_directory).d_entries.items() if is_dir)
+
+    def _get_view(self, path_directory: Union[str, pathlib.Path]) -> _DirectoryView:
+        path = os.path.abspath(str(path_directory))
+        view = self._d_views.get(path)
+        if view is not None and (view.wd is not None or time.monotonic() - view.time_listed < self.poll_interval_seconds):
+            return view
+        with self._lock:
+            view = self._d_views.get(path)
+            if view is not None:
+                if view.wd is not None:
+                    return view
+                self._remove_view(view)
+            return self._add_view(path)
+
+    def _add_view(self, path: str) -> _DirectoryView:
+        """ adds the watch first, then lists the directory - the events are processed after the listing (under the lock) """
+        wd: Optional[int] = None
+        if self._inotify is not None:
+            try:
+                wd = self._inotify.add_watch(path)
+            except OSError as exc:
+                if exc.errno in (errno.ENOENT, errno.ENOTDIR):
+                    lib_path.log_and_raise_if_not_isdir(pathlib.Path(path))
+                    raise
+                # like ENOSPC - the limit of inotify watches is reached
+                logger.warning(f'can not watch "{path}", it is polled: {exc}')
+        set_paths = self._d_paths_by_wd.get(wd, set()) if wd is not None else set()
+        if set_paths:
+            # the directory is watched under another path already, and is up to date
+            d_entries = self._d_views[next(iter(set_paths))].d_entries
+        else:
+            try:
+                d_entries = _list_directory(path)
+            except OSError:
+                if wd is not None:
+                    self._inotify.rm_watch(wd)  # type: ignore
+                lib_path.log_and_raise_if_not_isdir(pathlib.Path(path))
+                raise
+        view = _DirectoryView(path=path, d_entries=d_entries, wd=wd, time_listed=time.monotonic())
+        self._d_views[path] = view
+        if wd is not None:
+            set_paths.add(path)
+            self._d_paths_by_wd[wd] = set_paths
+        return view
+
+    def _remove_view(self, view: _DirectoryView) -> None:
+        self._d_views.pop(view.path, None)
+        if view.wd is not None:
+            set_paths = self._d_paths_by_wd.get(view.wd, set())
+            set_paths.discard(view.path)
+            if not set_paths:
+                self._d_paths_by_wd.pop(view.wd, None)
+                self._inotify.rm_watch(view.wd)  # type: ignore
+
+    def _remove_views(self, l_views: List[_DirectoryView]) -> List[str]:
+        """
+        removes the views, and the views of the same directories under other paths - they share the entries.
+        afterwards no watch descriptor of these directories is left, so they are listed again when they are added.
+        returns the paths of all removed views
+        """
+        set_paths_removed = {view.path for view in l_views}
+        for view in l_views:
+            if view.wd is not None:
+                set_paths_removed.update(self._d_paths_by_wd.get(view.wd, set()))
+        l_paths_removed = sorted(set_paths_removed)
+        for path in l_paths_removed:
+            view = self._d_views.get(path)
+            if view is not None:
+                self._remove_view(view)
+        return l_paths_removed
+
+    def _read_events(self) -> None:
+        assert self._inotify is not None
+        with selectors.DefaultSelector() as selector:
+            selector.register(self._inotify.fd, selectors.EVENT_READ)
+            selector.register(self._wakeup_fd_read, selectors.EVENT_READ)
+            while True:
+                l_ready_fds = [key.fd for key, _ in selector.select()]
+                if self._wakeup_fd_read in l_ready_fds:
+                    return
+                try:
+                    data = os.read(self._inotify.fd, _READ_SIZE)
+                except OSError as exc:
+                    logger.error(f'reading inotify events failed, all directories are listed again: {exc}')
+                    self.invalidate()
+                    continue
+                with self._lock:
+                    self._process_events(data)
+
+    def _process_events(self, data: bytes) -> None:
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_length].rstrip(b'\0'))
+            offset += name_length
+
+            if mask & _IN_Q_OVERFLOW:
+                # events were lost - list all watched directories again, after all watches are removed
+                for path in self._remove_views(list(self._d_views.values())):
+                    try:
+                        self._add_view(path)
+                    except OSError:
+                        pass
+                continue
+            set_paths = self._d_paths_by_wd.get(wd)
+            if not set_paths:
+                continue
+            view = self._d_views[next(iter(set_paths))]
+            if mask & (_IN_DELETE_SELF | _IN_MOVE_SELF | _IN_IGNORED):
+                # the directory is gone (or has another path now) - the next query lists it again, or raises
+                del self._d_paths_by_wd[wd]
+                for path in set_paths:
+                    del self._d_views[path]
+                if not mask & _IN_IGNORED:
+                    self._inotify.rm_watch(wd)  # type: ignore
+            elif mask & (_IN_DELETE | _IN_MOVED_FROM):
+                view.d_entries.pop(name, None)
+            elif mask & (_IN_CREATE | _IN_MOVED_TO):
+                # symlinks to directories count as directories, like has_subdirs
+                view.d_entries[name] = bool(mask & _IN_ISDIR) or os.path.isdir(os.path.join(view.path, name))
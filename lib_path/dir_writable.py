@@ -0,0 +1,185 @@
+# STDLIB
+import collections
+import concurrent.futures
+import errno
+import os
+import pathlib
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple, Union
+
+# PROJ
+try:
+    from . import lib_path
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import lib_path                         # type: ignore  # pragma: no cover
+
+# cached writability checks for directories.
+# the result is cached for ttl_seconds, keyed by the directory and its device, inode, mode and owner -
+# if the directory is replaced or its permissions change, the cached result is not used.
+# the cache holds at most maxsize directories, the least recently used are dropped first.
+
+DEFAULT_WRITABLE_TTL_SECONDS = 10.0
+DEFAULT_WRITABLE_CACHE_MAXSIZE = 65536
+DEFAULT_MAX_WORKERS = 8
+
+# O_TMPFILE creates an unnamed file, which vanishes on close - a real write test without create / unlink
+_O_TMPFILE = getattr(os, 'O_TMPFILE', 0)
+# filesystems or kernels without O_TMPFILE support - ENOENT is a missing directory, not a missing O_TMPFILE support
+_O_TMPFILE_NOT_SUPPORTED_ERRNOS = {errno.EOPNOTSUPP, errno.EISDIR, errno.EINVAL}
+
+_DirectoryKey = Tuple[int, int, int, int, int]
+
+
+class WritabilityOracle(object):
+    """
+    cached, cheap writability checks for many directories - thread safe.
+
+    ttl_seconds:        how long a result is valid
+    maxsize:            the maximum number of cached directories
+    use_access_check:   use os.access instead of a real write test.
+                        fast, but not reliable on network filesystems, with ACLs or for root - therefore off by default
+    use_tmpfile:        on linux, use an unnamed O_TMPFILE file as write test where the filesystem supports it,
+                        otherwise the write test of lib_path.is_directory_writable (create / remove a file) is used
+
+    >>> # Setup
+    >>> import tempfile
+    >>> path_temp_dir = pathlib.Path(tempfile.mkdtemp())
+    >>> oracle = WritabilityOracle(ttl_seconds=60)
+
+    >>> # Test
+    >>> oracle.is_writable(path_temp_dir)
+    True
+    >>> oracle.is_writable(path_temp_dir)
+    True
+    >>> oracle.n_hits, oracle.n_misses
+    (1, 1)
+    >>> oracle.is_writable(path_temp_dir / 'does_not_exist')
+    False
+    >>> oracle.are_writable([path_temp_dir, path_temp_dir / 'does_not_exist', str(path_temp_dir)])
+    [True, False, True]
+
+    >>> # Test invalidation
+    >>> oracle.invalidate(path_temp_dir)
+    >>> oracle.is_writable(path_temp_dir)
+    True
+    >>> oracle.n_misses
+    2
+    >>> oracle.invalidate()
+
+    >>> # Test the cache is bounded
+    >>> small_oracle = WritabilityOracle(maxsize=1)
+    >>> small_oracle.are_writable([path_temp_dir, path_temp_dir.parent], max_workers=1)
+    [True, True]
+    >>> small_oracle.cache_size
+    1
+
+    >>> # Teardown
+    >>> path_temp_dir.rmdir()
+
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_WRITABLE_TTL_SECONDS, use_access_check: bool = False, use_tmpfile: bool = True,
+                 maxsize: int = DEFAULT_WRITABLE_CACHE_MAXSIZE) -> None:
+        if maxsize < 0:
+            raise ValueError(f'maxsize must be >= 0, got {maxsize}')
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self.use_access_check = use_access_check
+        self.use_tmpfile = use_tmpfile and bool(_O_TMPFILE)
+        self.n_hits = 0
+        self.n_misses = 0
+        # directory -> (directory key, monotonic expiry time, is writable), the least recently used first
+        self._d_cache: 'collections.OrderedDict[str, Tuple[_DirectoryKey, float, bool]]' = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_writable(self, directory: Union[str, pathlib.Path]) -> bool:
+        s_directory = str(directory)
+        try:
+            stat_result = os.stat(s_directory)
+        except OSError:
+            return False
+        directory_key = (stat_result.st_dev, stat_result.st_ino, stat_result.st_mode, stat_result.st_uid, stat_result.st_gid)
+        now = time.monotonic()
+
+        with self._lock:
+            cached = self._d_cache.get(s_directory)
+            if cached is not None and cached[0] == directory_key and cached[1] > now:
+                self._d_cache.move_to_end(s_directory)
+                self.n_hits += 1
+                return cached[2]
+            self.n_misses += 1
+
+        is_writable = self._check_writable(s_directory)
+        with self._lock:
+            if self.maxsize > 0:
+                self._d_cache[s_directory] = (directory_key, now + self.ttl_seconds, is_writable)
+                self._d_cache.move_to_end(s_directory)
+                while len(self._d_cache) > self.maxsize:
+                    self._d_cache.popitem(last=False)
+        return is_writable
+
+    @property
+    def cache_size(self) -> int:
+        """ the number of cached directories """
+        with self._lock:
+            return len(self._d_cache)
+
+    def are_writable(self, directories: Iterable[Union[str, pathlib.Path]], max_workers: int = DEFAULT_MAX_WORKERS) -> List[bool]:
+        """ checks many directories concurrently, the results are in the order of directories """
+        l_directories = list(directories)
+        if max_workers <= 1 or len(l_directories) <= 1:
+            return [self.is_writable(directory) for directory in l_directories]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(l_directories))) as executor:
+            return list(executor.map(self.is_writable, l_directories))
+
+    def invalidate(self, directory: Optional[Union[str, pathlib.Path]] = None) -> None:
+        """ forget the cached result of one directory, or of all directories if directory is None """
+        with self._lock:
+            if directory is None:
+                self._d_cache.clear()
+            else:
+                self._d_cache.pop(str(directory), None)
+
+    def _check_writable(self, directory: str) -> bool:
+        if self.use_access_check:
+            return os.access(directory, os.W_OK | os.X_OK)
+        if self.use_tmpfile:
+            try:
+                os.close(os.open(directory, _O_TMPFILE | os.O_WRONLY, 0o600))
+                return True
+            except OSError as exc:
+                if exc.errno not in _O_TMPFILE_NOT_SUPPORTED_ERRNOS:
+                    return False
+        return lib_path.is_directory_writable(directory)
+
+
+_default_writability_oracle = WritabilityOracle()
+
+
+def is_directory_writable_cached(directory: Union[str, pathlib.Path]) -> bool:
+    """
+    like lib_path.is_directory_writable, but the result is cached for DEFAULT_WRITABLE_TTL_SECONDS
+
+    >>> import tempfile
+    >>> is_directory_writable_cached(tempfile.gettempdir())
+    True
+    """
+    return _default_writability_oracle.is_writable(directory)
+
+
+def are_directories_writable(directories: Iterable[Union[str, pathlib.Path]], max_workers: int = DEFAULT_MAX_WORKERS) -> List[bool]:
+    """
+    checks many directories concurrently, with the cache of is_directory_writable_cached
+
+    >>> import tempfile
+    >>> are_directories_writable([tempfile.gettempdir(), '/does/not/exist'])
+    [True, False]
+    """
+    return _default_writability_oracle.are_writable(directories, max_workers=max_workers)
+
+
+def invalidate_directory_writable_cache(directory: Optional[Union[str, pathlib.Path]] = None) -> None:
+    """ forget the cached result of one directory, or of all directories if directory is None """
+    _default_writability_oracle.invalidate(directory)
@@ -0,0 +1,253 @@
+# STDLIB
+import logging
+import os
+import pathlib
+import stat
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple, Union
+
+logger = logging.getLogger()
+
+# parallel disk usage (like du) - apparent size (st_size) and allocated size (st_blocks * 512).
+# files with more than one hardlink are counted once, by (st_dev, st_ino) - the first path in sorted order gets them.
+# symlinks are not followed, the symlink itself is counted. directories count with their own size, like du.
+#
+# the optional DiskUsageCache keeps the usage of the entries of every directory, keyed by the (device, inode, mtime) of the directory.
+# the mtime of a directory changes when entries are added, removed or renamed - NOT when a file grows or shrinks.
+# use max_age_seconds of the cache to limit how old the sizes of changed files can get.
+
+DEFAULT_MAX_WORKERS = 8
+
+
+class DiskUsage(NamedTuple):
+    path: str
+    apparent_size: int                          # sum of st_size
+    allocated_size: int                         # sum of st_blocks * 512
+    n_files: int                                # everything which is not a directory - files, symlinks, special files
+    n_directories: int                          # directories below path
+    sub_directories: Dict[str, 'DiskUsage']     # the usage of the subdirectories, by name - up to breakdown_depth
+
+
+class DiskUsageReport(NamedTuple):
+    usage: DiskUsage
+    n_directories_scanned: int
+    n_directories_cached: int                   # directories which were taken from the cache - only stat-ed
+    n_hardlinks_deduplicated: int               # hardlinks which were not counted again
+    errors: List[OSError]
+
+
+_HardlinkedFile = Tuple[int, int, int, int]     # st_dev, st_ino, apparent size, allocated size
+
+
+class _DirectoryUsage(NamedTuple):
+    """ the usage of the directory itself and of its entries which are not directories """
+    apparent_size: int
+    allocated_size: int
+    n_files: int
+    hardlinked_files: List[_HardlinkedFile]    # counted when merging, only once
+    sub_directories: List[Tuple[str, int]]      # (name, st_dev)
+
+
+class DiskUsageCache(object):
+    """
+    thread safe cache of the directory usages for get_disk_usage, keyed by the device, inode and mtime of the directories
+
+    max_age_seconds:    entries older than that are not used - None: no limit
+    """
+
+    def __init__(self, max_age_seconds: Optional[float] = None) -> None:
+        self.max_age_seconds = max_age_seconds
+        self._d_cache: Dict[str, Tuple[Tuple[int, int, int], float, _DirectoryUsage]] = dict()
+        self._lock = threading.Lock()
+
+    def _get(self, path_directory: str, stat_result: os.stat_result) -> Optional[_DirectoryUsage]:
+        with self._lock:
+            cached = self._d_cache.get(path_directory)
+        if cached is None:
+            return None
+        key, time_cached, directory_usage = cached
+        if key != (stat_result.st_dev, stat_result.st_ino, stat_result.st_mtime_ns):
+            return None
+        if self.max_age_seconds is not None and time.monotonic() - time_cached > self.max_age_seconds:
+            return None
+        return directory_usage
+
+    def _set(self, path_directory: str, stat_result: os.stat_result, directory_usage: _DirectoryUsage) -> None:
+        with self._lock:
+            self._d_cache[path_directory] = ((stat_result.st_dev, stat_result.st_ino, stat_result.st_mtime_ns), time.monotonic(), directory_usage)
+
+    def invalidate(self, path_directory: Optional[Union[str, pathlib.Path]] = None) -> None:
+        """ forgets the directory and the directories below it - or everything, if path_directory is None """
+        with self._lock:
+            if path_directory is None:
+                self._d_cache.clear()
+                return
+            s_path = os.path.abspath(str(path_directory))
+            for path in [path for path in self._d_cache if path == s_path or path.startswith(s_path.rstrip(os.sep) + os.sep)]:
+                del self._d_cache[path]
+
+    def __len__(self) -> int:
+        return len(self._d_cache)
+
+
+def _scan_directory(path_directory: str, cache: Optional[DiskUsageCache]) -> Tuple[Optional[_DirectoryUsage], bool, List[OSError]]:
+    """ returns (the usage or None if the directory can not be stat-ed, is from cache, errors) """
+    try:
+        stat_directory = os.stat(path_directory)
+    except OSError as exc:
+        return None, False, [exc]
+    if cache is not None:
+        directory_usage = cache._get(path_directory, stat_directory)
+        if directory_usage is not None:
+            return directory_usage, True, []
+
+    errors: List[OSError] = []
+    apparent_size = stat_directory.st_size
+    allocated_size = stat_directory.st_blocks * 512
+    n_files = 0
+    l_hardlinked_files: List[_HardlinkedFile] = []
+    l_sub_directories: List[Tuple[str, int]] = []
+    try:
+        with os.scandir(path_directory) as it_dir_entries:
+            for dir_entry in it_dir_entries:
+                try:
+                    stat_entry = dir_entry.stat(follow_symlinks=False)
+                except OSError as exc:
+                    errors.append(exc)
+                    continue
+                if stat.S_ISDIR(stat_entry.st_mode):
+                    l_sub_directories.append((dir_entry.name, stat_entry.st_dev))
+                    continue
+                n_files += 1
+                if stat_entry.st_nlink > 1:
+                    l_hardlinked_files.append((stat_entry.st_dev, stat_entry.st_ino, stat_entry.st_size, stat_entry.st_blocks * 512))
+                else:
+                    apparent_size += stat_entry.st_size
+                    allocated_size += stat_entry.st_blocks * 512
+    except OSError as exc:
+        # the directory itself is counted, the entries we could not read are not
+        errors.append(exc)
+
+    directory_usage = _DirectoryUsage(apparent_size=apparent_size, allocated_size=allocated_size, n_files=n_files,
+                                      hardlinked_files=l_hardlinked_files, sub_directories=l_sub_directories)
+    if cache is not None and not errors:
+        cache._set(path_directory, stat_directory, directory_usage)
+    return directory_usage, False, errors
+
+
+def get_disk_usage(path_root_directory: Union[str, pathlib.Path],
+                   one_filesystem: bool = False,
+                   breakdown_depth: int = 1,
+                   max_workers: int = DEFAULT_MAX_WORKERS,
+                   cache: Optional[DiskUsageCache] = None) -> DiskUsageReport:
+    """
+    the disk usage of a directory tree, with a breakdown per subdirectory.
+    the directories are read in parallel threads (max_workers), errors are collected in the report.
+
+    one_filesystem:     do not descend into directories on other filesystems (mount points), like du -x
+    breakdown_depth:    the depth of DiskUsage.sub_directories - 0: no breakdown, 1: the subdirectories of the root, ...
+    cache:              a DiskUsageCache - directories with an unchanged mtime are only stat-ed
+
+    >>> # Setup
+    >>> import tempfile, shutil
+    >>> path_temp_dir = pathlib.Path(tempfile.mkdtemp())
+    >>> (path_temp_dir / 'a' / 'aa').mkdir(parents=True)
+    >>> (path_temp_dir / 'b').mkdir()
+    >>> (path_temp_dir / 'a' / 'aa' / 'file.txt').write_bytes(b'x' * 1000)
+    1000
+    >>> os.link(path_temp_dir / 'a' / 'aa' / 'file.txt', path_temp_dir / 'b' / 'hardlink.txt')
+    >>> size_directory = os.stat(path_temp_dir).st_size
+
+    >>> # Test
+    >>> cache = DiskUsageCache()
+    >>> report = get_disk_usage(path_temp_dir, breakdown_depth=2, cache=cache)
+    >>> usage = report.usage
+    >>> usage.apparent_size == 4 * size_directory + 1000, usage.n_files, usage.n_directories, report.n_hardlinks_deduplicated
+    (True, 2, 3, 1)
+    >>> usage.allocated_size >= 1000
+    True
+    >>> sorted(usage.sub_directories), sorted(usage.sub_directories['a'].sub_directories)
+    (['a', 'b'], ['aa'])
+    >>> usage.sub_directories['a'].apparent_size == 2 * size_directory + 1000, usage.sub_directories['b'].apparent_size == size_directory
+    (True, True)
+
+    >>> # Test cached
+    >>> report = get_disk_usage(path_temp_dir, breakdown_depth=2, cache=cache)
+    >>> report.n_directories_scanned, report.n_directories_cached, report.usage == usage
+    (0, 4, True)
+
+    >>> # Teardown
+    >>> shutil.rmtree(str(path_temp_dir))
+
+    """
+    import concurrent.futures
+    s_root_directory = os.path.abspath(str(path_root_directory))
+    root_dev = os.stat(s_root_directory).st_dev
+    d_directory_usages: Dict[str, _DirectoryUsage] = dict()
+    errors: List[OSError] = []
+    n_scanned = n_cached = 0
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(max_workers, 1), thread_name_prefix='lib_path_du') as executor:
+        d_pending = {executor.submit(_scan_directory, s_root_directory, cache): s_root_directory}
+        while d_pending:
+            set_done, _ = concurrent.futures.wait(d_pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in set_done:
+                path_directory = d_pending.pop(future)
+                directory_usage, is_cached, l_errors = future.result()
+                errors.extend(l_errors)
+                if directory_usage is None:
+                    continue
+                if is_cached:
+                    n_cached += 1
+                else:
+                    n_scanned += 1
+                d_directory_usages[path_directory] = directory_usage
+                for name, dev in directory_usage.sub_directories:
+                    if not one_filesystem or dev == root_dev:
+                        path_sub_directory = os.path.join(path_directory, name)
+                        d_pending[executor.submit(_scan_directory, path_sub_directory, cache)] = path_sub_directory
+
+    # hardlinks: the first directory in sorted order gets them, the order of the threads does not matter
+    set_counted_files: Set[Tuple[int, int]] = set()
+    n_hardlinks_deduplicated = 0
+    # path -> [apparent size, allocated size, n_files, n_directories] of the subtree
+    d_totals: Dict[str, List[int]] = dict()
+    for path_directory in sorted(d_directory_usages):
+        directory_usage = d_directory_usages[path_directory]
+        totals = [directory_usage.apparent_size, directory_usage.allocated_size, directory_usage.n_files, 0]
+        for dev, ino, apparent_size, allocated_size in directory_usage.hardlinked_files:
+            if (dev, ino) in set_counted_files:
+                n_hardlinks_deduplicated += 1
+                continue
+            set_counted_files.add((dev, ino))
+            totals[0] += apparent_size
+            totals[1] += allocated_size
+        d_totals[path_directory] = totals
+
+    # sum up the subtrees, the deepest directories first
+    for path_directory in sorted(d_totals, key=lambda path: path.count(os.sep), reverse=True):
+        if path_directory == s_root_directory:
+            continue
+        parent_totals = d_totals[os.path.dirname(path_directory)]
+        totals = d_totals[path_directory]
+        parent_totals[0] += totals[0]
+        parent_totals[1] += totals[1]
+        parent_totals[2] += totals[2]
+        parent_totals[3] += totals[3] + 1
+
+    def get_usage(path_directory: str, depth: int) -> DiskUsage:
+        apparent_size, allocated_size, n_files, n_directories = d_totals[path_directory]
+        d_sub_directories: Dict[str, DiskUsage] = dict()
+        if depth < breakdown_depth:
+            for name, _ in d_directory_usages[path_directory].sub_directories:
+                path_sub_directory = os.path.join(path_directory, name)
+                if path_sub_directory in d_totals:
+                    d_sub_directories[name] = get_usage(path_sub_directory, depth + 1)
+        return DiskUsage(path=path_directory, apparent_size=apparent_size, allocated_size=allocated_size, n_files=n_files,
+                         n_directories=n_directories, sub_directories=d_sub_directories)
+
+    if errors:
+        logger.warning(f'{len(errors)} errors reading the disk usage of "{s_root_directory}", the first error: {errors[0]}')
+    return DiskUsageReport(usage=get_usage(s_root_directory, 0), n_directories_scanned=n_scanned, n_directories_cached=n_cached,
+                           n_hardlinks_deduplicated=n_hardlinks_deduplicated, errors=errors)
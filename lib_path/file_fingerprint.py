@@ -0,0 +1,318 @@
+# STDLIB
+import errno
+import hashlib
+import logging
+import os
+import pathlib
+import sqlite3
+import stat
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+# PROJ
+try:
+    from . import dir_snapshot
+    from . import path_filter as path_filter_module
+    from . import tree_walk
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import dir_snapshot                     # type: ignore  # pragma: no cover
+    import path_filter as path_filter_module  # type: ignore  # pragma: no cover
+    import tree_walk                        # type: ignore  # pragma: no cover
+
+logger: logging.Logger = logging.getLogger()
+
+# content fingerprints (hashes) of files, hashed in parallel threads - hashlib and the reads release the GIL, so the threads use all cores.
+# the files are read with large buffered reads into one reused buffer. no mmap - a file truncated by another process while it is mapped
+# kills the process with SIGBUS.
+# the optional FingerprintCache (sqlite) keeps the fingerprints keyed by (st_dev, st_ino, size, mtime_ns) - unchanged files are never read again.
+
+DEFAULT_HASH_ALGORITHM = 'blake2b'
+FINGERPRINT_CACHE_FORMAT_VERSION = '1'
+READ_BUFFER_SIZE = 1 << 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS fingerprints (dev INTEGER NOT NULL, ino INTEGER NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,
+                                         fingerprint TEXT NOT NULL, PRIMARY KEY (dev, ino)) WITHOUT ROWID;
+"""
+
+_FileKey = Tuple[int, int, int, int]    # st_dev, st_ino, size, mtime_ns
+
+
+class FingerprintReport(NamedTuple):
+    fingerprints: Dict[str, str]        # path -> hex digest, for the files which could be read
+    n_files_hashed: int
+    n_files_cached: int                 # taken from the cache, not read
+    n_bytes_hashed: int
+    errors: List[OSError]
+
+
+class DuplicateReport(NamedTuple):
+    duplicates: List[List[str]]         # groups of files with the same content, sorted
+    n_files: int                        # regular files found
+    n_files_same_size: int              # files which had to be fingerprinted, because another file has the same size
+    fingerprint_report: FingerprintReport
+
+
+def _get_file_key(stat_result: os.stat_result) -> _FileKey:
+    return stat_result.st_dev, stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns
+
+
+class FingerprintCache(object):
+    """
+    persistent fingerprints in path_cache_file (sqlite), keyed by (st_dev, st_ino, size, mtime_ns) - None: in memory only.
+    files modified within racy_window_seconds before hashing are not cached, they might change again within the same mtime tick.
+    the cache is used by the calling thread only, the worker threads just hash.
+    """
+
+    def __init__(self, path_cache_file: Optional[Union[str, pathlib.Path]] = None, algorithm: str = DEFAULT_HASH_ALGORITHM,
+                 racy_window_seconds: float = dir_snapshot.DEFAULT_RACY_WINDOW_SECONDS) -> None:
+        hashlib.new(algorithm)      # ValueError for unknown algorithms
+        self.path_cache_file = None if path_cache_file is None else pathlib.Path(path_cache_file)
+        self.algorithm = algorithm
+        self.racy_window_seconds = racy_window_seconds
+        self._connection = sqlite3.connect(':memory:' if self.path_cache_file is None else str(self.path_cache_file))
+        try:
+            self._connection.executescript(_SCHEMA)
+            self._check_meta()
+        except Exception:
+            self._connection.close()
+            raise
+
+    def _check_meta(self) -> None:
+        d_meta = dict(self._connection.execute('SELECT key, value FROM meta').fetchall())
+        if not d_meta:
+            with self._connection:
+                self._connection.executemany('INSERT INTO meta (key, value) VALUES (?, ?)',
+                                             [('version', FINGERPRINT_CACHE_FORMAT_VERSION), ('algorithm', self.algorithm)])
+            return
+        if d_meta.get('version') != FINGERPRINT_CACHE_FORMAT_VERSION:
+            raise ValueError(f'the fingerprint cache "{self.path_cache_file}" has the format version "{d_meta.get("version")}", '
+                             f'expected "{FINGERPRINT_CACHE_FORMAT_VERSION}"')
+        if d_meta.get('algorithm') != self.algorithm:
+            raise ValueError(f'the fingerprint cache "{self.path_cache_file}" was made with "{d_meta.get("algorithm")}", not with "{self.algorithm}"')
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> 'FingerprintCache':
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return int(self._connection.execute('SELECT COUNT(*) FROM fingerprints').fetchone()[0])
+
+    def _get(self, file_key: _FileKey) -> Optional[str]:
+        row = self._connection.execute('SELECT size, mtime_ns, fingerprint FROM fingerprints WHERE dev = ? AND ino = ?', file_key[:2]).fetchone()
+        if row is None or (row[0], row[1]) != file_key[2:]:
+            return None
+        return str(row[2])
+
+    def _set_many(self, l_fingerprints: List[Tuple[_FileKey, str]]) -> None:
+        racy_mtime_ns = time.time_ns() - int(self.racy_window_seconds * 1e9)
+        with self._connection:
+            self._connection.executemany('INSERT OR REPLACE INTO fingerprints (dev, ino, size, mtime_ns, fingerprint) VALUES (?, ?, ?, ?, ?)',
+                                         [file_key + (fingerprint, ) for file_key, fingerprint in l_fingerprints if file_key[3] < racy_mtime_ns])
+
+
+def _hash_file(path_file: str, algorithm: str) -> Tuple[str, Optional[_FileKey], int]:
+    """ returns (hex digest, the key of the file or None if it changed while hashing, bytes read) """
+    hash_object = hashlib.new(algorithm)
+    n_bytes = 0
+    with open(path_file, 'rb', buffering=0) as file:
+        stat_before = os.fstat(file.fileno())
+        # small files in one read, large files in READ_BUFFER_SIZE reads into the same buffer
+        buffer = bytearray(min(stat_before.st_size + 1, READ_BUFFER_SIZE))
+        view = memoryview(buffer)
+        while True:
+            n_read = file.readinto(buffer)
+            if not n_read:
+                break
+            hash_object.update(view[:n_read])
+            n_bytes += n_read
+        stat_after = os.fstat(file.fileno())
+    file_key: Optional[_FileKey] = _get_file_key(stat_after)
+    if file_key != _get_file_key(stat_before) or n_bytes != stat_after.st_size:
+        file_key = None
+    return hash_object.hexdigest(), file_key, n_bytes
+
+
+def hash_file(path_file: Union[str, pathlib.Path], algorithm: str = DEFAULT_HASH_ALGORITHM) -> str:
+    """
+    the hex digest of the content of a file
+
+    >>> hash_file(pathlib.Path(__file__).parent.parent / 'tests' / 'test_a' / 'file_test_a_1.txt', algorithm='md5')
+    'd41d8cd98f00b204e9800998ecf8427e'
+    """
+    return _hash_file(str(path_file), algorithm)[0]
+
+
+def _get_fingerprints_of_files(l_files: List[Tuple[str, os.stat_result]], cache: Optional[FingerprintCache], algorithm: str,
+                               max_workers: Optional[int], errors: List[OSError]) -> FingerprintReport:
+    d_fingerprints: Dict[str, str] = dict()
+    # hardlinks are hashed once
+    d_paths_to_hash: Dict[Tuple[int, int], List[str]] = dict()
+    n_cached = 0
+    for path_file, stat_result in l_files:
+        file_key = _get_file_key(stat_result)
+        fingerprint = None if cache is None else cache._get(file_key)
+        if fingerprint is not None:
+            d_fingerprints[path_file] = fingerprint
+            n_cached += 1
+        else:
+            d_paths_to_hash.setdefault(file_key[:2], []).append(path_file)
+
+    n_hashed = n_bytes_hashed = 0
+    l_new_fingerprints: List[Tuple[_FileKey, str]] = []
+    if d_paths_to_hash:
+        import concurrent.futures
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='lib_path_fingerprint') as executor:
+            d_futures = {executor.submit(_hash_file, l_paths[0], algorithm): l_paths for l_paths in d_paths_to_hash.values()}
+            for future in concurrent.futures.as_completed(d_futures):
+                l_paths = d_futures[future]
+                try:
+                    fingerprint, file_key, n_bytes = future.result()
+                except OSError as exc:
+                    errors.append(exc)
+                    continue
+                n_hashed += 1
+                n_bytes_hashed += n_bytes
+                d_fingerprints.update(dict.fromkeys(l_paths, fingerprint))
+                if file_key is not None:
+                    l_new_fingerprints.append((file_key, fingerprint))
+    if cache is not None and l_new_fingerprints:
+        cache._set_many(l_new_fingerprints)
+
+    if errors:
+        logger.warning(f'{len(errors)} files could not be fingerprinted, the first error: {errors[0]}')
+    return FingerprintReport(fingerprints=d_fingerprints, n_files_hashed=n_hashed, n_files_cached=n_cached, n_bytes_hashed=n_bytes_hashed,
+                             errors=errors)
+
+
+def _get_algorithm(algorithm: Optional[str], cache: Optional[FingerprintCache]) -> str:
+    if cache is None:
+        return algorithm or DEFAULT_HASH_ALGORITHM
+    if algorithm is not None and algorithm != cache.algorithm:
+        raise ValueError(f'the algorithm "{algorithm}" does not match the algorithm "{cache.algorithm}" of the cache')
+    return cache.algorithm
+
+
+def get_fingerprints(paths: Iterable[Union[str, pathlib.Path]],
+                     cache: Optional[FingerprintCache] = None,
+                     algorithm: Optional[str] = None,
+                     max_workers: Optional[int] = None) -> FingerprintReport:
+    """
+    the fingerprints of files, hashed in parallel threads (max_workers, default like ThreadPoolExecutor).
+    errors, and paths which are not regular files, are collected in the report.
+
+    algorithm:      a hashlib algorithm, default DEFAULT_HASH_ALGORITHM or the algorithm of the cache
+
+    >>> # Setup
+    >>> import tempfile, shutil
+    >>> path_temp_dir = pathlib.Path(tempfile.mkdtemp())
+    >>> for name, content in (('a.txt', b'same'), ('b.txt', b'same'), ('c.txt', b'other')):
+    ...     _ = (path_temp_dir / name).write_bytes(content)
+    >>> for name in ('a.txt', 'b.txt', 'c.txt'):
+    ...     os.utime(str(path_temp_dir / name), ns=(10 ** 18, 10 ** 18))
+    >>> l_paths = [path_temp_dir / name for name in ('a.txt', 'b.txt', 'c.txt', 'does_not_exist')]
+
+    >>> # Test
+    >>> cache = FingerprintCache(path_temp_dir / 'fingerprints.sqlite')
+    >>> report = get_fingerprints(l_paths, cache=cache)
+    >>> len(set(report.fingerprints.values())), report.n_files_hashed, report.n_files_cached, report.n_bytes_hashed, len(report.errors)
+    (2, 3, 0, 13, 1)
+    >>> cache.close()
+
+    >>> # Test cached - the files are not read again
+    >>> with FingerprintCache(path_temp_dir / 'fingerprints.sqlite') as cache:
+    ...     report_cached = get_fingerprints(l_paths[:3], cache=cache)
+    >>> report_cached.n_files_hashed, report_cached.n_files_cached, report_cached.fingerprints == report.fingerprints
+    (0, 3, True)
+
+    >>> # Test wrong algorithm
+    >>> FingerprintCache(path_temp_dir / 'fingerprints.sqlite', algorithm='md5')
+    Traceback (most recent call last):
+    ...
+    ValueError: the fingerprint cache "...fingerprints.sqlite" was made with "blake2b", not with "md5"
+
+    >>> # Teardown
+    >>> shutil.rmtree(str(path_temp_dir))
+
+    """
+    algorithm = _get_algorithm(algorithm, cache)
+    errors: List[OSError] = []
+    l_files: List[Tuple[str, os.stat_result]] = []
+    for path in paths:
+        s_path = str(path)
+        try:
+            stat_result = os.stat(s_path)
+        except OSError as exc:
+            errors.append(exc)
+            continue
+        if not stat.S_ISREG(stat_result.st_mode):
+            errors.append(OSError(errno.EINVAL, 'not a regular file', s_path))
+            continue
+        l_files.append((s_path, stat_result))
+    return _get_fingerprints_of_files(l_files, cache, algorithm, max_workers, errors)
+
+
+def find_duplicate_files(path_root_directory: Union[str, pathlib.Path],
+                         cache: Optional[FingerprintCache] = None,
+                         algorithm: Optional[str] = None,
+                         min_size: int = 1,
+                         max_workers: Optional[int] = None,
+                         path_filter: Optional['path_filter_module.PathFilter'] = None) -> DuplicateReport:
+    """
+    finds the files with the same content below path_root_directory (symlinks are not followed).
+    the files are grouped by size first - only files with the same size as another file are fingerprinted.
+    hardlinks of the same file are reported as duplicates, but read only once.
+
+    min_size:       smaller files are ignored - by default the empty files
+    path_filter:    a PathFilter for the walk, see walk_tree
+
+    >>> # Setup
+    >>> import tempfile, shutil
+    >>> path_temp_dir = pathlib.Path(tempfile.mkdtemp())
+    >>> (path_temp_dir / 'sub').mkdir()
+    >>> for name, content in (('a.txt', b'same'), ('sub/b.txt', b'same'), ('c.txt', b'diff'), ('d.txt', b'unique size')):
+    ...     _ = (path_temp_dir / name).write_bytes(content)
+
+    >>> # Test
+    >>> report = find_duplicate_files(path_temp_dir)
+    >>> [[os.path.relpath(path, str(path_temp_dir)) for path in group] for group in report.duplicates]
+    [['a.txt', 'sub/b.txt']]
+    >>> report.n_files, report.n_files_same_size, report.fingerprint_report.n_files_hashed
+    (4, 3, 3)
+
+    >>> # Teardown
+    >>> shutil.rmtree(str(path_temp_dir))
+
+    """
+    algorithm = _get_algorithm(algorithm, cache)
+    errors: List[OSError] = []
+    d_files_by_size: Dict[int, List[Tuple[str, os.stat_result]]] = dict()
+    n_files = 0
+    for walk_result in tree_walk.walk_tree(path_root_directory, with_stat=True, path_filter=path_filter,
+                                           max_workers=max_workers or tree_walk.DEFAULT_MAX_WORKERS):
+        if walk_result.error is not None:
+            errors.append(walk_result.error)
+        for entry in walk_result.entries:
+            if entry.stat is None or not stat.S_ISREG(entry.stat.st_mode):
+                continue
+            n_files += 1
+            if entry.stat.st_size >= min_size:
+                d_files_by_size.setdefault(entry.stat.st_size, []).append((entry.path, entry.stat))
+
+    l_files_same_size = [file for l_files in d_files_by_size.values() if len(l_files) > 1 for file in l_files]
+    fingerprint_report = _get_fingerprints_of_files(l_files_same_size, cache, algorithm, max_workers, errors)
+
+    d_paths_by_content: Dict[Tuple[int, str], List[str]] = dict()
+    for path_file, stat_result in l_files_same_size:
+        fingerprint = fingerprint_report.fingerprints.get(path_file)
+        if fingerprint is not None:
+            d_paths_by_content.setdefault((stat_result.st_size, fingerprint), []).append(path_file)
+    l_duplicates = sorted(sorted(l_paths) for l_paths in d_paths_by_content.values() if len(l_paths) > 1)
+    return DuplicateReport(duplicates=l_duplicates, n_files=n_files, n_files_same_size=len(l_files_same_size), fingerprint_report=fingerprint_report)
@@ -0,0 +1,353 @@
+# STDLIB
+import atexit
+import contextlib
+import functools
+import importlib
+import inspect
+import json
+import os
+import pathlib
+import pkgutil
+import threading
+import time
+import types
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+# opt-in instrumentation of the lib_path functions: call counts, latency histograms and filesystem operation counts.
+#
+# enable_instrumentation replaces the public functions and the public methods of the public classes of all lib_path modules
+# (and the names in the lib_path package) with measuring wrappers.
+# the filesystem operations are counted by replacing the name "os" in the namespace of the lib_path modules with a counting
+# stand-in - the os module itself is not changed, other code in the process is neither slowed down nor affected.
+# disable_instrumentation puts the original functions back - when disabled, nothing is wrapped and nothing costs.
+#
+# notes:
+#   - references taken before enabling (from lib_path import path_join_posix) are not measured
+#   - generator and coroutine functions (like iter_directory_entries or walk_tree) are not measured themselves,
+#     but their filesystem operations are counted for the calling lib_path function
+#   - filesystem operations are counted for every lib_path function on the call stack of the current thread (inclusive).
+#     only the os calls of the lib_path modules are counted - not the calls within pathlib, shutil or other libraries
+
+# these modules are not instrumented - the instrumentation itself, the cli, and the modules without library functions
+_NOT_INSTRUMENTED_MODULE_NAMES = ('instrumentation', 'lib_path_cli', '__init__conf__', '__main__')
+
+# all other modules of the package, found automatically
+INSTRUMENTED_MODULE_NAMES = tuple(sorted(module_info.name for module_info in pkgutil.iter_modules([str(pathlib.Path(__file__).parent)])
+                                         if module_info.name not in _NOT_INSTRUMENTED_MODULE_NAMES))
+
+# os function name -> counted operation name, the functions which do not exist on the platform are skipped
+_D_OS_OPERATIONS = {
+    'stat': 'stat',
+    'lstat': 'lstat',
+    'fstat': 'fstat',
+    'scandir': 'scandir',
+    'listdir': 'listdir',
+    'open': 'open',
+    'remove': 'unlink',
+    'unlink': 'unlink',
+    'rmdir': 'rmdir',
+    'mkdir': 'mkdir',
+    'chmod': 'chmod',
+    'chown': 'chown',
+    'readlink': 'readlink',
+    'symlink': 'symlink',
+    'link': 'link',
+    'rename': 'rename',
+    'replace': 'rename',
+    'utime': 'utime',
+    'copy_file_range': 'copy_file_range',
+    'sendfile': 'sendfile',
+}
+_D_OS_PATH_OPERATIONS = {
+    'realpath': 'realpath',
+}
+
+
+class FunctionStats(object):
+    __slots__ = ('n_calls', 'total_s', 'max_s', 'd_latency_histogram', 'd_fs_operations')
+
+    def __init__(self) -> None:
+        self.n_calls = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        # log2 buckets: key n counts calls with a latency below 2 ** n microseconds
+        self.d_latency_histogram: Dict[int, int] = dict()
+        self.d_fs_operations: Dict[str, int] = dict()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'n_calls': self.n_calls,
+            'total_s': self.total_s,
+            'mean_s': self.total_s / self.n_calls if self.n_calls else 0.0,
+            'max_s': self.max_s,
+            'latency_histogram_us': {f'<{2 ** bucket}': n_calls for bucket, n_calls in sorted(self.d_latency_histogram.items())},
+            'fs_operations': dict(sorted(self.d_fs_operations.items())),
+        }
+
+
+class InstrumentationStats(object):
+    """ the statistics of all measured functions - thread safe """
+
+    def __init__(self) -> None:
+        self._d_function_stats: Dict[str, FunctionStats] = dict()
+        self._lock = threading.Lock()
+
+    def _get_function_stats(self, function_name: str) -> FunctionStats:
+        function_stats = self._d_function_stats.get(function_name)
+        if function_stats is None:
+            function_stats = self._d_function_stats[function_name] = FunctionStats()
+        return function_stats
+
+    def record_call(self, function_name: str, elapsed_s: float) -> None:
+        bucket = int(elapsed_s * 1e6).bit_length()
+        with self._lock:
+            function_stats = self._get_function_stats(function_name)
+            function_stats.n_calls += 1
+            function_stats.total_s += elapsed_s
+            function_stats.max_s = max(function_stats.max_s, elapsed_s)
+            function_stats.d_latency_histogram[bucket] = function_stats.d_latency_histogram.get(bucket, 0) + 1
+
+    def record_fs_operation(self, function_names: Set[str], operation_name: str) -> None:
+        with self._lock:
+            for function_name in function_names:
+                d_fs_operations = self._get_function_stats(function_name).d_fs_operations
+                d_fs_operations[operation_name] = d_fs_operations.get(operation_name, 0) + 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._d_function_stats.clear()
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {function_name: function_stats.as_dict() for function_name, function_stats in sorted(self._d_function_stats.items())}
+
+
+_global_stats = InstrumentationStats()
+_l_active_stats: List[InstrumentationStats] = [_global_stats]
+_thread_local = threading.local()
+_enable_lock = threading.Lock()
+# (namespace, attribute name, original object)
+_l_patched: List[Tuple[Any, str, Any]] = []
+
+
+def _get_call_stack() -> List[str]:
+    try:
+        return _thread_local.call_stack  # type: ignore
+    except AttributeError:
+        _thread_local.call_stack = []
+        return _thread_local.call_stack  # type: ignore
+
+
+def _get_measuring_wrapper(function: Callable[..., Any], function_name: str) -> Callable[..., Any]:
+    @functools.wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        call_stack = _get_call_stack()
+        call_stack.append(function_name)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed_s = time.perf_counter() - start
+            call_stack.pop()
+            for stats in _l_active_stats:
+                stats.record_call(function_name, elapsed_s)
+    return wrapper
+
+
+def _get_counting_wrapper(function: Callable[..., Any], operation_name: str) -> Callable[..., Any]:
+    @functools.wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        call_stack = getattr(_thread_local, 'call_stack', None)
+        if call_stack:
+            set_function_names = set(call_stack)
+            for stats in _l_active_stats:
+                stats.record_fs_operation(set_function_names, operation_name)
+        return function(*args, **kwargs)
+    return wrapper
+
+
+class _CountingOs(object):
+    """
+    stands in for the os module (or os.path) in the namespace of the lib_path modules - the counted functions are wrapped,
+    everything else is the original
+    """
+
+    def __init__(self, module: types.ModuleType, d_operations: Dict[str, str]) -> None:
+        self._module = module
+        d_wrappers = {attribute_name: _get_counting_wrapper(getattr(module, attribute_name), operation_name)
+                      for attribute_name, operation_name in d_operations.items() if hasattr(module, attribute_name)}
+        self.__dict__.update(d_wrappers)
+        # identity checks like "os.open in os.supports_dir_fd" must give the same answer for the wrappers
+        for set_name in ('supports_dir_fd', 'supports_fd', 'supports_follow_symlinks', 'supports_effective_ids'):
+            set_supported = getattr(module, set_name, None)
+            if set_supported is not None:
+                setattr(self, set_name, set_supported | {wrapper for attribute_name, wrapper in d_wrappers.items()
+                                                         if getattr(module, attribute_name) in set_supported})
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._module, name)
+
+
+def _get_counting_os() -> _CountingOs:
+    counting_os = _CountingOs(os, _D_OS_OPERATIONS)
+    counting_os.path = _CountingOs(os.path, _D_OS_PATH_OPERATIONS)      # type: ignore
+    return counting_os
+
+
+def _get_module(module_name: str) -> types.ModuleType:
+    return importlib.import_module(f'{__package__}.{module_name}' if __package__ else module_name)
+
+
+def _patch(namespace: Any, attribute_name: str, new_object: Any) -> None:
+    _l_patched.append((namespace, attribute_name, getattr(namespace, attribute_name)))
+    setattr(namespace, attribute_name, new_object)
+
+
+def _is_measured_function(function: Any) -> bool:
+    return inspect.isfunction(function) and not inspect.isgeneratorfunction(function) and not inspect.iscoroutinefunction(function)
+
+
+def is_instrumentation_enabled() -> bool:
+    return bool(_l_patched)
+
+
+def enable_instrumentation(dump_on_exit: Optional[Union[str, pathlib.Path]] = None) -> None:
+    """
+    starts measuring the lib_path functions.
+    dump_on_exit: save the statistics to this json file when the interpreter exits, for "lib_path stats <file>"
+
+    >>> os_stat = os.stat
+    >>> enable_instrumentation()
+    >>> is_instrumentation_enabled()
+    True
+    >>> # the os module itself is not changed
+    >>> os.stat is os_stat
+    True
+    >>> disable_instrumentation()
+    >>> is_instrumentation_enabled()
+    False
+    """
+    with _enable_lock:
+        if not _l_patched:
+            package = importlib.import_module(__package__) if __package__ else None
+            counting_os = _get_counting_os()
+            for module_name in INSTRUMENTED_MODULE_NAMES:
+                module = _get_module(module_name)
+                for function_name, function in inspect.getmembers(module, _is_measured_function):
+                    if function.__module__ != module.__name__ or function_name.startswith('_'):
+                        continue
+                    wrapper = _get_measuring_wrapper(function, f'{module_name}.{function_name}')
+                    _patch(module, function_name, wrapper)
+                    if package is not None and getattr(package, function_name, None) is function:
+                        _patch(package, function_name, wrapper)
+                for class_name, cls in inspect.getmembers(module, inspect.isclass):
+                    if cls.__module__ != module.__name__ or class_name.startswith('_'):
+                        continue
+                    for method_name, method in list(vars(cls).items()):
+                        if not method_name.startswith('_') and _is_measured_function(method):
+                            _patch(cls, method_name, _get_measuring_wrapper(method, f'{module_name}.{class_name}.{method_name}'))
+                if getattr(module, 'os', None) is os:
+                    _patch(module, 'os', counting_os)
+    if dump_on_exit is not None:
+        atexit.register(save_instrumentation_stats, dump_on_exit)
+
+
+def disable_instrumentation() -> None:
+    """ puts the original functions back - the statistics are kept """
+    with _enable_lock:
+        while _l_patched:
+            namespace, attribute_name, original_object = _l_patched.pop()
+            setattr(namespace, attribute_name, original_object)
+
+
+def reset_instrumentation_stats() -> None:
+    _global_stats.reset()
+
+
+def get_instrumentation_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    returns the statistics of all measured functions, keyed by "<module>.<function>" - json serializable
+
+    >>> # Setup
+    >>> from lib_path import lib_path as lib_path_module
+    >>> reset_instrumentation_stats()
+    >>> enable_instrumentation()
+
+    >>> # Test
+    >>> lib_path_module.path_join_posix('//main', 'test')
+    '//main/test'
+    >>> assert lib_path_module.has_subdirs(pathlib.Path(__file__).parent.parent / 'tests')
+    >>> d_stats = get_instrumentation_stats()
+    >>> d_stats['lib_path.path_join_posix']['n_calls']
+    1
+    >>> d_stats['lib_path.is_windows_network_unc']['n_calls']
+    1
+    >>> d_stats['lib_path.has_subdirs']['fs_operations']['scandir']
+    1
+
+    >>> # Teardown
+    >>> disable_instrumentation()
+    >>> reset_instrumentation_stats()
+
+    """
+    return _global_stats.as_dict()
+
+
+@contextlib.contextmanager
+def measure_instrumentation() -> Iterator[InstrumentationStats]:
+    """
+    measures the lib_path calls within the with block (of all threads), independent of the global statistics.
+    enables the instrumentation for the block, if it is not enabled yet.
+
+    >>> from lib_path import lib_path as lib_path_module
+    >>> with measure_instrumentation() as stats:
+    ...     _ = lib_path_module.strip_and_replace_backslashes('c:\\\\test')
+    >>> stats.as_dict()['lib_path.strip_and_replace_backslashes']['n_calls']
+    1
+    >>> is_instrumentation_enabled()
+    False
+    """
+    stats = InstrumentationStats()
+    was_enabled = is_instrumentation_enabled()
+    if not was_enabled:
+        enable_instrumentation()
+    _l_active_stats.append(stats)
+    try:
+        yield stats
+    finally:
+        _l_active_stats.remove(stats)
+        if not was_enabled:
+            disable_instrumentation()
+
+
+def save_instrumentation_stats(path_file: Union[str, pathlib.Path], d_stats: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+    """ saves the (global) statistics as json """
+    if d_stats is None:
+        d_stats = get_instrumentation_stats()
+    pathlib.Path(path_file).write_text(json.dumps(d_stats, indent=2))
+
+
+def load_instrumentation_stats(path_file: Union[str, pathlib.Path]) -> Dict[str, Dict[str, Any]]:
+    return dict(json.loads(pathlib.Path(path_file).read_text()))
+
+
+def format_instrumentation_stats(d_stats: Dict[str, Dict[str, Any]]) -> str:
+    """
+    formats the statistics as text table, the functions with the most filesystem operations first
+
+    >>> print(format_instrumentation_stats({'lib_path.has_subdirs': {'n_calls': 2, 'total_s': 0.001, 'mean_s': 0.0005, 'max_s': 0.0007,
+    ...                                     'latency_histogram_us': {'<512': 1, '<1024': 1}, 'fs_operations': {'scandir': 2}}}))
+    function                                      calls    total ms     mean us      max us   fs ops  fs operations
+    lib_path.has_subdirs                              2       1.000     500.000     700.000        2  scandir=2
+    """
+    l_lines = [f'{"function":<60} {"calls":>10} {"total ms":>11} {"mean us":>11} {"max us":>11} {"fs ops":>8}  fs operations']
+
+    def get_n_fs_operations(item: Tuple[str, Dict[str, Any]]) -> int:
+        return sum(item[1]['fs_operations'].values())
+
+    for function_name, d_function_stats in sorted(d_stats.items(), key=lambda item: (-get_n_fs_operations(item), item[0])):
+        s_fs_operations = ' '.join(f'{operation}={n}' for operation, n in d_function_stats['fs_operations'].items())
+        l_lines.append(f'{function_name:<60} {d_function_stats["n_calls"]:>10} {d_function_stats["total_s"] * 1e3:>11.3f} '
+                       f'{d_function_stats["mean_s"] * 1e6:>11.3f} {d_function_stats["max_s"] * 1e6:>11.3f} '
+                       f'{get_n_fs_operations((function_name, d_function_stats)):>8}  {s_fs_operations}'.rstrip())
+    return '\n'.join(l_lines)
@@ -1,17 +1,31 @@
 # STDLIB
-import binascii
-import ctypes
-import getpass
-import importlib
-import importlib.util
 import logging
 import os
 import pathlib
-import subprocess
-from typing import List, Union
-
-# INSTALLED
-import lib_platform
+import sys
+from typing import List, Optional, Union
+
+# the heavier imports (ctypes, subprocess, getpass, importlib.util, lib_platform) are done in the functions which need them,
+# importing lib_path for the path string functions should be fast
+
+# PROJ
+try:
+    from . import dir_probe
+    from . import dir_scan
+    from . import marker_search
+    from . import parsed_path
+    from . import path_filter as path_filter_module
+    from . import symlink_resolver
+    from . import tree_permissions
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import dir_probe                        # type: ignore  # pragma: no cover
+    import dir_scan                         # type: ignore  # pragma: no cover
+    import marker_search                    # type: ignore  # pragma: no cover
+    import parsed_path                      # type: ignore  # pragma: no cover
+    import path_filter as path_filter_module  # type: ignore  # pragma: no cover
+    import symlink_resolver                 # type: ignore  # pragma: no cover
+    import tree_permissions                 # type: ignore  # pragma: no cover
 
 logger = logging.getLogger()
 
@@ -93,8 +107,8 @@ def log_and_raise_if_target_directory_within_source_directory(path_source_dir: p
 
 
 def is_target_directory_within_source_directory(path_source_dir: pathlib.Path, path_target_dir: pathlib.Path) -> bool:
-    s_source_dir = str(path_source_dir.resolve()).replace('\\', '/') + '/'
-    s_target_dir = str(path_target_dir.resolve()).replace('\\', '/') + '/'
+    s_source_dir = str(symlink_resolver.resolve_path(path_source_dir)).replace('\\', '/') + '/'
+    s_target_dir = str(symlink_resolver.resolve_path(path_target_dir)).replace('\\', '/') + '/'
     if s_target_dir.startswith(s_source_dir):
         return True
     else:
@@ -122,7 +136,7 @@ def log_and_raise_if_not_isfile(path_file: pathlib.Path) -> None:
         raise FileNotFoundError(s_error)
 
 
-def path_join_posix(path: str, *paths: str) -> str:
+def path_join_posix(path: Union[str, 'parsed_path.ParsedPath'], *paths: str) -> str:
     """
     liefert beim joinen einen Pfad jedenfalls als posix pfad retour.
 
@@ -138,8 +152,12 @@ def path_join_posix(path: str, *paths: str) -> str:
     '//main/test/test2/test2'
     >>> path_join_posix('//main','\\\\test\\\\test2','test2')
     '//main/test/test2/test2'
+    >>> path_join_posix(parsed_path.ParsedPath(r'\\\\main'), 'test')
+    '//main/test'
 
     """
+    if isinstance(path, parsed_path.ParsedPath):
+        return path.joinpath(*paths).path
 
     # sonst geht path_join_posix('//main','/test/test2','test2') schief !
     path = str(path)    # cast to string if we pass a path object
@@ -160,7 +178,7 @@ def path_join_posix(path: str, *paths: str) -> str:
     return ret_path
 
 
-def path_remove_trailing_slashes(path: str) -> str:
+def path_remove_trailing_slashes(path: Union[str, 'parsed_path.ParsedPath']) -> str:
     """
     Entfernt "/" am Ende des Pfades
 
@@ -168,8 +186,12 @@ def path_remove_trailing_slashes(path: str) -> str:
     '//test'
     >>> path_remove_trailing_slashes('//test')
     '//test'
+    >>> path_remove_trailing_slashes(parsed_path.ParsedPath('//test//'))
+    '//test'
 
     """
+    if isinstance(path, parsed_path.ParsedPath):
+        return path.without_trailing_slashes()
     path = strip_and_replace_backslashes(path)
     path = path.rstrip('/')
     return path
@@ -194,13 +216,17 @@ def get_basename_without_extension(path_file: pathlib.Path) -> str:
     return basename
 
 
-def strip_and_replace_backslashes(path: str) -> str:
+def strip_and_replace_backslashes(path: Union[str, 'parsed_path.ParsedPath']) -> str:
     """
     >>> strip_and_replace_backslashes('c:\\\\test')
     'c:/test'
     >>> strip_and_replace_backslashes('\\\\\\\\main\\\\install')
     '//main/install'
+    >>> strip_and_replace_backslashes(parsed_path.ParsedPath('c:\\\\test'))
+    'c:/test'
     """
+    if isinstance(path, parsed_path.ParsedPath):
+        return path.path
     path = path.strip().replace('\\', '/')
     return path
 
@@ -209,7 +235,7 @@ def get_current_dir() -> pathlib.Path:
     """
     >>> path = get_current_dir()
     """
-    return pathlib.Path.cwd().resolve()
+    return symlink_resolver.resolve_path(os.getcwd())
 
 
 def get_current_dir_and_change_to_home() -> pathlib.Path:
@@ -218,7 +244,7 @@ def get_current_dir_and_change_to_home() -> pathlib.Path:
     return current_path
 
 
-def is_windows_network_unc(path: str) -> bool:
+def is_windows_network_unc(path: Union[str, 'parsed_path.ParsedPath']) -> bool:
     """
     >>> is_windows_network_unc('/test')
     False
@@ -226,7 +252,11 @@ def is_windows_network_unc(path: str) -> bool:
     False
     >>> is_windows_network_unc('//main/install')
     True
+    >>> is_windows_network_unc(parsed_path.ParsedPath('//main/install'))
+    True
     """
+    if isinstance(path, parsed_path.ParsedPath):
+        return path.is_windows_network_unc
     path = strip_and_replace_backslashes(path)
     if path.startswith('//'):
         return True
@@ -234,7 +264,7 @@ def is_windows_network_unc(path: str) -> bool:
         return False
 
 
-def substract_windows_drive_letter(path: str) -> str:
+def substract_windows_drive_letter(path: Union[str, 'parsed_path.ParsedPath']) -> str:
     """
     >>> substract_windows_drive_letter('//main/install')
     '//main/install'
@@ -242,14 +272,18 @@ def substract_windows_drive_letter(path: str) -> str:
     '/test'
     >>> substract_windows_drive_letter('c:\\\\test')
     '/test'
+    >>> substract_windows_drive_letter(parsed_path.ParsedPath('c:\\\\test'))
+    '/test'
     """
+    if isinstance(path, parsed_path.ParsedPath):
+        return path.without_windows_drive_letter()
     path = strip_and_replace_backslashes(path)
     if path_starts_with_windows_drive_letter(path):
         path = path[2:]
     return path
 
 
-def path_starts_with_windows_drive_letter(path: str) -> bool:
+def path_starts_with_windows_drive_letter(path: Union[str, 'parsed_path.ParsedPath']) -> bool:
     """
     >>> path_starts_with_windows_drive_letter('//main/install')
     False
@@ -257,7 +291,11 @@ def path_starts_with_windows_drive_letter(path: str) -> bool:
     False
     >>> path_starts_with_windows_drive_letter('c:\\\\test')
     True
+    >>> path_starts_with_windows_drive_letter(parsed_path.ParsedPath('c:\\\\test'))
+    True
     """
+    if isinstance(path, parsed_path.ParsedPath):
+        return path.starts_with_windows_drive_letter
     path = strip_and_replace_backslashes(path)
     if path[1:].startswith(':/'):
         return True
@@ -269,9 +307,9 @@ def chdir(path: pathlib.Path) -> None:
     os.chdir(str(path))
 
 
-def get_l_path_sub_directories(path_base_directory: pathlib.Path) -> List[pathlib.Path]:
+def get_l_path_sub_directories(path_base_directory: pathlib.Path, path_filter: Optional['path_filter_module.PathFilter'] = None) -> List[pathlib.Path]:
     """
-    gets the subdirectories of a path (non recursive)
+    gets the subdirectories of a path (non recursive), without the subdirectories excluded by path_filter
 
     >>> # Setup
     >>> path_test_dir = pathlib.Path(__file__).parent.parent / 'tests'
@@ -282,26 +320,32 @@ def get_l_path_sub_directories(path_base_directory: pathlib.Path) -> List[pathli
     [...Path('subdir')]
     >>> get_l_path_sub_directories(path_dir_without_subdirs)
     []
+    >>> get_l_path_sub_directories(path_dir_with_subdirs, path_filter=path_filter_module.PathFilter(exclude=['sub*']))
+    []
 
     """
     log_and_raise_if_not_isdir(path_base_directory)
-    path_base_directory.resolve()
 
+    l_path_sub_directories: List[pathlib.Path] = []
     try:
-        l_sub_directories = next(os.walk(str(path_base_directory)))[1]
-        l_path_sub_directories = [pathlib.Path(str(subdir)) for subdir in l_sub_directories]
-        return l_path_sub_directories
-    except StopIteration:
-        return []
+        for scan_entry in dir_scan.iter_directory_entries(path_base_directory, dirs_only=True):
+            if path_filter is None or not path_filter.is_entry_excluded(scan_entry.name, scan_entry.name, True):
+                l_path_sub_directories.append(pathlib.Path(scan_entry.name))
+    except OSError:
+        # like os.walk - a directory we can not list has no subdirectories, the ones listed before an error are kept
+        pass
+    return l_path_sub_directories
 
 
 def get_windows_system_drive_letter() -> str:
     """
+    >>> import lib_platform
     >>> if lib_platform.get_is_platform_windows():
     ...   drive = get_windows_system_drive_letter()
     ...   assert drive == 'c:'
 
     """
+    import ctypes
     kernel32 = ctypes.windll.kernel32  # type: ignore
     windows_directory = ctypes.create_unicode_buffer(1024)
     if kernel32.GetWindowsDirectoryW(windows_directory, 1024) == 0:
@@ -326,9 +370,13 @@ def has_subdirs(path_dir: pathlib.Path) -> bool:
 
     """
 
-    if len(get_l_path_sub_directories(path_dir)) > 0:
-        return True
-    else:
+    try:
+        return bool(dir_probe.probe_directory(path_dir, check_subdirs=True).has_subdirs)
+    except (FileNotFoundError, NotADirectoryError):
+        log_and_raise_if_not_isdir(path_dir)
+        raise
+    except OSError:
+        # like os.walk - a directory we can not list has no subdirectories
         return False
 
 
@@ -346,15 +394,19 @@ def is_directory_empty(path_directory: pathlib.Path) -> bool:
     >>> assert not is_directory_empty(path_test_dir)
 
     """
-    log_and_raise_if_not_isdir(path_directory)
-    is_empty = not any(path_directory.iterdir())
-    return is_empty
+    try:
+        is_empty = dir_probe.probe_directory(path_directory, check_subdirs=False).is_empty
+    except (FileNotFoundError, NotADirectoryError):
+        log_and_raise_if_not_isdir(path_directory)
+        raise
+    return bool(is_empty)
 
 
 def is_directory_writable(directory: str) -> bool:
     """
     stellt fest ob ein Verzeichnis beschreibbar ist
 
+    >>> import lib_platform
     >>> if lib_platform.get_is_platform_windows():
     ...     drive_letter = get_windows_system_drive_letter()
     ...     temp_dir = drive_letter + '/user/public/temp'
@@ -369,14 +421,15 @@ def is_directory_writable(directory: str) -> bool:
     # noinspection PyBroadException
     try:
         while True:
-            # does not work on python 3.4
-            # temp_file = os.urandom(16).hex()
-            temp_file = binascii.hexlify(os.urandom(16)).decode()
+            temp_file = os.urandom(16).hex()
             temp_path = path_join_posix(directory, temp_file)
-            if not os.path.exists(temp_path):
+            # O_EXCL - no separate exists check, and we never touch a file which is not ours
+            try:
+                os.close(os.open(temp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
                 break
+            except FileExistsError:
+                pass
 
-        pathlib.Path(temp_path).touch()
         os.remove(temp_path)
         return True
 
@@ -392,34 +445,37 @@ def get_test_directory_path(module_name: str, test_directory_name: str = 'tests'
     >>> test_directory = get_test_directory_path('lib_path', test_directory_name='tests')
     >>> assert test_directory.is_dir()
     """
+    import importlib.util
     # ok for pytest:
     path_origin_directory = pathlib.Path(str(importlib.util.find_spec(module_name).origin)).parent  # type: ignore
-    path_origin_resolved_directory = path_origin_directory.resolve()
     # for doctest under pycharm, we need to go probably some levels up:
-    root_directory = pathlib.Path('/')
-    while True:
-        if (path_origin_resolved_directory / test_directory_name).is_dir():
-            break
-        if path_origin_resolved_directory == root_directory:
-            raise FileNotFoundError(f'test directory "{test_directory_name}" not found')
-        path_origin_resolved_directory = path_origin_resolved_directory.parent
-    path_to_test_directory = path_origin_resolved_directory / test_directory_name
+    path_test_directory_parent = marker_search.find_marker_directory_upward(path_origin_directory, test_directory_name, marker_type='dir')
+    if path_test_directory_parent is None:
+        raise FileNotFoundError(f'test directory "{test_directory_name}" not found')
+    path_to_test_directory = path_test_directory_parent / test_directory_name
     return path_to_test_directory
 
 
 def make_test_directory_and_subdirs_fully_accessible_by_current_user(path_directory_name: Union[str, pathlib.Path]) -> None:
-    """ Linux only, Change Mask to 777 for all Files and change Owner and Group to the current user
+    """ Linux only, Change Mask to 777 for all Files and change Owner and Group to the current user and group
     this can be used if we need to write to test directories on travis, etc. - does nothing on windows
 
+    the change is done in-process, only if that fails for lack of permissions, we fall back to sudo chown / chmod
+
     >>> test_directory = get_test_directory_path('lib_path', test_directory_name='tests')
     >>> make_test_directory_and_subdirs_fully_accessible_by_current_user(test_directory)
 
 
     """
-    if lib_platform.get_is_platform_linux():
+    if sys.platform.startswith('linux'):
         path_directory_name = str(path_directory_name)
-        subprocess.run(['sudo', 'chown', '-R', getpass.getuser() + '.' + getpass.getuser(), path_directory_name], check=True)
-        subprocess.run(['sudo', 'chmod', '-R', '777', path_directory_name], check=True)
+        summary = tree_permissions.change_tree_owner_and_mode(path_directory_name, mode=0o777, max_workers=4)
+        if any(isinstance(error, PermissionError) for error in summary.errors):
+            import getpass
+            import subprocess
+            # the same owner and group as the in-process change - the group of the process, not a group named like the user
+            subprocess.run(['sudo', 'chown', '-R', f'{getpass.getuser()}:{os.getgid()}', path_directory_name], check=True)
+            subprocess.run(['sudo', 'chmod', '-R', '777', path_directory_name], check=True)
 
 
 if __name__ == '__main__':
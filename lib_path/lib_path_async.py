@@ -0,0 +1,190 @@
+# STDLIB
+import asyncio
+import concurrent.futures
+import functools
+import pathlib
+import threading
+import weakref
+from typing import Any, Callable, Iterable, List, Optional, TypeVar
+
+# PROJ
+try:
+    from . import lib_path
+    from . import path_filter as path_filter_module
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import lib_path                         # type: ignore  # pragma: no cover
+    import path_filter as path_filter_module  # type: ignore  # pragma: no cover
+
+# awaitable versions of the blocking filesystem checks and listings of lib_path.lib_path.
+# the blocking calls run on an executor, the number of calls in flight is limited by max_concurrency,
+# so thousands of paths can be checked without stalling the event loop or flooding a slow mount.
+# cancelling the awaiting task releases the slot immediately - calls which did not start yet are never run.
+
+DEFAULT_MAX_CONCURRENCY = 32
+
+T = TypeVar('T')
+
+
+class AsyncPathRunner(object):
+    """
+    runs blocking path functions on an executor, with a concurrency limit
+
+    executor:           the executor to use - if None, a ThreadPoolExecutor with max_concurrency threads is created on first use
+    max_concurrency:    the maximum number of calls in flight, per event loop
+
+    >>> # Setup
+    >>> runner = AsyncPathRunner(max_concurrency=4)
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent / 'tests'
+
+    >>> # Test
+    >>> asyncio.run(runner.run(lib_path.has_subdirs, path_test_dir / 'dir_with_subdirs'))
+    True
+    >>> asyncio.run(runner.gather(lib_path.has_subdirs, [path_test_dir / 'dir_with_subdirs', path_test_dir / 'dir_without_subdirs']))
+    [True, False]
+    >>> l_results = asyncio.run(runner.gather(lib_path.log_and_raise_if_not_isdir, [path_test_dir, path_test_dir / 'xyz'], return_exceptions=True))
+    >>> l_results[0], type(l_results[1])
+    (None, <class 'NotADirectoryError'>)
+
+    >>> # Test a runner which is shut down does not start a new executor
+    >>> runner.shutdown()
+    >>> asyncio.run(runner.run(lib_path.has_subdirs, path_test_dir))
+    Traceback (most recent call last):
+    ...
+    RuntimeError: the AsyncPathRunner is shut down
+
+    """
+
+    def __init__(self, executor: Optional[concurrent.futures.Executor] = None, max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> None:
+        if max_concurrency < 1:
+            raise ValueError(f'max_concurrency must be > 0, got {max_concurrency}')
+        self.max_concurrency = max_concurrency
+        self._executor = executor
+        self._is_own_executor = executor is None
+        self._is_shut_down = False
+        self._lock = threading.Lock()
+        # asyncio primitives are bound to an event loop - one semaphore per loop
+        self._d_semaphores: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]' = weakref.WeakKeyDictionary()
+
+    def _get_executor(self) -> concurrent.futures.Executor:
+        with self._lock:
+            if self._is_shut_down:
+                raise RuntimeError(f'the {self.__class__.__name__} is shut down')
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='lib_path_async')
+            return self._executor
+
+    def _get_semaphore(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        semaphore = self._d_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._d_semaphores[loop] = semaphore
+        return semaphore
+
+    async def run(self, function: Callable[..., T], *args: Any) -> T:
+        """ runs function(*args) on the executor and returns the result, or raises its exception """
+        loop = asyncio.get_running_loop()
+        async with self._get_semaphore(loop):
+            return await loop.run_in_executor(self._get_executor(), functools.partial(function, *args))
+
+    async def gather(self, function: Callable[..., T], paths: Iterable[Any], return_exceptions: bool = False) -> List[Any]:
+        """
+        runs function(path) for every path, with the concurrency limit - the results are in the order of paths.
+        return_exceptions: like asyncio.gather - return the exceptions as results, instead of raising the first one
+        """
+        return list(await asyncio.gather(*(self.run(function, path) for path in paths), return_exceptions=return_exceptions))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """ shuts down the executor, if it was created by the runner - the runner can not be used afterwards (RuntimeError) """
+        with self._lock:
+            self._is_shut_down = True
+            if self._is_own_executor and self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+_default_runner = AsyncPathRunner()
+
+
+def configure_async_runner(executor: Optional[concurrent.futures.Executor] = None, max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> None:
+    """
+    replaces the runner used by the module level functions - the old runner is shut down,
+    calls which are in flight on it finish, new calls on it raise RuntimeError
+
+    >>> configure_async_runner(max_concurrency=8)
+    >>> get_async_runner().max_concurrency
+    8
+    >>> configure_async_runner()
+    """
+    global _default_runner
+    old_runner = _default_runner
+    _default_runner = AsyncPathRunner(executor=executor, max_concurrency=max_concurrency)
+    old_runner.shutdown(wait=False)
+
+
+def get_async_runner() -> AsyncPathRunner:
+    return _default_runner
+
+
+async def log_and_raise_if_path_does_not_exist(path: pathlib.Path) -> None:
+    """
+    >>> asyncio.run(log_and_raise_if_path_does_not_exist(pathlib.Path('does_not_exist')))
+    Traceback (most recent call last):
+    ...
+    FileNotFoundError: path does not exist: does_not_exist
+    """
+    await _default_runner.run(lib_path.log_and_raise_if_path_does_not_exist, path)
+
+
+async def log_and_raise_if_not_isdir(path_dir: pathlib.Path) -> None:
+    """
+    >>> asyncio.run(log_and_raise_if_not_isdir(pathlib.Path(__file__).parent))
+    """
+    await _default_runner.run(lib_path.log_and_raise_if_not_isdir, path_dir)
+
+
+async def log_and_raise_if_not_isfile(path_file: pathlib.Path) -> None:
+    """
+    >>> asyncio.run(log_and_raise_if_not_isfile(pathlib.Path(__file__)))
+    """
+    await _default_runner.run(lib_path.log_and_raise_if_not_isfile, path_file)
+
+
+async def is_directory_empty(path_directory: pathlib.Path) -> bool:
+    """
+    >>> asyncio.run(is_directory_empty(pathlib.Path(__file__).parent))
+    False
+    """
+    return await _default_runner.run(lib_path.is_directory_empty, path_directory)
+
+
+async def is_directory_writable(directory: str) -> bool:
+    """
+    >>> import tempfile
+    >>> asyncio.run(is_directory_writable(tempfile.gettempdir()))
+    True
+    """
+    return await _default_runner.run(lib_path.is_directory_writable, directory)
+
+
+async def get_l_path_sub_directories(path_base_directory: pathlib.Path,
+                                     path_filter: Optional['path_filter_module.PathFilter'] = None) -> List[pathlib.Path]:
+    """
+    >>> path_dir_with_subdirs = pathlib.Path(__file__).parent.parent / 'tests' / 'dir_with_subdirs'
+    >>> asyncio.run(get_l_path_sub_directories(path_dir_with_subdirs))
+    [...Path('subdir')]
+    >>> asyncio.run(get_l_path_sub_directories(path_dir_with_subdirs, path_filter=path_filter_module.PathFilter(exclude=['sub*'])))
+    []
+    """
+    return await _default_runner.run(lib_path.get_l_path_sub_directories, path_base_directory, path_filter)
+
+
+async def gather_path_function(function: Callable[..., T], paths: Iterable[Any], return_exceptions: bool = False) -> List[Any]:
+    """
+    runs a blocking path function for many paths on the default runner, the results are in the order of paths
+
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent / 'tests'
+    >>> asyncio.run(gather_path_function(lib_path.is_directory_empty, [path_test_dir, path_test_dir / 'dir_with_subdirs']))
+    [False, False]
+    """
+    return await _default_runner.gather(function, paths, return_exceptions=return_exceptions)
@@ -1,26 +1,41 @@
 # STDLIB
+import importlib
+import json
+import os
+import pathlib
 import sys
-from typing import Optional
+import types
+from typing import Any, BinaryIO, Callable, Iterator, List, Optional, Tuple
 
 # EXT
 import click
 
-# OWN
-import cli_exit_tools
-
 # PROJ
+# only __init__conf__ is imported here - "--version" and "info" should start fast.
+# cli_exit_tools and the lib_path modules are imported by the commands which need them
 try:
     from . import __init__conf__
-    from . import lib_path
 except (ImportError, ModuleNotFoundError):  # pragma: no cover
     # imports for doctest
     import __init__conf__                   # type: ignore  # pragma: no cover
-    import lib_path      # type: ignore  # pragma: no cover
 
 # CONSTANTS
 CLICK_CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
 
 
+def _get_proj_module(module_name: str) -> types.ModuleType:
+    """ imports a module of lib_path on first use """
+    return importlib.import_module(f'{__package__}.{module_name}' if __package__ else module_name)
+
+
+def _get_streams(input_stream: Optional[BinaryIO], output_stream: Optional[BinaryIO]) -> Tuple[BinaryIO, BinaryIO]:
+    return (sys.stdin.buffer if input_stream is None else input_stream), (sys.stdout.buffer if output_stream is None else output_stream)
+
+
+def _print_path_error(path: str, exc: Exception) -> None:
+    print(f'{__init__conf__.shell_command}: {path}: {exc}', file=sys.stderr)
+
+
 def info() -> None:
     """
     >>> info()
@@ -30,6 +45,166 @@ def info() -> None:
     __init__conf__.print_info()
 
 
+def stats(stats_file: str, as_json: bool = False) -> None:
+    """
+    prints the instrumentation statistics, saved with lib_path.save_instrumentation_stats
+    or enable_instrumentation(dump_on_exit=...)
+
+    >>> import tempfile
+    >>> from lib_path import instrumentation
+    >>> path_stats_file = pathlib.Path(tempfile.mkdtemp()) / 'stats.json'
+    >>> instrumentation.save_instrumentation_stats(path_stats_file, {})
+    >>> stats(str(path_stats_file))
+    function ...
+    >>> path_stats_file.unlink()
+
+    """
+    instrumentation = _get_proj_module('instrumentation')
+    d_stats = instrumentation.load_instrumentation_stats(stats_file)
+    if as_json:
+        print(json.dumps(d_stats, indent=2))
+    else:
+        print(instrumentation.format_instrumentation_stats(d_stats))
+
+
+def normalize(null_delimited: bool = False, input_stream: Optional[BinaryIO] = None, output_stream: Optional[BinaryIO] = None) -> Any:
+    """
+    strips the paths, replaces backslashes and removes trailing slashes - like path_remove_trailing_slashes
+
+    >>> import io
+    >>> output_stream = io.BytesIO()
+    >>> normalize(input_stream=io.BytesIO(b'c:\\\\test\\\\\\n //main/test/ \\n'), output_stream=output_stream)
+    StreamSummary(n_paths=2, n_results=2, n_errors=0)
+    >>> output_stream.getvalue()
+    b'c:/test\\n//main/test\\n'
+
+    """
+    path_batch = _get_proj_module('path_batch')
+    path_stream = _get_proj_module('path_stream')
+    input_stream, output_stream = _get_streams(input_stream, output_stream)
+    return path_stream.stream_paths_batch(path_batch.path_remove_trailing_slashes_batch, input_stream, output_stream, null_delimited=null_delimited)
+
+
+def join(paths_to_join: List[str], null_delimited: bool = False, input_stream: Optional[BinaryIO] = None, output_stream: Optional[BinaryIO] = None) -> Any:
+    """
+    joins every path with paths_to_join - like path_join_posix
+
+    >>> import io
+    >>> output_stream = io.BytesIO()
+    >>> join(['test', 'test2'], input_stream=io.BytesIO(b'//main\\nc:\\\\test\\n'), output_stream=output_stream)
+    StreamSummary(n_paths=2, n_results=2, n_errors=0)
+    >>> output_stream.getvalue()
+    b'//main/test/test2\\nc:/test/test/test2\\n'
+
+    """
+    path_batch = _get_proj_module('path_batch')
+    path_stream = _get_proj_module('path_stream')
+    input_stream, output_stream = _get_streams(input_stream, output_stream)
+
+    def join_batch(paths: List[str]) -> List[str]:
+        return list(path_batch.path_join_posix_batch(paths, *paths_to_join))
+
+    return path_stream.stream_paths_batch(join_batch, input_stream, output_stream, null_delimited=null_delimited)
+
+
+def check(expectation: str = 'exists', invert: bool = False, null_delimited: bool = False, max_workers: int = 1,
+          input_stream: Optional[BinaryIO] = None, output_stream: Optional[BinaryIO] = None) -> Any:
+    """
+    writes the paths which meet the expectation ('exists', 'isdir', 'isfile'), or with invert the paths which do not meet it
+
+    >>> import io
+    >>> output_stream = io.BytesIO()
+    >>> check('isdir', invert=True, input_stream=io.BytesIO(os.fsencode(f'{os.path.dirname(__file__)}\\n{__file__}\\n')), output_stream=output_stream)
+    StreamSummary(n_paths=2, n_results=1, n_errors=0)
+    >>> assert output_stream.getvalue() == os.fsencode(__file__) + b'\\n'
+
+    """
+    path_stream = _get_proj_module('path_stream')
+    path_validation = _get_proj_module('path_validation')
+    if expectation not in path_validation.EXPECTATIONS:
+        raise ValueError(f'expectation must be one of {path_validation.EXPECTATIONS}, got "{expectation}"')
+    # the same semantics as validate_paths - symlinks are followed
+    is_expectation_met = {'exists': os.path.exists, 'isdir': os.path.isdir, 'isfile': os.path.isfile}[expectation]
+    input_stream, output_stream = _get_streams(input_stream, output_stream)
+
+    def check_path(path: str) -> List[str]:
+        return [path] if is_expectation_met(path) != invert else []
+
+    return path_stream.stream_paths(check_path, input_stream, output_stream, null_delimited=null_delimited, max_workers=max_workers)
+
+
+def subdirs(null_delimited: bool = False, max_workers: int = 1,
+            input_stream: Optional[BinaryIO] = None, output_stream: Optional[BinaryIO] = None) -> Any:
+    """
+    writes the subdirectories of every directory, errors are reported on stderr
+
+    >>> import io
+    >>> output_stream = io.BytesIO()
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent / 'tests'
+    >>> input_data = os.fsencode(f'{path_test_dir / "dir_with_subdirs"}\\0{path_test_dir / "does_not_exist"}\\0')
+    >>> subdirs(null_delimited=True, input_stream=io.BytesIO(input_data), output_stream=output_stream)
+    StreamSummary(n_paths=2, n_results=1, n_errors=1)
+    >>> assert output_stream.getvalue() == os.fsencode(str(path_test_dir / 'dir_with_subdirs' / 'subdir')) + b'\\0'
+
+    """
+    dir_scan = _get_proj_module('dir_scan')
+    path_stream = _get_proj_module('path_stream')
+    input_stream, output_stream = _get_streams(input_stream, output_stream)
+
+    def iter_sub_directories(path: str) -> Iterator[str]:
+        return (entry.path for entry in dir_scan.iter_directory_entries(path, dirs_only=True))
+
+    return path_stream.stream_paths(iter_sub_directories, input_stream, output_stream, null_delimited=null_delimited, max_workers=max_workers,
+                                    on_error=_print_path_error)
+
+
+def writable(invert: bool = False, null_delimited: bool = False, max_workers: int = 1,
+             input_stream: Optional[BinaryIO] = None, output_stream: Optional[BinaryIO] = None) -> Any:
+    """
+    writes the directories which are writable, or with invert the paths which are not writable directories
+
+    >>> import io, tempfile
+    >>> output_stream = io.BytesIO()
+    >>> writable(input_stream=io.BytesIO(os.fsencode(tempfile.gettempdir())), output_stream=output_stream)
+    StreamSummary(n_paths=1, n_results=1, n_errors=0)
+
+    """
+    lib_path = _get_proj_module('lib_path')
+    path_stream = _get_proj_module('path_stream')
+    input_stream, output_stream = _get_streams(input_stream, output_stream)
+
+    def check_path(path: str) -> List[str]:
+        return [path] if lib_path.is_directory_writable(path) != invert else []
+
+    return path_stream.stream_paths(check_path, input_stream, output_stream, null_delimited=null_delimited, max_workers=max_workers)
+
+
+def _run_stream_command(function: Callable[..., Any], **kwargs: Any) -> None:
+    """
+    runs a streaming command, exit code 1 if any path raised an error.
+    a closed output pipe (like "| head") ends it quietly with exit code 0 - the reader got what it wanted, "set -o pipefail" must not fail
+    """
+    try:
+        summary = function(**kwargs)
+    except BrokenPipeError:
+        # python would complain again when flushing stdout at exit
+        devnull_fd = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull_fd, sys.stdout.fileno())
+        sys.exit(0)
+    if summary.n_errors:
+        sys.exit(1)
+
+
+def _null_option(function: Callable[..., Any]) -> Callable[..., Any]:
+    return click.option('-0', '--null', 'null_delimited', is_flag=True, default=False,
+                        help='paths are delimited by NUL characters instead of newlines, on input and output')(function)
+
+
+def _workers_option(function: Callable[..., Any]) -> Callable[..., Any]:
+    return click.option('-w', '--workers', 'max_workers', type=click.IntRange(min=1), default=1, show_default=True,
+                        help='number of worker threads for the filesystem checks')(function)
+
+
 @click.group(help=__init__conf__.title, context_settings=CLICK_CONTEXT_SETTINGS)    # type: ignore
 @click.version_option(version=__init__conf__.version,
                       prog_name=__init__conf__.shell_command,
@@ -37,6 +212,7 @@ def info() -> None:
 @click.option('--traceback/--no-traceback', is_flag=True, type=bool, default=None, help='return traceback information on cli')
 def cli_main(traceback: Optional[bool] = None) -> None:
     if traceback is not None:
+        import cli_exit_tools
         cli_exit_tools.config.traceback = traceback
         # lib_path.main() # there is no main in lib_path
 
@@ -47,8 +223,61 @@ def cli_info() -> None:
     info()
 
 
+@cli_main.command('stats', context_settings=CLICK_CONTEXT_SETTINGS)
+@click.argument('stats_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--json', 'as_json', is_flag=True, default=False, help='print the statistics as json')
+def cli_stats(stats_file: str, as_json: bool) -> None:
+    """ show instrumentation statistics (call counts, latencies, filesystem operations) """
+    stats(stats_file, as_json=as_json)
+
+
+@cli_main.command('normalize', context_settings=CLICK_CONTEXT_SETTINGS)
+@_null_option
+def cli_normalize(null_delimited: bool) -> None:
+    """ normalize the paths from stdin (strip, backslashes to slashes, no trailing slashes) """
+    _run_stream_command(normalize, null_delimited=null_delimited)
+
+
+@cli_main.command('join', context_settings=CLICK_CONTEXT_SETTINGS)
+@click.argument('paths_to_join', nargs=-1, required=True)
+@_null_option
+def cli_join(paths_to_join: Tuple[str, ...], null_delimited: bool) -> None:
+    """ join every path from stdin with PATHS_TO_JOIN, as posix path """
+    _run_stream_command(join, paths_to_join=list(paths_to_join), null_delimited=null_delimited)
+
+
+@cli_main.command('check', context_settings=CLICK_CONTEXT_SETTINGS)
+@click.option('--exists', 'expectation', flag_value='exists', default=True, help='pass the paths which exist (default)')
+@click.option('--isdir', 'expectation', flag_value='isdir', help='pass the paths which are directories')
+@click.option('--isfile', 'expectation', flag_value='isfile', help='pass the paths which are files')
+@click.option('-v', '--invert', is_flag=True, default=False, help='pass the paths which do not meet the check')
+@_null_option
+@_workers_option
+def cli_check(expectation: str, invert: bool, null_delimited: bool, max_workers: int) -> None:
+    """ pass the paths from stdin which meet the check """
+    _run_stream_command(check, expectation=expectation, invert=invert, null_delimited=null_delimited, max_workers=max_workers)
+
+
+@cli_main.command('subdirs', context_settings=CLICK_CONTEXT_SETTINGS)
+@_null_option
+@_workers_option
+def cli_subdirs(null_delimited: bool, max_workers: int) -> None:
+    """ list the subdirectories of the directories from stdin """
+    _run_stream_command(subdirs, null_delimited=null_delimited, max_workers=max_workers)
+
+
+@cli_main.command('writable', context_settings=CLICK_CONTEXT_SETTINGS)
+@click.option('-v', '--invert', is_flag=True, default=False, help='pass the paths which are not writable directories')
+@_null_option
+@_workers_option
+def cli_writable(invert: bool, null_delimited: bool, max_workers: int) -> None:
+    """ pass the directories from stdin which are writable """
+    _run_stream_command(writable, invert=invert, null_delimited=null_delimited, max_workers=max_workers)
+
+
 # entry point if main
 if __name__ == '__main__':
+    import cli_exit_tools
     try:
         cli_main()  # type: ignore
     except Exception as exc:
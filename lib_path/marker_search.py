@@ -0,0 +1,203 @@
+# STDLIB
+import collections
+import os
+import pathlib
+import stat
+import threading
+from typing import Optional, Sequence, Tuple, TypeVar, Union
+
+# PROJ
+try:
+    from . import symlink_resolver
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import symlink_resolver                 # type: ignore  # pragma: no cover
+
+# memoized upward search for marker files or directories (like "tests", ".git", "pyproject.toml").
+# every directory visited on the way up is cached with its result, so a search from a sibling
+# or a child of an already searched directory stops at the first cached ancestor.
+# the results are cached for the resolved directories, the start paths as given are mapped to the resolved start paths.
+# both caches are bounded, the least recently used entries are dropped first.
+
+MARKER_TYPES = ('any', 'dir', 'file')
+DEFAULT_MARKER_SEARCH_CACHE_MAXSIZE = 65536
+
+# (markers, marker_type, resolved directory)
+_CacheKey = Tuple[Tuple[str, ...], str, str]
+
+# cache key -> the resolved directory which contains the marker, or None
+_d_marker_cache: 'collections.OrderedDict[_CacheKey, Optional[str]]' = collections.OrderedDict()
+# absolute start path as given -> resolved start path, so the next search does not need to resolve it
+_d_resolved_start_paths: 'collections.OrderedDict[str, str]' = collections.OrderedDict()
+_marker_cache_maxsize = DEFAULT_MARKER_SEARCH_CACHE_MAXSIZE
+_marker_cache_lock = threading.Lock()
+
+_T = TypeVar('_T')
+_V = TypeVar('_V')
+
+
+def _cache_set(d_cache: 'collections.OrderedDict[_T, _V]', key: _T, value: _V) -> None:
+    """ under the lock """
+    if _marker_cache_maxsize > 0:
+        d_cache[key] = value
+        d_cache.move_to_end(key)
+        while len(d_cache) > _marker_cache_maxsize:
+            d_cache.popitem(last=False)
+
+
+def _is_marker(path: str, marker_type: str) -> bool:
+    try:
+        st_mode = os.stat(path).st_mode
+    except OSError:
+        return False
+    if marker_type == 'dir':
+        return stat.S_ISDIR(st_mode)
+    if marker_type == 'file':
+        return stat.S_ISREG(st_mode)
+    return True
+
+
+def find_marker_directory_upward(path_start: Union[str, pathlib.Path],
+                                 markers: Union[str, Sequence[str]],
+                                 marker_type: str = 'any') -> Optional[pathlib.Path]:
+    """
+    returns the nearest directory (path_start itself or one of its parents) which contains one of the markers, or None.
+    the results are cached until invalidate_marker_search_cache is called.
+
+    markers:        one marker name or a sequence of marker names
+    marker_type:    'any', 'dir' (marker must be a directory) or 'file' (marker must be a regular file)
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent / 'tests'
+    >>> path_start = path_test_dir / 'test_a' / 'test_a_a'
+
+    >>> # Test
+    >>> find_marker_directory_upward(path_start, 'tests', marker_type='dir') == path_test_dir.parent.resolve()
+    True
+    >>> find_marker_directory_upward(path_start, ['does_not_exist', 'test_cli.py'], marker_type='file') == path_test_dir.resolve()
+    True
+    >>> find_marker_directory_upward(path_start, 'test_cli.py', marker_type='dir') is None
+    True
+
+    >>> # Test the sibling is answered from the cache of the ancestors
+    >>> find_marker_directory_upward(path_test_dir / 'test_a' / 'test_a_b', 'tests', marker_type='dir') == path_test_dir.parent.resolve()
+    True
+
+    >>> invalidate_marker_search_cache()
+
+    """
+    if marker_type not in MARKER_TYPES:
+        raise ValueError(f'marker_type must be one of {MARKER_TYPES}, got "{marker_type}"')
+    t_markers = (markers, ) if isinstance(markers, str) else tuple(markers)
+    s_start = str(path_start)
+    # only absolute start paths are mapped - relative ones depend on the cwd
+    is_start_absolute = os.path.isabs(s_start)
+
+    with _marker_cache_lock:
+        s_resolved_start = _d_resolved_start_paths.get(s_start) if is_start_absolute else None
+        if s_resolved_start is not None:
+            _d_resolved_start_paths.move_to_end(s_start)
+    if s_resolved_start is None:
+        path_current = symlink_resolver.resolve_path(path_start)
+        s_resolved_start_new: Optional[str] = str(path_current)
+    else:
+        path_current = pathlib.Path(s_resolved_start)
+        s_resolved_start_new = None
+
+    # the directories on the way up - they all get the same result
+    l_visited = []
+    s_found = None
+    while True:
+        s_current = str(path_current)
+        cache_key = (t_markers, marker_type, s_current)
+        with _marker_cache_lock:
+            if cache_key in _d_marker_cache:
+                _d_marker_cache.move_to_end(cache_key)
+                s_found = _d_marker_cache[cache_key]
+                break
+        l_visited.append(s_current)
+        if any(_is_marker(os.path.join(s_current, marker), marker_type) for marker in t_markers):
+            s_found = s_current
+            break
+        if path_current.parent == path_current:
+            break
+        path_current = path_current.parent
+
+    with _marker_cache_lock:
+        for s_visited in l_visited:
+            _cache_set(_d_marker_cache, (t_markers, marker_type, s_visited), s_found)
+        if is_start_absolute and s_resolved_start_new is not None:
+            _cache_set(_d_resolved_start_paths, s_start, s_resolved_start_new)
+    return None if s_found is None else pathlib.Path(s_found)
+
+
+def invalidate_marker_search_cache(path: Optional[Union[str, pathlib.Path]] = None) -> None:
+    """
+    forget cached marker searches.
+    path None: forget everything, otherwise forget the results for path and its subdirectories,
+    and all results which point to path or one of its subdirectories - call it after creating or removing markers there.
+    path can be given as it is, or resolved - both are matched
+
+    >>> # Setup
+    >>> import tempfile, shutil
+    >>> path_temp_dir = pathlib.Path(os.path.realpath(tempfile.mkdtemp()))
+    >>> (path_temp_dir / 'real' / 'sub').mkdir(parents=True)
+    >>> (path_temp_dir / 'real' / 'marker').touch()
+    >>> (path_temp_dir / 'link').symlink_to('real')
+
+    >>> # Test a search which started at a symlink is invalidated with the resolved path
+    >>> find_marker_directory_upward(path_temp_dir / 'link' / 'sub', 'marker') == path_temp_dir / 'real'
+    True
+    >>> (path_temp_dir / 'real' / 'sub' / 'marker').touch()
+    >>> invalidate_marker_search_cache(path_temp_dir / 'real' / 'sub')
+    >>> find_marker_directory_upward(path_temp_dir / 'link' / 'sub', 'marker') == path_temp_dir / 'real' / 'sub'
+    True
+
+    >>> # Test the symlink path works too
+    >>> (path_temp_dir / 'real' / 'sub' / 'marker').unlink()
+    >>> invalidate_marker_search_cache(path_temp_dir / 'link' / 'sub')
+    >>> find_marker_directory_upward(path_temp_dir / 'link' / 'sub', 'marker') == path_temp_dir / 'real'
+    True
+
+    >>> # Teardown
+    >>> invalidate_marker_search_cache()
+    >>> shutil.rmtree(str(path_temp_dir))
+
+    """
+    if path is None:
+        with _marker_cache_lock:
+            _d_marker_cache.clear()
+            _d_resolved_start_paths.clear()
+        return
+    # resolved outside of the lock, it accesses the filesystem
+    t_path_prefixes = tuple({os.path.abspath(str(path)), str(symlink_resolver.resolve_path(path))})
+
+    def is_affected(s_directory: Optional[str]) -> bool:
+        return s_directory is not None and any(s_directory == s_path or s_directory.startswith(s_path.rstrip(os.sep) + os.sep)
+                                               for s_path in t_path_prefixes)
+
+    with _marker_cache_lock:
+        for cache_key in [cache_key for cache_key, s_found in _d_marker_cache.items() if is_affected(cache_key[2]) or is_affected(s_found)]:
+            del _d_marker_cache[cache_key]
+        for s_start in [s_start for s_start, s_resolved_start in _d_resolved_start_paths.items() if is_affected(s_start) or is_affected(s_resolved_start)]:
+            del _d_resolved_start_paths[s_start]
+
+
+def set_marker_search_cache_maxsize(maxsize: int) -> None:
+    """
+    sets the maximum number of cached directories (and of cached start paths), 0 disables the cache
+
+    >>> set_marker_search_cache_maxsize(-1)
+    Traceback (most recent call last):
+    ...
+    ValueError: maxsize must be >= 0, got -1
+    >>> set_marker_search_cache_maxsize(DEFAULT_MARKER_SEARCH_CACHE_MAXSIZE)
+    """
+    global _marker_cache_maxsize
+    if maxsize < 0:
+        raise ValueError(f'maxsize must be >= 0, got {maxsize}')
+    with _marker_cache_lock:
+        _marker_cache_maxsize = maxsize
+        for d_cache in (_d_marker_cache, _d_resolved_start_paths):
+            while len(d_cache) > maxsize:
+                d_cache.popitem(last=False)
@@ -0,0 +1,161 @@
+# STDLIB
+import os
+import pathlib
+from typing import Any, Tuple
+
+# a compact, immutable path value - parsed once into the normalized posix form (like strip_and_replace_backslashes),
+# with the classification flags computed once and packed into one int.
+# the path functions of lib_path.lib_path accept it in place of a str, and use the flags instead of parsing the string again.
+# the original string is kept (as reference - no copy) because path_join_posix normalizes the original, not the posix form.
+
+_FLAG_WINDOWS_NETWORK_UNC = 1
+_FLAG_WINDOWS_DRIVE_LETTER = 2
+_FLAG_ABSOLUTE = 4
+_FLAG_TRAILING_SLASH = 8
+
+
+def _get_flags(path: str) -> int:
+    """ the flags of a normalized path """
+    flags = 0
+    if path.startswith('//'):
+        flags |= _FLAG_WINDOWS_NETWORK_UNC
+    if path[1:].startswith(':/'):
+        flags |= _FLAG_WINDOWS_DRIVE_LETTER | _FLAG_ABSOLUTE
+    elif path.startswith('/'):
+        flags |= _FLAG_ABSOLUTE
+    if path.endswith('/'):
+        flags |= _FLAG_TRAILING_SLASH
+    return flags
+
+
+class ParsedPath(object):
+    """
+    immutable path, parsed once. str() and os.fspath() return the normalized posix form.
+
+    >>> path = ParsedPath('  c:\\\\test\\\\  ')
+    >>> path
+    ParsedPath('c:/test/')
+    >>> str(path), path.starts_with_windows_drive_letter, path.is_windows_network_unc, path.is_absolute, path.has_trailing_slash
+    ('c:/test/', True, False, True, True)
+    >>> ParsedPath(r'\\\\main\\install').is_windows_network_unc
+    True
+    >>> path / 'sub' / '..\\\\test2'
+    ParsedPath('c:/test/test2')
+    >>> path.to_pathlib().as_posix()
+    'c:/test'
+    >>> ParsedPath('c:/test/') == path, ParsedPath('c:/test') == path
+    (True, False)
+    >>> path.is_absolute = False
+    Traceback (most recent call last):
+    ...
+    AttributeError: ParsedPath is immutable
+
+    """
+    __slots__ = ('_path', '_flags', '_original')
+
+    _path: str
+    _flags: int
+    _original: str
+
+    def __init__(self, path: Any) -> None:
+        if isinstance(path, ParsedPath):
+            s_original, s_path, flags = path._original, path._path, path._flags
+        else:
+            # cast to string if we pass a path object
+            s_original = str(path)
+            # strip / replace return the same object if nothing changes - a normalized path is stored only once
+            s_path = s_original.strip().replace('\\', '/')
+            flags = _get_flags(s_path)
+        object.__setattr__(self, '_path', s_path)
+        object.__setattr__(self, '_flags', flags)
+        object.__setattr__(self, '_original', s_original)
+
+    @classmethod
+    def _from_normalized(cls, s_path: str) -> 'ParsedPath':
+        """ for paths which are normalized already - no strip / replace """
+        parsed_path = cls.__new__(cls)
+        object.__setattr__(parsed_path, '_path', s_path)
+        object.__setattr__(parsed_path, '_flags', _get_flags(s_path))
+        object.__setattr__(parsed_path, '_original', s_path)
+        return parsed_path
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError('ParsedPath is immutable')
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError('ParsedPath is immutable')
+
+    def __reduce__(self) -> Tuple[Any, Tuple[str]]:
+        return self.__class__, (self._original,)
+
+    @property
+    def path(self) -> str:
+        """ the normalized posix form """
+        return self._path
+
+    @property
+    def is_windows_network_unc(self) -> bool:
+        return bool(self._flags & _FLAG_WINDOWS_NETWORK_UNC)
+
+    @property
+    def starts_with_windows_drive_letter(self) -> bool:
+        return bool(self._flags & _FLAG_WINDOWS_DRIVE_LETTER)
+
+    @property
+    def is_absolute(self) -> bool:
+        """ starts with a slash or with a windows drive letter (like 'c:/') """
+        return bool(self._flags & _FLAG_ABSOLUTE)
+
+    @property
+    def has_trailing_slash(self) -> bool:
+        return bool(self._flags & _FLAG_TRAILING_SLASH)
+
+    def without_windows_drive_letter(self) -> str:
+        """ like substract_windows_drive_letter """
+        return self._path[2:] if self._flags & _FLAG_WINDOWS_DRIVE_LETTER else self._path
+
+    def without_trailing_slashes(self) -> str:
+        """ like path_remove_trailing_slashes """
+        return self._path.rstrip('/') if self._flags & _FLAG_TRAILING_SLASH else self._path
+
+    def joinpath(self, *paths: Any) -> 'ParsedPath':
+        """
+        like path_join_posix - the base path is not parsed again
+
+        >>> ParsedPath('//main').joinpath('\\\\test\\\\test2', 'test2')
+        ParsedPath('//main/test/test2/test2')
+        """
+        ls_paths = [str(s_path).replace('\\', '/').lstrip('/') for s_path in paths]
+        ret_path = os.path.join(os.path.normpath(self._original).strip().replace('\\', '/'), *ls_paths)
+        ret_path = os.path.normpath(ret_path).strip().replace('\\', '/')
+        if self._flags & _FLAG_WINDOWS_NETWORK_UNC:
+            ret_path = '//' + ret_path.lstrip('/')
+        return ParsedPath._from_normalized(ret_path)
+
+    def __truediv__(self, other: Any) -> 'ParsedPath':
+        return self.joinpath(other)
+
+    def to_pathlib(self) -> pathlib.Path:
+        return pathlib.Path(self._path)
+
+    def __str__(self) -> str:
+        return self._path
+
+    def __fspath__(self) -> str:
+        return self._path
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self._path!r})'
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, ParsedPath):
+            return self._path == other._path
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self._path)
+
+    def __lt__(self, other: 'ParsedPath') -> bool:
+        if isinstance(other, ParsedPath):
+            return self._path < other._path
+        return NotImplemented
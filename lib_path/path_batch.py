@@ -0,0 +1,100 @@
+# STDLIB
+import os
+from typing import Any, Dict, Iterable, List
+
+# batch variants of the path string functions in lib_path.lib_path.
+# the results are identical to the scalar functions - the per batch work
+# (normalizing the joined parts, looking up functions) is only done once.
+
+
+def _get_iterable_of_paths(paths: Any) -> Iterable[Any]:
+    """
+    accept lists, iterables and (optionally) NumPy / Arrow string arrays,
+    without importing numpy or pyarrow
+
+    >>> list(_get_iterable_of_paths(('a', 'b')))
+    ['a', 'b']
+
+    """
+    if hasattr(paths, 'to_pylist'):     # pyarrow Array / ChunkedArray
+        return paths.to_pylist()        # type: ignore
+    if hasattr(paths, 'tolist'):        # numpy ndarray
+        return paths.tolist()           # type: ignore
+    return paths  # type: ignore
+
+
+def strip_and_replace_backslashes_batch(paths: Iterable[str]) -> List[str]:
+    """
+    >>> strip_and_replace_backslashes_batch(['c:\\\\test', '\\\\\\\\main\\\\install', ' /test '])
+    ['c:/test', '//main/install', '/test']
+    """
+    return [path.strip().replace('\\', '/') for path in _get_iterable_of_paths(paths)]
+
+
+def is_windows_network_unc_batch(paths: Iterable[str]) -> List[bool]:
+    """
+    >>> is_windows_network_unc_batch(['/test', 'c:/test', '//main/install', '\\\\\\\\main\\\\install'])
+    [False, False, True, True]
+    """
+    return [path.strip().replace('\\', '/').startswith('//') for path in _get_iterable_of_paths(paths)]
+
+
+def substract_windows_drive_letter_batch(paths: Iterable[str]) -> List[str]:
+    """
+    >>> substract_windows_drive_letter_batch(['//main/install', '/test', 'c:\\\\test'])
+    ['//main/install', '/test', '/test']
+    """
+    l_results = []
+    for path in _get_iterable_of_paths(paths):
+        path = path.strip().replace('\\', '/')
+        if path[1:].startswith(':/'):
+            path = path[2:]
+        l_results.append(path)
+    return l_results
+
+
+def path_remove_trailing_slashes_batch(paths: Iterable[str]) -> List[str]:
+    """
+    >>> path_remove_trailing_slashes_batch(['//test//', '//test', 'c:\\\\test\\\\'])
+    ['//test', '//test', 'c:/test']
+    """
+    return [path.strip().replace('\\', '/').rstrip('/') for path in _get_iterable_of_paths(paths)]
+
+
+def path_join_posix_batch(paths: Iterable[str], *paths_to_join: str) -> List[str]:
+    """
+    joins the same paths_to_join to every path in paths, returns posix paths.
+    same result as [path_join_posix(path, *paths_to_join) for path in paths],
+    but the paths_to_join are prepared only once, and duplicate paths are computed only once.
+
+    >>> path_join_posix_batch([r'\\\\main', '//main', r'c:\\test'], 'test')
+    ['//main/test', '//main/test', 'c:/test/test']
+    >>> path_join_posix_batch(['//main', '/main'], '\\\\test\\\\test2', 'test2')
+    ['//main/test/test2/test2', '/main/test/test2/test2']
+    >>> path_join_posix_batch([])
+    []
+
+    >>> # Test identical results
+    >>> from lib_path.lib_path import path_join_posix
+    >>> l_test = ['//main', 'c:\\\\test', '  /../a', 'a/..', '', ' x ', '\\\\\\\\server\\\\share', 'c:']
+    >>> assert path_join_posix_batch(l_test, '/test', 'x\\\\y') == [path_join_posix(path, '/test', 'x\\\\y') for path in l_test]
+
+    """
+    ls_paths = [s_path.replace('\\', '/').lstrip('/') for s_path in paths_to_join]
+    normpath = os.path.normpath
+    join = os.path.join
+
+    d_results: Dict[str, str] = dict()
+    l_results: List[str] = []
+    for path in _get_iterable_of_paths(paths):
+        path = str(path)    # cast to string if we pass a path object
+        ret_path = d_results.get(path)
+        if ret_path is None:
+            is_windows_unc = path.strip().replace('\\', '/').startswith('//')
+            s_path = normpath(path).strip().replace('\\', '/')
+            ret_path = normpath(join(s_path, *ls_paths)).strip().replace('\\', '/')
+            if is_windows_unc:
+                ret_path = '//' + ret_path.lstrip('/')
+            d_results[path] = ret_path
+        l_results.append(ret_path)
+    return l_results
@@ -0,0 +1,198 @@
+# STDLIB
+import collections
+import threading
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Tuple
+
+# PROJ
+try:
+    from . import lib_path
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import lib_path                         # type: ignore  # pragma: no cover
+
+# opt-in memoization for the pure path string functions of lib_path.lib_path.
+# use the *_cached functions instead of the plain ones where the same paths are passed over and over.
+
+DEFAULT_PATH_CACHE_MAXSIZE = 4096
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+_sentinel = object()
+
+
+class LruCache(object):
+    """
+    thread safe bounded LRU cache with hit / miss counters.
+    the value is computed outside of the lock, so a slow computation does not block other threads -
+    two threads might compute the same (pure) value concurrently, which does no harm.
+
+    >>> cache = LruCache(maxsize=2)
+    >>> cache.get_or_compute('a', str.upper, 'a')
+    'A'
+    >>> cache.get_or_compute('a', str.upper, 'a')
+    'A'
+    >>> cache.get_or_compute('b', str.upper, 'b')
+    'B'
+    >>> cache.get_or_compute('c', str.upper, 'c')
+    'C'
+    >>> cache.cache_info()
+    CacheInfo(hits=1, misses=3, maxsize=2, currsize=2)
+
+    >>> # maxsize 0 disables caching
+    >>> cache.set_maxsize(0)
+    >>> cache.get_or_compute('a', str.upper, 'a')
+    'A'
+    >>> cache.cache_info()
+    CacheInfo(hits=1, misses=4, maxsize=0, currsize=0)
+
+    >>> cache.clear()
+    >>> cache.cache_info()
+    CacheInfo(hits=0, misses=0, maxsize=0, currsize=0)
+
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_PATH_CACHE_MAXSIZE) -> None:
+        if maxsize < 0:
+            raise ValueError(f'maxsize must be >= 0, got {maxsize}')
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: 'collections.OrderedDict[Hashable, Any]' = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, function: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            value = self._data.get(key, _sentinel)
+            if value is not _sentinel:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = function(*args)
+
+        with self._lock:
+            if self.maxsize > 0:
+                self._data[key] = value
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return value
+
+    def set_maxsize(self, maxsize: int) -> None:
+        if maxsize < 0:
+            raise ValueError(f'maxsize must be >= 0, got {maxsize}')
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def cache_info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(hits=self.hits, misses=self.misses, maxsize=self.maxsize, currsize=len(self._data))
+
+
+_d_path_caches: Dict[str, LruCache] = {
+    'path_join_posix': LruCache(),
+    'path_remove_trailing_slashes': LruCache(),
+    'is_windows_network_unc': LruCache(),
+    'path_starts_with_windows_drive_letter': LruCache(),
+    'substract_windows_drive_letter': LruCache(),
+}
+
+
+def path_join_posix_cached(path: str, *paths: str) -> str:
+    """
+    >>> path_join_posix_cached(r'\\\\main','test')
+    '//main/test'
+    >>> path_join_posix_cached('//main','\\\\test\\\\test2','test2')
+    '//main/test/test2/test2'
+    """
+    key: Tuple[str, ...] = (str(path),) + paths
+    return str(_d_path_caches['path_join_posix'].get_or_compute(key, lib_path.path_join_posix, path, *paths))
+
+
+def path_remove_trailing_slashes_cached(path: str) -> str:
+    """
+    >>> path_remove_trailing_slashes_cached('//test//')
+    '//test'
+    """
+    return str(_d_path_caches['path_remove_trailing_slashes'].get_or_compute(path, lib_path.path_remove_trailing_slashes, path))
+
+
+def is_windows_network_unc_cached(path: str) -> bool:
+    """
+    >>> is_windows_network_unc_cached('//main/install')
+    True
+    >>> is_windows_network_unc_cached('c:/test')
+    False
+    """
+    return bool(_d_path_caches['is_windows_network_unc'].get_or_compute(path, lib_path.is_windows_network_unc, path))
+
+
+def path_starts_with_windows_drive_letter_cached(path: str) -> bool:
+    """
+    >>> path_starts_with_windows_drive_letter_cached('c:\\\\test')
+    True
+    >>> path_starts_with_windows_drive_letter_cached('/test')
+    False
+    """
+    return bool(_d_path_caches['path_starts_with_windows_drive_letter'].get_or_compute(path, lib_path.path_starts_with_windows_drive_letter, path))
+
+
+def substract_windows_drive_letter_cached(path: str) -> str:
+    """
+    >>> substract_windows_drive_letter_cached('c:\\\\test')
+    '/test'
+    """
+    return str(_d_path_caches['substract_windows_drive_letter'].get_or_compute(path, lib_path.substract_windows_drive_letter, path))
+
+
+def set_path_cache_maxsize(maxsize: int) -> None:
+    """
+    sets the maximum number of entries of each path cache, 0 disables caching
+
+    >>> set_path_cache_maxsize(100)
+    >>> get_path_cache_info()['path_join_posix'].maxsize
+    100
+    >>> set_path_cache_maxsize(DEFAULT_PATH_CACHE_MAXSIZE)
+    """
+    for cache in _d_path_caches.values():
+        cache.set_maxsize(maxsize)
+
+
+def clear_path_caches() -> None:
+    """
+    empties all path caches and resets the hit / miss counters
+
+    >>> clear_path_caches()
+    >>> path_join_posix_cached('/main', 'test')
+    '/main/test'
+    >>> path_join_posix_cached('/main', 'test')
+    '/main/test'
+    >>> get_path_cache_info()['path_join_posix']
+    CacheInfo(hits=1, misses=1, maxsize=4096, currsize=1)
+    >>> clear_path_caches()
+
+    """
+    for cache in _d_path_caches.values():
+        cache.clear()
+
+
+def get_path_cache_info() -> Dict[str, CacheInfo]:
+    """
+    returns the hits, misses, maxsize and currsize of every path cache, keyed by function name
+    """
+    return {function_name: cache.cache_info() for function_name, cache in _d_path_caches.items()}
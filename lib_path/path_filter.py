@@ -0,0 +1,258 @@
+# STDLIB
+import pathlib
+import re
+from typing import Iterable, List, Optional, Pattern, Set, Tuple, Union
+
+# PROJ
+try:
+    from . import lib_path
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import lib_path                         # type: ignore  # pragma: no cover
+
+# include / exclude filter for directory traversals. all patterns are compiled once into a few combined matchers:
+#   - literal names (like '.git' or 'node_modules') go into a set - one lookup, no matter how many there are
+#   - patterns without a slash are matched against the name of the entry, in one combined regex
+#   - patterns with a slash are anchored at the root of the traversal, and matched against the relative path, in one combined regex
+# the paths are matched in the posix form of strip_and_replace_backslashes ('sub/dir/file.txt'), relative to the root of the traversal.
+#
+# syntax 'glob':        fnmatch like, '*' and '?' do not match '/', '**' matches any number of directories, a trailing '/' matches only directories
+# syntax 'gitignore':   like 'glob', plus comments ('#'), negation ('!') and backslash escapes. unlike git, a negation re-includes
+#                       regardless of the order of the patterns. like git, nothing below an excluded directory can be re-included
+# syntax 'regex':       python regular expressions, searched in the relative path
+
+PATTERN_SYNTAXES = ('glob', 'gitignore', 'regex')
+
+
+class _CompiledPatterns(object):
+    """ the combined matcher of a group of patterns """
+    __slots__ = ('set_names', 'name_regex', 'path_regex', 'is_search', 'ignore_case')
+
+    def __init__(self, set_names: Set[str], l_name_regexes: List[str], l_path_regexes: List[str], is_search: bool, ignore_case: bool) -> None:
+        flags = re.IGNORECASE if ignore_case else 0
+        self.set_names = {name.lower() for name in set_names} if ignore_case else set_names
+        self.name_regex = _get_combined_regex(l_name_regexes, is_search, flags)
+        self.path_regex = _get_combined_regex(l_path_regexes, is_search, flags)
+        self.is_search = is_search
+        self.ignore_case = ignore_case
+
+    def __bool__(self) -> bool:
+        return bool(self.set_names) or self.name_regex is not None or self.path_regex is not None
+
+    def matches(self, relative_path: str, name: str) -> bool:
+        if self.set_names and (name.lower() if self.ignore_case else name) in self.set_names:
+            return True
+        if self.is_search:
+            return self.path_regex is not None and self.path_regex.search(relative_path) is not None
+        if self.name_regex is not None and self.name_regex.match(name) is not None:
+            return True
+        return self.path_regex is not None and self.path_regex.match(relative_path) is not None
+
+
+def _get_combined_regex(l_regexes: List[str], is_search: bool, flags: int) -> Optional[Pattern[str]]:
+    if not l_regexes:
+        return None
+    combined = '|'.join(f'(?:{regex})' for regex in l_regexes)
+    if not is_search:
+        combined = f'(?:{combined})\\Z'
+    return re.compile(combined, flags)
+
+
+def _translate_segment(segment: str, has_escapes: bool) -> str:
+    """ one path component of a glob pattern to a regex, '*' and '?' do not match '/' """
+    l_parts: List[str] = []
+    index = 0
+    while index < len(segment):
+        char = segment[index]
+        index += 1
+        if char == '*':
+            if not l_parts or l_parts[-1] != '[^/]*':
+                l_parts.append('[^/]*')
+        elif char == '?':
+            l_parts.append('[^/]')
+        elif char == '[':
+            index_end = index + 1 if segment[index:index + 1] in ('!', '^') else index
+            index_end = segment.find(']', index_end + 1)
+            if index_end < 0:
+                l_parts.append('\\[')
+                continue
+            content = segment[index:index_end].replace('\\', '\\\\')
+            index = index_end + 1
+            if content[:1] in ('!', '^'):
+                l_parts.append(f'[^/{content[1:]}]')
+            else:
+                l_parts.append(f'[{content}]')
+        elif char == '\\' and has_escapes and index < len(segment):
+            l_parts.append(re.escape(segment[index]))
+            index += 1
+        else:
+            l_parts.append(re.escape(char))
+    return ''.join(l_parts)
+
+
+def _translate_glob(pattern: str, has_escapes: bool) -> Tuple[str, bool, bool]:
+    """ returns (regex, is_anchored, is_literal) - is_anchored: matched against the relative path, otherwise against the name """
+    is_anchored = '/' in pattern
+    l_segments = pattern.lstrip('/').split('/')
+    l_parts: List[str] = []
+    for index, segment in enumerate(l_segments):
+        is_last = index == len(l_segments) - 1
+        if segment == '**':
+            l_parts.append('.*' if is_last else '(?:.*/)?')
+        else:
+            l_parts.append(_translate_segment(segment, has_escapes) + ('' if is_last else '/'))
+    is_literal = not is_anchored and not any(char in pattern for char in '*?[\\')
+    return ''.join(l_parts), is_anchored, is_literal
+
+
+def _parse_gitignore_line(line: str) -> Optional[Tuple[str, bool]]:
+    """ returns (pattern, is_negated), or None for blank lines and comments """
+    line = line.rstrip('\r\n')
+    # trailing spaces are ignored, unless escaped
+    stripped_line = line.rstrip(' ')
+    if stripped_line.endswith('\\') and len(stripped_line) < len(line):
+        stripped_line += ' '
+    if not stripped_line or stripped_line.startswith('#'):
+        return None
+    if stripped_line.startswith('!'):
+        return stripped_line[1:], True
+    return stripped_line, False
+
+
+class _PatternGroups(object):
+    """ collects the patterns, split in literal names, name patterns and path patterns, for all entries or for directories only """
+
+    def __init__(self) -> None:
+        self.set_names: Set[str] = set()
+        self.set_dir_names: Set[str] = set()
+        self.l_name_regexes: List[str] = []
+        self.l_dir_name_regexes: List[str] = []
+        self.l_path_regexes: List[str] = []
+        self.l_dir_path_regexes: List[str] = []
+
+    def add_glob(self, pattern: str, has_escapes: bool) -> None:
+        is_dir_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+        if not pattern:
+            raise ValueError('the pattern "/" would match nothing')
+        regex, is_anchored, is_literal = _translate_glob(pattern, has_escapes)
+        if is_literal:
+            (self.set_dir_names if is_dir_only else self.set_names).add(pattern)
+        elif is_anchored:
+            (self.l_dir_path_regexes if is_dir_only else self.l_path_regexes).append(regex)
+        else:
+            (self.l_dir_name_regexes if is_dir_only else self.l_name_regexes).append(regex)
+
+    def compile(self, is_search: bool, ignore_case: bool) -> Tuple[_CompiledPatterns, _CompiledPatterns]:
+        """ returns the matchers (all entries, directories only) """
+        return (_CompiledPatterns(self.set_names, self.l_name_regexes, self.l_path_regexes, is_search, ignore_case),
+                _CompiledPatterns(self.set_dir_names, self.l_dir_name_regexes, self.l_dir_path_regexes, is_search, ignore_case))
+
+
+class PathFilter(object):
+    """
+    compiled include / exclude patterns for directory traversals like walk_tree or get_l_path_sub_directories.
+    excluded directories are pruned - the traversal does not descend into them.
+    include patterns (if any) select the entries which are not directories, directories are always descended into.
+
+    >>> path_filter = PathFilter(exclude=['.git/', 'node_modules', '*.pyc', '/build', 'docs/**/*.tmp'])
+    >>> path_filter.is_excluded('.git', is_dir=True), path_filter.is_excluded('.git', is_dir=False)
+    (True, False)
+    >>> path_filter.is_excluded('src\\\\node_modules\\\\package\\\\index.js'), path_filter.is_excluded('src/module.pyc')
+    (True, True)
+    >>> path_filter.is_excluded('build/lib'), path_filter.is_excluded('src/build/lib')
+    (True, False)
+    >>> path_filter.is_excluded('docs/a/b/c.tmp'), path_filter.is_excluded('docs/c.tmp'), path_filter.is_excluded('c.tmp')
+    (True, True, False)
+
+    >>> # Test gitignore negation and include
+    >>> path_filter = PathFilter(exclude=['# comment', '*.log', '!keep.log'], include=['*.log', '*.txt'], syntax='gitignore')
+    >>> [path for path in ['a.log', 'keep.log', 'a.txt', 'a.py'] if path_filter.is_selected(path)]
+    ['keep.log', 'a.txt']
+
+    >>> # Test regex, ignore case
+    >>> path_filter = PathFilter(exclude=[r'(^|/)__pycache__$', r'\\.BAK$'], syntax='regex', ignore_case=True)
+    >>> path_filter.is_excluded('src/__pycache__', is_dir=True), path_filter.is_excluded('a/file.bak'), path_filter.is_excluded('a/file.bak.txt')
+    (True, True, False)
+
+    >>> # Test wrong syntax
+    >>> PathFilter(exclude=['*'], syntax='xyz')
+    Traceback (most recent call last):
+    ...
+    ValueError: syntax must be one of ('glob', 'gitignore', 'regex'), got "xyz"
+
+    """
+
+    def __init__(self, exclude: Iterable[str] = (), include: Iterable[str] = (), syntax: str = 'glob', ignore_case: bool = False) -> None:
+        if syntax not in PATTERN_SYNTAXES:
+            raise ValueError(f'syntax must be one of {PATTERN_SYNTAXES}, got "{syntax}"')
+        self.syntax = syntax
+        self.ignore_case = ignore_case
+        exclude_groups, reinclude_groups, include_groups = _PatternGroups(), _PatternGroups(), _PatternGroups()
+        l_exclude_regexes: List[str] = []
+        l_include_regexes: List[str] = []
+
+        for patterns, groups, l_regexes in ((exclude, exclude_groups, l_exclude_regexes), (include, include_groups, l_include_regexes)):
+            for pattern in patterns:
+                if syntax == 'regex':
+                    l_regexes.append(pattern)
+                elif syntax == 'glob':
+                    pattern = lib_path.strip_and_replace_backslashes(pattern)
+                    if pattern:
+                        groups.add_glob(pattern, has_escapes=False)
+                else:
+                    parsed_line = _parse_gitignore_line(pattern)
+                    if parsed_line is None:
+                        continue
+                    pattern, is_negated = parsed_line
+                    if is_negated and groups is include_groups:
+                        raise ValueError(f'include patterns can not be negated, got "!{pattern}"')
+                    (reinclude_groups if is_negated else groups).add_glob(pattern, has_escapes=True)
+
+        if syntax == 'regex':
+            self._exclude = _CompiledPatterns(set(), [], l_exclude_regexes, True, ignore_case)
+            self._include = _CompiledPatterns(set(), [], l_include_regexes, True, ignore_case)
+            # no directory only patterns and no negation in regex syntax
+            self._exclude_dirs = self._reinclude = self._reinclude_dirs = _CompiledPatterns(set(), [], [], True, ignore_case)
+        else:
+            self._exclude, self._exclude_dirs = exclude_groups.compile(False, ignore_case)
+            self._reinclude, self._reinclude_dirs = reinclude_groups.compile(False, ignore_case)
+            self._include, include_dirs = include_groups.compile(False, ignore_case)
+            if include_dirs:
+                raise ValueError('include patterns select files, a pattern for directories only (trailing "/") can not be an include pattern')
+
+    @classmethod
+    def from_gitignore_file(cls, path_gitignore_file: Union[str, pathlib.Path], ignore_case: bool = False) -> 'PathFilter':
+        """ the exclude patterns of a .gitignore file - matched relative to the directory of the file """
+        return cls(exclude=pathlib.Path(path_gitignore_file).read_text(encoding='utf-8').splitlines(), syntax='gitignore', ignore_case=ignore_case)
+
+    def is_entry_excluded(self, relative_path: str, name: str, is_dir: bool) -> bool:
+        """
+        for traversals, which pass the relative posix path and the name of every entry -
+        the parent directories are not checked, the traversal did not descend into excluded directories
+        """
+        if not (self._exclude.matches(relative_path, name) or (is_dir and self._exclude_dirs.matches(relative_path, name))):
+            return False
+        return not (self._reinclude.matches(relative_path, name) or (is_dir and self._reinclude_dirs.matches(relative_path, name)))
+
+    def is_entry_selected(self, relative_path: str, name: str, is_dir: bool) -> bool:
+        """ not excluded, and a directory or matching the include patterns (if any) - like is_entry_excluded for traversals """
+        if self.is_entry_excluded(relative_path, name, is_dir):
+            return False
+        return is_dir or not self._include or self._include.matches(relative_path, name)
+
+    def is_excluded(self, path: Union[str, pathlib.Path], is_dir: bool = False) -> bool:
+        """ the relative path or one of its parent directories is excluded """
+        relative_path = lib_path.strip_and_replace_backslashes(str(path)).strip('/')
+        l_parts = relative_path.split('/')
+        for index in range(1, len(l_parts)):
+            if self.is_entry_excluded('/'.join(l_parts[:index]), l_parts[index - 1], True):
+                return True
+        return self.is_entry_excluded(relative_path, l_parts[-1], is_dir)
+
+    def is_selected(self, path: Union[str, pathlib.Path], is_dir: bool = False) -> bool:
+        """ the relative path is not excluded, and a directory or matching the include patterns (if any) """
+        if self.is_excluded(path, is_dir):
+            return False
+        relative_path = lib_path.strip_and_replace_backslashes(str(path)).strip('/')
+        return is_dir or not self._include or self._include.matches(relative_path, relative_path.rpartition('/')[2])
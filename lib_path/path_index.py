@@ -0,0 +1,103 @@
+# STDLIB
+import logging
+import pathlib
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+# PROJ
+try:
+    from . import symlink_resolver
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import symlink_resolver                 # type: ignore  # pragma: no cover
+
+logger: logging.Logger = logging.getLogger()
+
+# prefix index for bulk "is the target within a source directory" checks.
+# the source directories are resolved once and stored in a trie of path components,
+# a lookup is linear in the depth of the target path and independent of the number of source directories.
+
+_TERMINAL = ''      # an empty string is never a path component after splitting a resolved path
+
+
+def _get_path_components(path: Union[str, pathlib.Path], resolve: bool) -> List[str]:
+    path = pathlib.Path(path)
+    if resolve:
+        path = symlink_resolver.resolve_path(path)
+    return [component for component in str(path).replace('\\', '/').split('/') if component]
+
+
+class SourceDirectoryIndex(object):
+    """
+    like is_target_directory_within_source_directory, for many source directories at once.
+    a target is within a source directory, if it is the source directory itself or below it.
+    if more source directories contain the target, the innermost one is reported.
+
+    >>> # Setup
+    >>> index = SourceDirectoryIndex([pathlib.Path('/test'), pathlib.Path('/test2/sub'), pathlib.Path('/test/sub')])
+
+    >>> # Test
+    >>> str(index.find_source_directory(pathlib.Path('/test/test2')))
+    '/test'
+    >>> str(index.find_source_directory(pathlib.Path('/test/sub/x')))
+    '/test/sub'
+    >>> index.find_source_directory(pathlib.Path('/test2/test')) is None
+    True
+    >>> index.find_source_directory(pathlib.Path('/test_other')) is None
+    True
+    >>> [str(path) if path else None for path in index.find_source_directories(['/test2/sub', '/test2', '/test/x/../y'])]
+    ['/test2/sub', None, '/test']
+    >>> len(index)
+    3
+
+    >>> # Test raise
+    >>> index.log_and_raise_if_within_source_directory(pathlib.Path('/test2/test'))
+    >>> index.log_and_raise_if_within_source_directory(pathlib.Path('/test/test2'))
+    Traceback (most recent call last):
+    ...
+    FileExistsError: target directory: "..." is within the source directory "..."
+
+    """
+
+    def __init__(self, paths_source_directory: Iterable[Union[str, pathlib.Path]] = ()) -> None:
+        self._trie: Dict[str, Any] = dict()
+        self._n_source_directories = 0
+        for path_source_directory in paths_source_directory:
+            self.add(path_source_directory)
+
+    def __len__(self) -> int:
+        return self._n_source_directories
+
+    def add(self, path_source_directory: Union[str, pathlib.Path]) -> None:
+        """ resolves the source directory and adds it to the index """
+        path_source_resolved = symlink_resolver.resolve_path(path_source_directory)
+        node = self._trie
+        for component in _get_path_components(path_source_resolved, resolve=False):
+            node = node.setdefault(component, dict())
+        if _TERMINAL not in node:
+            self._n_source_directories += 1
+        node[_TERMINAL] = path_source_resolved
+
+    def find_source_directory(self, path_target_directory: Union[str, pathlib.Path], resolve: bool = True) -> Optional[pathlib.Path]:
+        """
+        returns the (resolved) innermost source directory which contains the target, or None
+        resolve: set to False if the target is already an absolute, resolved path - saves the realpath call
+        """
+        node = self._trie
+        path_found = node.get(_TERMINAL)
+        for component in _get_path_components(path_target_directory, resolve=resolve):
+            node = node.get(component)
+            if node is None:
+                break
+            path_found = node.get(_TERMINAL, path_found)
+        return path_found
+
+    def find_source_directories(self, paths_target_directory: Iterable[Union[str, pathlib.Path]], resolve: bool = True) -> List[Optional[pathlib.Path]]:
+        """ find_source_directory for many targets, the results are in the order of the targets """
+        return [self.find_source_directory(path_target_directory, resolve=resolve) for path_target_directory in paths_target_directory]
+
+    def log_and_raise_if_within_source_directory(self, path_target_directory: Union[str, pathlib.Path]) -> None:
+        path_source_directory = self.find_source_directory(path_target_directory)
+        if path_source_directory is not None:
+            s_error = f'target directory: "{path_target_directory}" is within the source directory "{path_source_directory}"'
+            logger.error(s_error)
+            raise FileExistsError(s_error)
@@ -0,0 +1,150 @@
+# STDLIB
+import os
+from typing import BinaryIO, Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# streaming of newline or NUL delimited paths, for the batch commands of lib_path_cli.
+# paths are read in blocks (one read per block, not per path), processed per block and written with one write per block.
+# paths are decoded / encoded with os.fsdecode / os.fsencode, so file names which are not valid utf-8 pass through unchanged.
+
+DEFAULT_READ_SIZE = 1 << 16
+
+PathFunction = Callable[[str], Iterable[str]]
+PathBatchFunction = Callable[[List[str]], Iterable[str]]
+ErrorHandler = Callable[[str, Exception], None]
+
+
+class StreamSummary(NamedTuple):
+    n_paths: int        # paths read
+    n_results: int      # paths written
+    n_errors: int       # paths which raised an error, passed to on_error
+
+
+def _get_delimiter(null_delimited: bool) -> bytes:
+    return b'\0' if null_delimited else b'\n'
+
+
+def iter_path_blocks(input_stream: BinaryIO, null_delimited: bool = False, read_size: int = DEFAULT_READ_SIZE) -> Iterator[List[str]]:
+    """
+    yields the paths of a binary stream in blocks, as soon as they are read - empty entries are skipped
+
+    >>> import io
+    >>> list(iter_path_blocks(io.BytesIO(b'/a\\n/b\\n\\n/c'), read_size=4))
+    [['/a'], ['/b'], ['/c']]
+    >>> list(iter_path_blocks(io.BytesIO(b'/a\\n1\\x00/b\\x00'), null_delimited=True))
+    [['/a\\n1', '/b']]
+
+    """
+    delimiter = _get_delimiter(null_delimited)
+    # read1 returns what is available, without waiting for read_size bytes - the results are streamed as the input comes in
+    read = getattr(input_stream, 'read1', input_stream.read)
+    rest = b''
+    while True:
+        data = read(read_size)
+        if not data:
+            break
+        l_raw_paths = (rest + data).split(delimiter)
+        rest = l_raw_paths.pop()
+        l_paths = [os.fsdecode(raw_path) for raw_path in l_raw_paths if raw_path]
+        if l_paths:
+            yield l_paths
+    if rest:
+        yield [os.fsdecode(rest)]
+
+
+def _write_paths(output_stream: BinaryIO, paths: Iterable[str], delimiter: bytes) -> int:
+    l_raw_paths = [os.fsencode(path) for path in paths]
+    if l_raw_paths:
+        output_stream.write(delimiter.join(l_raw_paths) + delimiter)
+    return len(l_raw_paths)
+
+
+def stream_paths_batch(function_batch: PathBatchFunction,
+                       input_stream: BinaryIO,
+                       output_stream: BinaryIO,
+                       null_delimited: bool = False) -> StreamSummary:
+    """
+    applies a batch function (a list of paths in, the results out) to the paths of input_stream, block by block.
+    for the path string functions, like path_remove_trailing_slashes_batch
+
+    >>> import io
+    >>> output_stream = io.BytesIO()
+    >>> stream_paths_batch(lambda paths: [path.upper() for path in paths], io.BytesIO(b'/a\\n/b\\n'), output_stream)
+    StreamSummary(n_paths=2, n_results=2, n_errors=0)
+    >>> output_stream.getvalue()
+    b'/A\\n/B\\n'
+
+    """
+    delimiter = _get_delimiter(null_delimited)
+    n_paths = n_results = 0
+    for l_paths in iter_path_blocks(input_stream, null_delimited=null_delimited):
+        n_paths += len(l_paths)
+        n_results += _write_paths(output_stream, function_batch(l_paths), delimiter)
+    output_stream.flush()
+    return StreamSummary(n_paths=n_paths, n_results=n_results, n_errors=0)
+
+
+def stream_paths(function: PathFunction,
+                 input_stream: BinaryIO,
+                 output_stream: BinaryIO,
+                 null_delimited: bool = False,
+                 max_workers: int = 1,
+                 on_error: Optional[ErrorHandler] = None) -> StreamSummary:
+    """
+    applies function to every path of input_stream - function returns the paths to write (none, one or many).
+    for the filesystem bound functions: with max_workers > 1 the paths of a block are processed in parallel threads,
+    the output keeps the order of the input.
+    OSError and ValueError (like an embedded NUL character) are passed to on_error(path, exc) and counted,
+    if on_error is None they are raised.
+
+    >>> # Setup
+    >>> import io
+    >>> path_test_dir = os.path.join(os.path.dirname(__file__), os.pardir, 'tests')
+    >>> input_data = os.fsencode(f'{path_test_dir}/dir_with_subdirs\\n{path_test_dir}/does_not_exist\\n')
+    >>> def list_subdirs(path):
+    ...     return [entry.name for entry in os.scandir(path) if entry.is_dir()]
+
+    >>> # Test
+    >>> output_stream = io.BytesIO()
+    >>> stream_paths(list_subdirs, io.BytesIO(input_data), output_stream, max_workers=2, on_error=lambda path, exc: None)
+    StreamSummary(n_paths=2, n_results=1, n_errors=1)
+    >>> output_stream.getvalue()
+    b'subdir\\n'
+
+    >>> # Test raise
+    >>> stream_paths(list_subdirs, io.BytesIO(input_data), io.BytesIO())
+    Traceback (most recent call last):
+    ...
+    FileNotFoundError: ...
+
+    """
+    delimiter = _get_delimiter(null_delimited)
+    n_paths = n_results = n_errors = 0
+
+    def _call(path: str) -> Tuple[List[str], Optional[Exception]]:
+        try:
+            return list(function(path)), None
+        except (OSError, ValueError) as exc:
+            if on_error is None:
+                raise
+            return [], exc
+
+    def _process(map_function: Callable[..., Iterator[Tuple[List[str], Optional[Exception]]]]) -> None:
+        nonlocal n_paths, n_results, n_errors
+        for l_paths in iter_path_blocks(input_stream, null_delimited=null_delimited):
+            n_paths += len(l_paths)
+            l_results: List[str] = []
+            for path, (l_path_results, exc) in zip(l_paths, map_function(_call, l_paths)):
+                if exc is not None:
+                    n_errors += 1
+                    on_error(path, exc)  # type: ignore
+                l_results.extend(l_path_results)
+            n_results += _write_paths(output_stream, l_results, delimiter)
+
+    if max_workers <= 1:
+        _process(map)
+    else:
+        import concurrent.futures
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            _process(executor.map)
+    output_stream.flush()
+    return StreamSummary(n_paths=n_paths, n_results=n_results, n_errors=n_errors)
@@ -0,0 +1,130 @@
+# STDLIB
+import concurrent.futures
+import logging
+import os
+import pathlib
+import stat
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+logger = logging.getLogger()
+
+# bulk path validation - every path is stat-ed only once, even if it is checked for more expectations,
+# and all failures are reported together, in one exception and one log entry.
+
+EXPECTATIONS = ('exists', 'isdir', 'isfile')
+
+# the same messages as log_and_raise_if_path_does_not_exist, log_and_raise_if_not_isdir, log_and_raise_if_not_isfile
+_D_ERROR_MESSAGES = {
+    'exists': 'path does not exist: {path}',
+    'isdir': 'not a directory : {path}',
+    'isfile': 'file does not exist or no permission: {path}',
+}
+
+
+class PathValidationFailure(NamedTuple):
+    path: pathlib.Path
+    expectation: str
+    message: str
+
+
+class PathValidationReport(NamedTuple):
+    n_checks: int
+    n_paths: int
+    failures: List[PathValidationFailure]
+
+    @property
+    def is_ok(self) -> bool:
+        return not self.failures
+
+    def get_message(self) -> str:
+        l_lines = [f'{len(self.failures)} of {self.n_checks} path checks failed:']
+        l_lines.extend(f'    {failure.message}' for failure in self.failures)
+        return '\n'.join(l_lines)
+
+
+class PathValidationError(Exception):
+    """ raised by validate_paths, the report with all failures is in the attribute report """
+    def __init__(self, report: PathValidationReport) -> None:
+        super().__init__(report.get_message())
+        self.report = report
+
+
+def _get_st_mode(path: str) -> Optional[int]:
+    """ the st_mode of the path (following symlinks, like pathlib exists / is_dir / is_file), None if it can not be stat-ed """
+    try:
+        return os.stat(path).st_mode
+    except (OSError, ValueError):
+        return None
+
+
+def _is_expectation_met(st_mode: Optional[int], expectation: str) -> bool:
+    if st_mode is None:
+        return False
+    if expectation == 'isdir':
+        return stat.S_ISDIR(st_mode)
+    if expectation == 'isfile':
+        return stat.S_ISREG(st_mode)
+    return True
+
+
+def validate_paths(path_checks: Iterable[Tuple[Union[str, pathlib.Path], str]],
+                   max_workers: int = 1,
+                   raise_on_failure: bool = True) -> PathValidationReport:
+    """
+    checks many (path, expectation) pairs, expectation is one of 'exists', 'isdir', 'isfile'.
+    every path is stat-ed once, optionally in parallel threads (max_workers > 1).
+    failures are logged in one log entry (with the failures in the "path_validation_failures" attribute of the log record),
+    and raised as one PathValidationError - or only returned in the report, if raise_on_failure is False
+
+    >>> # Setup
+    >>> path_test_file = pathlib.Path(__file__)
+    >>> path_test_dir = path_test_file.parent
+
+    >>> # Test OK
+    >>> validate_paths([(path_test_dir, 'isdir'), (path_test_dir, 'exists'), (path_test_file, 'isfile')]).is_ok
+    True
+
+    >>> # Test failures, without raising
+    >>> report = validate_paths([(path_test_file, 'isdir'), ('does_not_exist', 'exists'), ('does_not_exist', 'isfile')],
+    ...                         max_workers=2, raise_on_failure=False)
+    >>> report.n_checks, report.n_paths, [failure.expectation for failure in report.failures]
+    (3, 2, ['isdir', 'exists', 'isfile'])
+
+    >>> # Test Raise
+    >>> validate_paths([(path_test_dir, 'isdir'), ('does_not_exist', 'exists')])
+    Traceback (most recent call last):
+    ...
+    lib_path.path_validation.PathValidationError: 1 of 2 path checks failed:
+        path does not exist: does_not_exist
+
+    >>> # Test wrong expectation
+    >>> validate_paths([(path_test_dir, 'is_directory')])
+    Traceback (most recent call last):
+    ...
+    ValueError: expectation must be one of ('exists', 'isdir', 'isfile'), got "is_directory"
+
+    """
+    l_path_checks: List[Tuple[pathlib.Path, str]] = []
+    for path, expectation in path_checks:
+        if expectation not in EXPECTATIONS:
+            raise ValueError(f'expectation must be one of {EXPECTATIONS}, got "{expectation}"')
+        l_path_checks.append((pathlib.Path(path), expectation))
+
+    # dict keeps the order - every path is stat-ed only once
+    l_unique_paths = list(dict.fromkeys(str(path) for path, _ in l_path_checks))
+    if max_workers > 1 and len(l_unique_paths) > 1:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(l_unique_paths))) as executor:
+            d_st_modes: Dict[str, Optional[int]] = dict(zip(l_unique_paths, executor.map(_get_st_mode, l_unique_paths)))
+    else:
+        d_st_modes = {path: _get_st_mode(path) for path in l_unique_paths}
+
+    l_failures = [PathValidationFailure(path=path, expectation=expectation, message=_D_ERROR_MESSAGES[expectation].format(path=path))
+                  for path, expectation in l_path_checks
+                  if not _is_expectation_met(d_st_modes[str(path)], expectation)]
+
+    report = PathValidationReport(n_checks=len(l_path_checks), n_paths=len(l_unique_paths), failures=l_failures)
+    if not report.is_ok:
+        logger.error(report.get_message(), extra={'path_validation_failures': [(str(failure.path), failure.expectation) for failure in l_failures]})
+        if raise_on_failure:
+            raise PathValidationError(report)
+    return report
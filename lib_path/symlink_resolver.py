@@ -0,0 +1,209 @@
+# STDLIB
+import os
+import pathlib
+import stat
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+# PROJ
+try:
+    from . import path_cache
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import path_cache                       # type: ignore  # pragma: no cover
+
+# caching path resolution (like os.path.realpath / pathlib.Path.resolve), posix only - elsewhere it falls back to os.path.realpath.
+# every resolved prefix is cached, keyed by the resolved parent directory and the name of the component -
+# resolving '/a/b/c/d' after '/a/b/c/x' needs one lstat for 'd' instead of four.
+# the library functions which resolve paths (is_target_directory_within_source_directory, get_current_dir, find_marker_directory_upward,
+# SourceDirectoryIndex) use the shared resolver when it is enabled with enable_symlink_cache.
+# symlinks which change while they are cached are noticed after ttl_seconds, or after invalidate.
+
+DEFAULT_SYMLINK_CACHE_TTL_SECONDS = 10.0
+DEFAULT_SYMLINK_CACHE_MAXSIZE = 65536
+
+
+class _SymlinkLoop(Exception):
+    """ a symlink loop - the path is resolved again with os.path.realpath, nothing is cached """
+
+
+class SymlinkResolver(object):
+    """
+    thread safe resolver, which caches the resolved path prefixes for ttl_seconds, up to maxsize entries (the oldest are dropped first).
+    the results are the same as of os.path.realpath - components which do not exist are kept as they are, and are not cached.
+
+    >>> # Setup
+    >>> import tempfile, shutil
+    >>> path_temp_dir = pathlib.Path(os.path.realpath(tempfile.mkdtemp()))
+    >>> (path_temp_dir / 'real' / 'sub').mkdir(parents=True)
+    >>> (path_temp_dir / 'link').symlink_to('real')
+    >>> (path_temp_dir / 'loop').symlink_to('loop')
+
+    >>> # Test
+    >>> resolver = SymlinkResolver()
+    >>> resolver.resolve(path_temp_dir / 'link' / 'sub') == str(path_temp_dir / 'real' / 'sub')
+    True
+    >>> resolver.resolve(path_temp_dir / 'link' / 'sub' / '..' / 'does_not_exist') == str(path_temp_dir / 'real' / 'does_not_exist')
+    True
+    >>> resolver.resolve(path_temp_dir / 'loop' / 'x') == os.path.realpath(path_temp_dir / 'loop' / 'x')
+    True
+
+    >>> # Test cached - only the last component is new
+    >>> misses = resolver.cache_info().misses
+    >>> resolver.resolve(path_temp_dir / 'link' / 'sub' / 'other') == str(path_temp_dir / 'real' / 'sub' / 'other')
+    True
+    >>> resolver.cache_info().misses - misses
+    1
+
+    >>> # Test invalidate
+    >>> (path_temp_dir / 'link').unlink()
+    >>> (path_temp_dir / 'link').symlink_to('real/sub')
+    >>> resolver.resolve(path_temp_dir / 'link') == str(path_temp_dir / 'real')
+    True
+    >>> resolver.invalidate(path_temp_dir / 'link')
+    >>> resolver.resolve(path_temp_dir / 'link') == str(path_temp_dir / 'real' / 'sub')
+    True
+
+    >>> # Teardown
+    >>> shutil.rmtree(str(path_temp_dir))
+
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_SYMLINK_CACHE_TTL_SECONDS, maxsize: int = DEFAULT_SYMLINK_CACHE_MAXSIZE) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        # path with resolved parent -> (resolved path, expiry time)
+        self._d_resolved: Dict[str, Tuple[str, float]] = dict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def resolve(self, path: Union[str, pathlib.Path]) -> str:
+        s_path = str(path)
+        if os.name != 'posix':
+            return os.path.realpath(s_path)
+        if not s_path.startswith('/'):
+            s_path = os.path.join(os.getcwd(), s_path)
+        try:
+            return self._resolve(s_path, set())
+        except _SymlinkLoop:
+            return os.path.realpath(s_path)
+
+    def resolve_many(self, paths: Iterable[Union[str, pathlib.Path]]) -> List[str]:
+        """ resolve for many paths, the results are in the order of the paths """
+        return [self.resolve(path) for path in paths]
+
+    def _resolve(self, s_path: str, set_resolving: Set[str]) -> str:
+        """ resolves an absolute path, like posixpath._joinrealpath - '..' is applied to the resolved path """
+        s_resolved = '/'
+        for name in s_path.split('/'):
+            if not name or name == '.':
+                continue
+            if name == '..':
+                s_resolved = os.path.dirname(s_resolved)
+                continue
+            s_resolved = self._resolve_component(s_resolved + name if s_resolved == '/' else f'{s_resolved}/{name}', set_resolving)
+        return s_resolved
+
+    def _resolve_component(self, s_path: str, set_resolving: Set[str]) -> str:
+        """ s_path has a resolved parent directory """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._d_resolved.get(s_path)
+            if cached is not None and cached[1] > now:
+                self._hits += 1
+                return cached[0]
+            self._misses += 1
+
+        try:
+            stat_result = os.lstat(s_path)
+        except OSError:
+            # like os.path.realpath - kept as it is, not cached
+            return s_path
+        if stat.S_ISLNK(stat_result.st_mode):
+            if s_path in set_resolving:
+                raise _SymlinkLoop(s_path)
+            set_resolving.add(s_path)
+            s_target = os.readlink(s_path)
+            s_resolved = self._resolve(s_target if s_target.startswith('/') else f'{os.path.dirname(s_path)}/{s_target}', set_resolving)
+            set_resolving.discard(s_path)
+        else:
+            s_resolved = s_path
+
+        with self._lock:
+            if self.maxsize > 0:
+                self._d_resolved.pop(s_path, None)
+                if len(self._d_resolved) >= self.maxsize:
+                    del self._d_resolved[next(iter(self._d_resolved))]
+                self._d_resolved[s_path] = (s_resolved, now + self.ttl_seconds)
+        return s_resolved
+
+    def invalidate(self, path: Optional[Union[str, pathlib.Path]] = None) -> None:
+        """
+        forget everything (path None), or the entries for path and below, and the entries which resolve to path or below -
+        call it after changing symlinks there. path is not resolved, pass the path as the symlink was reached
+        """
+        with self._lock:
+            if path is None:
+                self._d_resolved.clear()
+                return
+            s_path = os.path.abspath(str(path))
+            s_path_prefix = s_path.rstrip('/') + '/'
+
+            def is_affected(s_directory: str) -> bool:
+                return s_directory == s_path or s_directory.startswith(s_path_prefix)
+
+            for s_key in [s_key for s_key, (s_resolved, _) in self._d_resolved.items() if is_affected(s_key) or is_affected(s_resolved)]:
+                del self._d_resolved[s_key]
+
+    def cache_info(self) -> path_cache.CacheInfo:
+        with self._lock:
+            return path_cache.CacheInfo(hits=self._hits, misses=self._misses, maxsize=self.maxsize, currsize=len(self._d_resolved))
+
+
+_shared_resolver: Optional[SymlinkResolver] = None
+
+
+def enable_symlink_cache(ttl_seconds: float = DEFAULT_SYMLINK_CACHE_TTL_SECONDS, maxsize: int = DEFAULT_SYMLINK_CACHE_MAXSIZE) -> None:
+    """
+    the library functions resolve paths with a shared SymlinkResolver from now on - a new, empty one
+
+    >>> enable_symlink_cache()
+    >>> is_symlink_cache_enabled(), resolve_path('/') == pathlib.Path('/').resolve()
+    (True, True)
+    >>> disable_symlink_cache()
+    >>> is_symlink_cache_enabled()
+    False
+    """
+    global _shared_resolver
+    _shared_resolver = SymlinkResolver(ttl_seconds=ttl_seconds, maxsize=maxsize)
+
+
+def disable_symlink_cache() -> None:
+    global _shared_resolver
+    _shared_resolver = None
+
+
+def is_symlink_cache_enabled() -> bool:
+    return _shared_resolver is not None
+
+
+def get_symlink_resolver() -> Optional[SymlinkResolver]:
+    """ the shared resolver, None if the cache is not enabled """
+    return _shared_resolver
+
+
+def invalidate_symlink_cache(path: Optional[Union[str, pathlib.Path]] = None) -> None:
+    """ invalidate of the shared resolver, if the cache is enabled """
+    resolver = _shared_resolver
+    if resolver is not None:
+        resolver.invalidate(path)
+
+
+def resolve_path(path: Union[str, pathlib.Path]) -> pathlib.Path:
+    """ pathlib.Path(path).resolve(), with the shared resolver if the cache is enabled """
+    resolver = _shared_resolver
+    if resolver is None:
+        return pathlib.Path(path).resolve()
+    return pathlib.Path(resolver.resolve(path))
@@ -0,0 +1,413 @@
+# STDLIB
+import errno
+import logging
+import os
+import pathlib
+import shutil
+import stat
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+# PROJ
+try:
+    from . import lib_path
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import lib_path                         # type: ignore  # pragma: no cover
+
+logger: logging.Logger = logging.getLogger()
+
+# tree copy / mirror.
+# the directories are walked in the calling thread, the files are copied by a bounded thread pool.
+# file data is copied in the kernel where possible: os.copy_file_range (which allows reflinks and server side copies),
+# then os.sendfile, then a plain read / write loop.
+# if a method stops short of the size of the source file (copy_file_range returns 0 on some filesystems, like procfs or fuse),
+# the next method continues at the same offset.
+# the data is written to a temporary file in the target directory, which replaces the target file when it is complete -
+# a crash leaves the old target file, and hardlinks of the target file are not changed.
+# copied files always get the mtime of the source file, so the next run can skip them (same size and mtime, like rsync).
+
+DEFAULT_MAX_WORKERS = 8
+_CHUNK_SIZE = 1 << 30
+_BUFFER_SIZE = 1 << 20
+
+# the kernel or the filesystem does not support the zero copy call for these files - try the next method
+_ZERO_COPY_NOT_SUPPORTED_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF, errno.ETXTBSY}
+
+
+class CopyProgress(NamedTuple):
+    n_files_copied: int
+    n_files_skipped: int         # unchanged files
+    n_bytes_copied: int
+    n_errors: int
+
+
+class CopySummary(NamedTuple):
+    n_directories: int           # directories in the source tree, including the root
+    n_files_copied: int          # files and symlinks
+    n_files_skipped: int         # unchanged files and symlinks
+    n_bytes_copied: int
+    n_entries_deleted: int       # entries of the target which are not in the source (mirror)
+    errors: List[OSError]
+
+
+ProgressCallback = Callable[[CopyProgress], None]
+
+
+def _copy_file_data(fd_source: int, fd_target: int, size: int) -> int:
+    """ copies until the end of the source file, returns the number of bytes - size: the size of the source file at opening time """
+    n_bytes = 0
+    copy_file_range = getattr(os, 'copy_file_range', None)
+    if copy_file_range is not None:
+        try:
+            while True:
+                n_copied = copy_file_range(fd_source, fd_target, _CHUNK_SIZE)
+                if not n_copied:
+                    break
+                n_bytes += n_copied
+            if n_bytes >= size:
+                return n_bytes
+        except OSError as exc:
+            if exc.errno not in _ZERO_COPY_NOT_SUPPORTED_ERRNOS or n_bytes:
+                raise
+
+    if hasattr(os, 'sendfile'):
+        n_bytes_before = n_bytes
+        try:
+            while True:
+                n_copied = os.sendfile(fd_target, fd_source, None, _CHUNK_SIZE)
+                if not n_copied:
+                    break
+                n_bytes += n_copied
+            if n_bytes >= size:
+                return n_bytes
+        except OSError as exc:
+            # copy_file_range may have stopped short before - the offsets of both files are at n_bytes_before then
+            if exc.errno not in _ZERO_COPY_NOT_SUPPORTED_ERRNOS or n_bytes > n_bytes_before:
+                raise
+
+    while True:
+        data = os.read(fd_source, _BUFFER_SIZE)
+        if not data:
+            return n_bytes
+        n_bytes += len(data)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd_target, view):]
+
+
+def copy_file(path_source_file: Union[str, pathlib.Path], path_target_file: Union[str, pathlib.Path], preserve_metadata: bool = False) -> int:
+    """
+    copies the data of a file with zero copy system calls where possible, sets the mtime of the source.
+    the data is written to a temporary file, which replaces the target file when it is complete (a symlink as target is replaced too).
+    preserve_metadata: also copy the permission bits, atime and flags (like shutil.copystat)
+    returns the number of bytes copied
+
+    >>> # Setup
+    >>> import tempfile
+    >>> path_temp_dir = pathlib.Path(tempfile.mkdtemp())
+    >>> (path_temp_dir / 'source.txt').write_bytes(b'test' * 1000)
+    4000
+
+    >>> # Test
+    >>> copy_file(path_temp_dir / 'source.txt', path_temp_dir / 'target.txt')
+    4000
+    >>> (path_temp_dir / 'target.txt').read_bytes() == (path_temp_dir / 'source.txt').read_bytes()
+    True
+    >>> os.stat(path_temp_dir / 'target.txt').st_mtime_ns == os.stat(path_temp_dir / 'source.txt').st_mtime_ns
+    True
+
+    >>> # Test a hardlink of the target is not changed, no temporary file is left
+    >>> os.link(path_temp_dir / 'target.txt', path_temp_dir / 'hardlink.txt')
+    >>> (path_temp_dir / 'source.txt').write_bytes(b'new')
+    3
+    >>> copy_file(path_temp_dir / 'source.txt', path_temp_dir / 'target.txt')
+    3
+    >>> (path_temp_dir / 'target.txt').read_bytes(), len((path_temp_dir / 'hardlink.txt').read_bytes())
+    (b'new', 4000)
+    >>> sorted(path.name for path in path_temp_dir.iterdir())
+    ['hardlink.txt', 'source.txt', 'target.txt']
+
+    >>> # Teardown
+    >>> shutil.rmtree(str(path_temp_dir))
+
+    """
+    s_target_directory, s_target_name = os.path.split(str(path_target_file))
+    fd_source = os.open(str(path_source_file), os.O_RDONLY)
+    try:
+        stat_source = os.fstat(fd_source)
+        fd_target, s_temp_file = _open_temp_file(s_target_directory, s_target_name, stat.S_IMODE(stat_source.st_mode))
+        try:
+            try:
+                n_bytes = _copy_file_data(fd_source, fd_target, stat_source.st_size)
+            finally:
+                os.close(fd_target)
+            if preserve_metadata:
+                shutil.copystat(str(path_source_file), s_temp_file)
+            else:
+                os.utime(s_temp_file, ns=(stat_source.st_atime_ns, stat_source.st_mtime_ns))
+            os.replace(s_temp_file, str(path_target_file))
+        except BaseException:
+            try:
+                os.unlink(s_temp_file)
+            except OSError:
+                pass
+            raise
+    finally:
+        os.close(fd_source)
+    return n_bytes
+
+
+def _open_temp_file(s_directory: str, s_name: str, mode: int) -> Tuple[int, str]:
+    """ creates a new hidden file next to the target file, returns the file descriptor and the path """
+    while True:
+        s_temp_file = os.path.join(s_directory, f'.{s_name}.{os.urandom(4).hex()}.tmp')
+        try:
+            return os.open(s_temp_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode), s_temp_file
+        except FileExistsError:
+            pass
+
+
+class _TreeCopier(object):
+    def __init__(self, preserve_metadata: bool, skip_unchanged: bool, progress_callback: Optional[ProgressCallback]) -> None:
+        self.preserve_metadata = preserve_metadata
+        self.skip_unchanged = skip_unchanged
+        self.progress_callback = progress_callback
+        self.lock = threading.Lock()
+        self.n_directories = 0
+        self.n_files_copied = 0
+        self.n_files_skipped = 0
+        self.n_bytes_copied = 0
+        self.n_entries_deleted = 0
+        self.errors: List[OSError] = []
+
+    def add_error(self, exc: OSError) -> None:
+        with self.lock:
+            self.errors.append(exc)
+
+    def _report(self, n_files_copied: int, n_files_skipped: int, n_bytes: int) -> None:
+        with self.lock:
+            self.n_files_copied += n_files_copied
+            self.n_files_skipped += n_files_skipped
+            self.n_bytes_copied += n_bytes
+            progress = CopyProgress(n_files_copied=self.n_files_copied, n_files_skipped=self.n_files_skipped,
+                                    n_bytes_copied=self.n_bytes_copied, n_errors=len(self.errors))
+        if self.progress_callback is not None:
+            self.progress_callback(progress)
+
+    def copy_file(self, path_source: str, path_target: str, stat_source: os.stat_result, stat_target: Optional[os.stat_result]) -> None:
+        """ runs in the worker threads """
+        try:
+            if (self.skip_unchanged and stat_target is not None and stat.S_ISREG(stat_target.st_mode)
+                    and stat_target.st_size == stat_source.st_size and stat_target.st_mtime_ns == stat_source.st_mtime_ns):
+                self._report(0, 1, 0)
+                return
+            if stat_target is not None and not stat.S_ISREG(stat_target.st_mode):
+                self.remove(path_target, stat_target)
+            n_bytes = copy_file(path_source, path_target, preserve_metadata=self.preserve_metadata)
+            self._report(1, 0, n_bytes)
+        except OSError as exc:
+            self.add_error(exc)
+
+    def copy_symlink(self, path_source: str, path_target: str, stat_target: Optional[os.stat_result]) -> None:
+        try:
+            link_target = os.readlink(path_source)
+            if stat_target is not None:
+                if stat.S_ISLNK(stat_target.st_mode) and os.readlink(path_target) == link_target:
+                    self._report(0, 1, 0)
+                    return
+                self.remove(path_target, stat_target)
+            os.symlink(link_target, path_target)
+            self._report(1, 0, 0)
+        except OSError as exc:
+            self.add_error(exc)
+
+    def remove(self, path: str, stat_result: os.stat_result) -> None:
+        if stat.S_ISDIR(stat_result.st_mode):
+            shutil.rmtree(path)
+        else:
+            os.unlink(path)
+
+    def scan_target(self, path_target_directory: str) -> Dict[str, os.stat_result]:
+        d_target_entries: Dict[str, os.stat_result] = dict()
+        try:
+            with os.scandir(path_target_directory) as it_dir_entries:
+                for dir_entry in it_dir_entries:
+                    try:
+                        d_target_entries[dir_entry.name] = dir_entry.stat(follow_symlinks=False)
+                    except OSError as exc:
+                        self.add_error(exc)
+        except FileNotFoundError:
+            os.mkdir(path_target_directory)
+        return d_target_entries
+
+    def delete_extra_entries(self, path_target_directory: str, d_target_entries: Dict[str, os.stat_result]) -> None:
+        for name, stat_target in d_target_entries.items():
+            try:
+                self.remove(os.path.join(path_target_directory, name), stat_target)
+                with self.lock:
+                    self.n_entries_deleted += 1
+            except OSError as exc:
+                self.add_error(exc)
+
+    def copy_directory(self, s_source_directory: str, s_target_directory: str, mirror: bool,
+                       submit_file_copy: Callable[[str, str, os.stat_result, Optional[os.stat_result]], None]) -> Optional[List[Tuple[str, str]]]:
+        """
+        copies the symlinks of a directory, submits the files, returns the (source, target) subdirectories -
+        None if the directory can not be read
+        """
+        self.n_directories += 1
+        try:
+            d_target_entries = self.scan_target(s_target_directory)
+            it_source_entries = os.scandir(s_source_directory)
+        except OSError as exc:
+            self.add_error(exc)
+            return None
+        l_sub_directories: List[Tuple[str, str]] = []
+        with it_source_entries:
+            for dir_entry in it_source_entries:
+                path_target_entry = os.path.join(s_target_directory, dir_entry.name)
+                stat_target = d_target_entries.pop(dir_entry.name, None)
+                try:
+                    stat_source = dir_entry.stat(follow_symlinks=False)
+                    if stat.S_ISDIR(stat_source.st_mode):
+                        if stat_target is not None and not stat.S_ISDIR(stat_target.st_mode):
+                            self.remove(path_target_entry, stat_target)
+                        l_sub_directories.append((dir_entry.path, path_target_entry))
+                    elif stat.S_ISLNK(stat_source.st_mode):
+                        self.copy_symlink(dir_entry.path, path_target_entry, stat_target)
+                    elif stat.S_ISREG(stat_source.st_mode):
+                        submit_file_copy(dir_entry.path, path_target_entry, stat_source, stat_target)
+                except OSError as exc:
+                    self.add_error(exc)
+        if mirror:
+            self.delete_extra_entries(s_target_directory, d_target_entries)
+        return l_sub_directories
+
+    def get_summary(self) -> CopySummary:
+        return CopySummary(n_directories=self.n_directories, n_files_copied=self.n_files_copied, n_files_skipped=self.n_files_skipped,
+                           n_bytes_copied=self.n_bytes_copied, n_entries_deleted=self.n_entries_deleted, errors=self.errors)
+
+
+def copy_tree(path_source_directory: Union[str, pathlib.Path],
+              path_target_directory: Union[str, pathlib.Path],
+              mirror: bool = False,
+              skip_unchanged: bool = True,
+              preserve_metadata: bool = False,
+              max_workers: int = DEFAULT_MAX_WORKERS,
+              progress_callback: Optional[ProgressCallback] = None) -> CopySummary:
+    """
+    copies the tree below path_source_directory to path_target_directory (created if needed).
+    symlinks are copied as symlinks, special files (fifos, sockets, devices) are not copied.
+    errors are collected in the summary and do not stop the copy.
+
+    mirror:             delete the entries of the target which are not in the source
+    skip_unchanged:     do not copy files which have the same size and mtime in the target
+    preserve_metadata:  copy the permission bits, times and flags of files and directories (like shutil.copystat).
+                        the mtime of copied files is always set
+    max_workers:        the number of threads which copy files - at most max_workers * 4 files are queued
+    progress_callback:  called with CopyProgress after every file and symlink - files are reported from the worker threads.
+                        an exception of the callback stops the copy and is raised, after the running file copies are finished
+
+    raises FileExistsError if the target directory is within the source directory,
+    or, with mirror, if the source directory is within the target directory
+
+    >>> # Setup
+    >>> import tempfile
+    >>> path_temp_dir = pathlib.Path(tempfile.mkdtemp())
+    >>> path_source, path_target = path_temp_dir / 'source', path_temp_dir / 'target'
+    >>> (path_source / 'sub').mkdir(parents=True)
+    >>> (path_source / 'sub' / 'file.txt').write_text('test')
+    4
+    >>> (path_source / 'link').symlink_to('sub')
+
+    >>> # Test copy
+    >>> summary = copy_tree(path_source, path_target)
+    >>> summary.n_directories, summary.n_files_copied, summary.n_bytes_copied, summary.errors
+    (2, 2, 4, [])
+    >>> (path_target / 'sub' / 'file.txt').read_text(), os.readlink(path_target / 'link')
+    ('test', 'sub')
+
+    >>> # Test unchanged files are skipped, extra files are deleted with mirror
+    >>> (path_target / 'extra.txt').touch()
+    >>> l_progress = []
+    >>> summary = copy_tree(path_source, path_target, mirror=True, progress_callback=l_progress.append)
+    >>> summary.n_files_copied, summary.n_files_skipped, summary.n_entries_deleted, l_progress[-1]
+    (0, 2, 1, CopyProgress(n_files_copied=0, n_files_skipped=2, n_bytes_copied=0, n_errors=0))
+
+    >>> # Test exceptions of the worker threads are raised
+    >>> def progress_callback(progress):
+    ...     raise RuntimeError('stop')
+    >>> copy_tree(path_source, path_temp_dir / 'target2', progress_callback=progress_callback)
+    Traceback (most recent call last):
+    ...
+    RuntimeError: stop
+
+    >>> # Test the guard
+    >>> copy_tree(path_source, path_source / 'sub' / 'copy')
+    Traceback (most recent call last):
+    ...
+    FileExistsError: target directory: "..." is within the source directory "..."
+
+    >>> # Teardown
+    >>> shutil.rmtree(str(path_temp_dir))
+
+    """
+    path_source = pathlib.Path(path_source_directory)
+    path_target = pathlib.Path(path_target_directory)
+    lib_path.log_and_raise_if_not_isdir(path_source)
+    lib_path.log_and_raise_if_target_directory_within_source_directory(path_source, path_target)
+    if mirror and lib_path.is_target_directory_within_source_directory(path_target, path_source):
+        s_error = f'source directory: "{path_source}" is within the target directory "{path_target}", it would be deleted by the mirror'
+        logger.error(s_error)
+        raise FileExistsError(s_error)
+    path_target.mkdir(parents=True, exist_ok=True)
+
+    import concurrent.futures
+    copier = _TreeCopier(preserve_metadata=preserve_metadata, skip_unchanged=skip_unchanged, progress_callback=progress_callback)
+    # the directories, in the order they were created - the metadata is copied at the end, deepest first
+    l_directories: List[Tuple[str, str]] = []
+    # bounded queue of files
+    semaphore = threading.BoundedSemaphore(max(max_workers, 1) * 4)
+    # exceptions of the worker threads, which are not OSError (like from the progress callback) - the first one is raised
+    l_worker_exceptions: List[BaseException] = []
+
+    def copy_file_task(path_source_file: str, path_target_file: str, stat_source: os.stat_result, stat_target: Optional[os.stat_result]) -> None:
+        try:
+            copier.copy_file(path_source_file, path_target_file, stat_source, stat_target)
+        finally:
+            semaphore.release()
+
+    def on_task_done(future: 'concurrent.futures.Future[None]') -> None:
+        exc = future.exception()
+        if exc is not None:
+            with copier.lock:
+                l_worker_exceptions.append(exc)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(max_workers, 1), thread_name_prefix='lib_path_copy') as executor:
+
+        def submit_file_copy(path_source_file: str, path_target_file: str, stat_source: os.stat_result, stat_target: Optional[os.stat_result]) -> None:
+            semaphore.acquire()
+            executor.submit(copy_file_task, path_source_file, path_target_file, stat_source, stat_target).add_done_callback(on_task_done)
+
+        l_stack = [(str(path_source), str(path_target))]
+        while l_stack and not l_worker_exceptions:
+            s_source_directory, s_target_directory = l_stack.pop()
+            l_sub_directories = copier.copy_directory(s_source_directory, s_target_directory, mirror, submit_file_copy)
+            if l_sub_directories is not None:
+                l_directories.append((s_source_directory, s_target_directory))
+                l_stack.extend(l_sub_directories)
+
+    if l_worker_exceptions:
+        raise l_worker_exceptions[0]
+
+    if preserve_metadata:
+        for s_source_directory, s_target_directory in reversed(l_directories):
+            try:
+                shutil.copystat(s_source_directory, s_target_directory)
+            except OSError as exc:
+                copier.add_error(exc)
+
+    if copier.errors:
+        logger.warning(f'{len(copier.errors)} errors copying "{path_source}" to "{path_target}", the first error: {copier.errors[0]}')
+    return copier.get_summary()
@@ -0,0 +1,204 @@
+# STDLIB
+import logging
+import os
+import pathlib
+import stat
+from typing import Iterator, List, NamedTuple, Optional, Tuple, Union
+
+logger = logging.getLogger()
+
+# in-process recursive chown / chmod (posix only).
+# one traversal, all operations relative to the directory file descriptor, entries already in the target state are skipped.
+
+
+class PermissionChangeSummary(NamedTuple):
+    n_entries: int              # entries visited, including the root directory
+    n_owner_changed: int        # entries with changed (or with dry_run: to be changed) owner / group
+    n_mode_changed: int         # entries with changed (or with dry_run: to be changed) mode
+    n_errors: int
+    errors: List[OSError]
+    dry_run: bool
+
+
+class _Counter(object):
+    def __init__(self) -> None:
+        self.n_entries = 0
+        self.n_owner_changed = 0
+        self.n_mode_changed = 0
+        self.errors: List[OSError] = []
+
+    def add(self, other: '_Counter') -> None:
+        self.n_entries += other.n_entries
+        self.n_owner_changed += other.n_owner_changed
+        self.n_mode_changed += other.n_mode_changed
+        self.errors.extend(other.errors)
+
+    def get_summary(self, dry_run: bool) -> PermissionChangeSummary:
+        return PermissionChangeSummary(n_entries=self.n_entries, n_owner_changed=self.n_owner_changed, n_mode_changed=self.n_mode_changed,
+                                       n_errors=len(self.errors), errors=self.errors, dry_run=dry_run)
+
+
+_DIRECTORY_OPEN_FLAGS = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0) | getattr(os, 'O_NOFOLLOW', 0)
+
+
+class _TargetState(NamedTuple):
+    uid: int
+    gid: int
+    mode: Optional[int]
+    dry_run: bool
+
+
+def _change_entry(name: str, stat_result: os.stat_result, dir_fd: Optional[int], target: _TargetState, counter: _Counter) -> None:
+    """ changes owner / mode of one entry, relative to dir_fd (or the path name itself if dir_fd is None) """
+    counter.n_entries += 1
+    try:
+        if (target.uid != -1 and stat_result.st_uid != target.uid) or (target.gid != -1 and stat_result.st_gid != target.gid):
+            counter.n_owner_changed += 1
+            if not target.dry_run:
+                os.chown(name, target.uid, target.gid, dir_fd=dir_fd, follow_symlinks=False)
+        # the mode of symlinks can not be changed on linux - like chmod -R, symlinks are skipped
+        if target.mode is not None and not stat.S_ISLNK(stat_result.st_mode) and stat.S_IMODE(stat_result.st_mode) != target.mode:
+            counter.n_mode_changed += 1
+            if not target.dry_run:
+                os.chmod(name, target.mode, dir_fd=dir_fd)
+    except OSError as exc:
+        counter.errors.append(exc)
+
+
+def _iter_sub_directory_names(dir_fd: int, target: _TargetState, counter: _Counter) -> Iterator[str]:
+    """ changes all entries of the directory, yields the names of the subdirectories (no symlinks) """
+    with os.scandir(dir_fd) as it_dir_entries:
+        for dir_entry in it_dir_entries:
+            try:
+                stat_result = dir_entry.stat(follow_symlinks=False)
+            except OSError as exc:
+                counter.errors.append(exc)
+                continue
+            _change_entry(dir_entry.name, stat_result, dir_fd, target, counter)
+            if stat.S_ISDIR(stat_result.st_mode):
+                yield dir_entry.name
+
+
+def _change_subtree(path_directory: str, target: _TargetState) -> _Counter:
+    """
+    changes all entries below path_directory (not the directory itself), depth first.
+    only the file descriptors of the current directory chain are open - the depth is not limited by the recursion limit.
+    """
+    counter = _Counter()
+    try:
+        root_fd = os.open(path_directory, _DIRECTORY_OPEN_FLAGS)
+    except OSError as exc:
+        counter.errors.append(exc)
+        return counter
+
+    l_stack: List[Tuple[int, Iterator[str]]] = [(root_fd, _iter_sub_directory_names(root_fd, target, counter))]
+    try:
+        while l_stack:
+            dir_fd, it_sub_directory_names = l_stack[-1]
+            try:
+                sub_directory_name = next(it_sub_directory_names)
+            except StopIteration:
+                os.close(dir_fd)
+                l_stack.pop()
+                continue
+            except OSError as exc:
+                # the directory can not be listed
+                counter.errors.append(exc)
+                os.close(dir_fd)
+                l_stack.pop()
+                continue
+            try:
+                sub_directory_fd = os.open(sub_directory_name, _DIRECTORY_OPEN_FLAGS, dir_fd=dir_fd)
+            except OSError as exc:
+                counter.errors.append(exc)
+                continue
+            l_stack.append((sub_directory_fd, _iter_sub_directory_names(sub_directory_fd, target, counter)))
+    finally:
+        for dir_fd, _ in l_stack:
+            os.close(dir_fd)
+    return counter
+
+
+def change_tree_owner_and_mode(path_root_directory: Union[str, pathlib.Path],
+                               uid: Optional[int] = None,
+                               gid: Optional[int] = None,
+                               mode: Optional[int] = None,
+                               max_workers: int = 1,
+                               dry_run: bool = False) -> PermissionChangeSummary:
+    """
+    recursive chown / chmod in one traversal, without spawning processes (posix only).
+    symlinks are not followed - the owner of the symlink itself is changed, the mode of symlinks is never changed.
+    entries which are already in the target state are skipped, so no privileges are needed if nothing has to be changed.
+    errors are collected in the summary and do not stop the traversal.
+
+    uid, gid:       None = the current user / group, -1 = leave unchanged
+    mode:           None = leave unchanged, otherwise the permission bits, like 0o777
+    max_workers:    process the subtrees of the root directory in parallel threads
+    dry_run:        only count what would be changed
+
+    >>> # Setup
+    >>> import tempfile
+    >>> path_temp_dir = pathlib.Path(tempfile.mkdtemp())
+    >>> (path_temp_dir / 'sub' / 'subsub').mkdir(parents=True)
+    >>> (path_temp_dir / 'sub' / 'file.txt').touch()
+    >>> os.chmod(str(path_temp_dir), 0o700)
+    >>> os.chmod(str(path_temp_dir / 'sub' / 'file.txt'), 0o600)
+
+    >>> # Test
+    >>> summary = change_tree_owner_and_mode(path_temp_dir, mode=0o750, dry_run=True)
+    >>> summary.n_entries, summary.n_owner_changed, summary.n_mode_changed, summary.n_errors
+    (4, 0, 4, 0)
+    >>> summary = change_tree_owner_and_mode(path_temp_dir, mode=0o750, max_workers=2)
+    >>> summary.n_entries, summary.n_mode_changed, summary.dry_run
+    (4, 4, False)
+    >>> oct(stat.S_IMODE(os.stat(str(path_temp_dir / 'sub' / 'file.txt')).st_mode))
+    '0o750'
+    >>> change_tree_owner_and_mode(path_temp_dir, mode=0o750).n_mode_changed
+    0
+
+    >>> # Teardown
+    >>> import shutil
+    >>> shutil.rmtree(str(path_temp_dir))
+
+    """
+    if os.name != 'posix':
+        raise NotImplementedError('change_tree_owner_and_mode is only available on posix systems')
+    target = _TargetState(uid=os.getuid() if uid is None else uid, gid=os.getgid() if gid is None else gid, mode=mode, dry_run=dry_run)
+    s_root_directory = str(path_root_directory)
+    counter = _Counter()
+
+    # the root directory itself first - it might need to become readable before we can list it
+    try:
+        stat_result = os.stat(s_root_directory, follow_symlinks=False)
+    except OSError as exc:
+        counter.errors.append(exc)
+        return counter.get_summary(dry_run=dry_run)
+    _change_entry(s_root_directory, stat_result, None, target, counter)
+    if not stat.S_ISDIR(stat_result.st_mode):
+        return counter.get_summary(dry_run=dry_run)
+
+    if max_workers <= 1:
+        counter.add(_change_subtree(s_root_directory, target))
+        return counter.get_summary(dry_run=dry_run)
+
+    # parallel: the entries of the root directory here, every subdirectory tree in its own task
+    try:
+        root_fd = os.open(s_root_directory, _DIRECTORY_OPEN_FLAGS)
+    except OSError as exc:
+        counter.errors.append(exc)
+        return counter.get_summary(dry_run=dry_run)
+    try:
+        l_sub_directory_names = list(_iter_sub_directory_names(root_fd, target, counter))
+    except OSError as exc:
+        counter.errors.append(exc)
+        l_sub_directory_names = []
+    finally:
+        os.close(root_fd)
+
+    import concurrent.futures
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        l_futures = [executor.submit(_change_subtree, os.path.join(s_root_directory, sub_directory_name), target)
+                     for sub_directory_name in l_sub_directory_names]
+        for future in l_futures:
+            counter.add(future.result())
+    return counter.get_summary(dry_run=dry_run)
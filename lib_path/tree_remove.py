@@ -0,0 +1,279 @@
+# STDLIB
+import logging
+import os
+import pathlib
+from typing import Iterable, List, NamedTuple, Optional, Tuple, Union
+
+# PROJ
+try:
+    from . import lib_path
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import lib_path                         # type: ignore  # pragma: no cover
+
+logger: logging.Logger = logging.getLogger()
+
+# in-process recursive remove and pruning of empty directories (posix only).
+# one bottom up pass, every unlink / rmdir relative to the file descriptor of its directory - no path strings are resolved again.
+# symlinks are never followed, the symlink itself is removed.
+
+
+class RemoveSummary(NamedTuple):
+    n_files_removed: int            # everything which is not a directory - with dry_run: to be removed
+    n_directories_removed: int      # with dry_run: to be removed
+    n_errors: int
+    errors: List[OSError]
+    dry_run: bool
+
+
+class _Counter(object):
+    def __init__(self) -> None:
+        self.n_files_removed = 0
+        self.n_directories_removed = 0
+        self.errors: List[OSError] = []
+
+    def add(self, other: '_Counter') -> None:
+        self.n_files_removed += other.n_files_removed
+        self.n_directories_removed += other.n_directories_removed
+        self.errors.extend(other.errors)
+
+    def get_summary(self, dry_run: bool) -> RemoveSummary:
+        return RemoveSummary(n_files_removed=self.n_files_removed, n_directories_removed=self.n_directories_removed,
+                             n_errors=len(self.errors), errors=self.errors, dry_run=dry_run)
+
+
+_DIRECTORY_OPEN_FLAGS = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0) | getattr(os, 'O_NOFOLLOW', 0)
+
+
+class _Operation(NamedTuple):
+    prune_only: bool                # only remove empty directories - files and symlinks are kept
+    dry_run: bool
+
+
+class _Frame(object):
+    """ an open directory on the stack of the traversal """
+    __slots__ = ('parent_fd', 'name', 'dir_fd', 'l_sub_directory_names', 'is_empty')
+
+    def __init__(self, parent_fd: Optional[int], name: str, dir_fd: int) -> None:
+        self.parent_fd = parent_fd
+        self.name = name
+        self.dir_fd = dir_fd
+        self.l_sub_directory_names: List[str] = []
+        # nothing is left in the directory after its subdirectories are processed - it can be removed
+        self.is_empty = True
+
+
+def _is_dir_entry_directory(dir_entry: 'os.DirEntry[str]') -> bool:
+    try:
+        return dir_entry.is_dir(follow_symlinks=False)
+    except OSError:
+        return False
+
+
+def _open_directory(parent_fd: Optional[int], name: str, operation: _Operation, counter: _Counter) -> Optional[_Frame]:
+    """ opens the directory relative to parent_fd (or the path name if parent_fd is None), removes the files unless prune_only """
+    try:
+        frame = _Frame(parent_fd, name, os.open(name, _DIRECTORY_OPEN_FLAGS, dir_fd=parent_fd))
+    except OSError as exc:
+        counter.errors.append(exc)
+        return None
+    try:
+        # the directory is listed completely before anything is removed from it
+        with os.scandir(frame.dir_fd) as it_dir_entries:
+            l_entries = [(dir_entry.name, _is_dir_entry_directory(dir_entry)) for dir_entry in it_dir_entries]
+    except OSError as exc:
+        counter.errors.append(exc)
+        frame.is_empty = False
+        return frame
+
+    for entry_name, is_dir in l_entries:
+        if is_dir:
+            frame.l_sub_directory_names.append(entry_name)
+        elif operation.prune_only:
+            frame.is_empty = False
+        else:
+            try:
+                if not operation.dry_run:
+                    os.unlink(entry_name, dir_fd=frame.dir_fd)
+                counter.n_files_removed += 1
+            except OSError as exc:
+                counter.errors.append(exc)
+                frame.is_empty = False
+    return frame
+
+
+def _remove_directory(frame: _Frame, operation: _Operation, counter: _Counter) -> bool:
+    if not frame.is_empty:
+        return False
+    try:
+        if not operation.dry_run:
+            os.rmdir(frame.name, dir_fd=frame.parent_fd)
+        counter.n_directories_removed += 1
+        return True
+    except OSError as exc:
+        counter.errors.append(exc)
+        return False
+
+
+def _remove_subtree(parent_fd: Optional[int], name: str, operation: _Operation, keep_directory: bool) -> Tuple[_Counter, bool]:
+    """
+    removes (or prunes) the directory name in parent_fd and everything below, bottom up.
+    returns the counter and whether the directory itself is removed.
+    only the file descriptors of the current directory chain are open - the depth is not limited by the recursion limit.
+    """
+    counter = _Counter()
+    top_frame = _open_directory(parent_fd, name, operation, counter)
+    if top_frame is None:
+        return counter, False
+
+    l_stack: List[_Frame] = [top_frame]
+    is_removed = False
+    try:
+        while l_stack:
+            frame = l_stack[-1]
+            if frame.l_sub_directory_names:
+                sub_frame = _open_directory(frame.dir_fd, frame.l_sub_directory_names.pop(), operation, counter)
+                if sub_frame is None:
+                    frame.is_empty = False
+                else:
+                    l_stack.append(sub_frame)
+                continue
+            # all subdirectories are processed - the directory itself, after its file descriptor is closed
+            l_stack.pop()
+            os.close(frame.dir_fd)
+            if frame is top_frame and keep_directory:
+                break
+            is_removed = _remove_directory(frame, operation, counter)
+            if not is_removed and l_stack:
+                l_stack[-1].is_empty = False
+    finally:
+        for frame in l_stack:
+            os.close(frame.dir_fd)
+    return counter, is_removed
+
+
+def _log_and_raise_if_protected(path_root_directory: pathlib.Path, protected_directories: Optional[Iterable[Union[str, pathlib.Path]]]) -> None:
+    if protected_directories is None:
+        protected_directories = [pathlib.Path.cwd(), pathlib.Path.home()]
+    for path_protected_directory in protected_directories:
+        if lib_path.is_target_directory_within_source_directory(path_root_directory, pathlib.Path(path_protected_directory)):
+            s_error = f'refusing to remove "{path_root_directory}", it contains the protected directory "{path_protected_directory}"'
+            logger.error(s_error)
+            raise PermissionError(s_error)
+
+
+def _remove_tree(path_root_directory: Union[str, pathlib.Path], operation: _Operation, keep_root: bool, max_workers: int,
+                 protected_directories: Optional[Iterable[Union[str, pathlib.Path]]]) -> RemoveSummary:
+    if os.name != 'posix':
+        raise NotImplementedError('remove_tree and prune_empty_directories are only available on posix systems')
+    path_root_directory = pathlib.Path(path_root_directory)
+    lib_path.log_and_raise_if_not_isdir(path_root_directory)
+    _log_and_raise_if_protected(path_root_directory, protected_directories)
+    s_root_directory = str(path_root_directory)
+
+    if max_workers <= 1:
+        counter, _ = _remove_subtree(None, s_root_directory, operation, keep_directory=keep_root)
+        return counter.get_summary(dry_run=operation.dry_run)
+
+    # parallel: the entries of the root directory here, every subdirectory tree in its own task, relative to the root file descriptor
+    counter = _Counter()
+    root_frame = _open_directory(None, s_root_directory, operation, counter)
+    if root_frame is None:
+        return counter.get_summary(dry_run=operation.dry_run)
+    try:
+        import concurrent.futures
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            l_futures = [executor.submit(_remove_subtree, root_frame.dir_fd, sub_directory_name, operation, False)
+                         for sub_directory_name in root_frame.l_sub_directory_names]
+            for future in l_futures:
+                sub_counter, is_removed = future.result()
+                counter.add(sub_counter)
+                root_frame.is_empty = root_frame.is_empty and is_removed
+    finally:
+        os.close(root_frame.dir_fd)
+    if not keep_root:
+        _remove_directory(root_frame, operation, counter)
+    return counter.get_summary(dry_run=operation.dry_run)
+
+
+def remove_tree(path_root_directory: Union[str, pathlib.Path],
+                keep_root: bool = False,
+                max_workers: int = 1,
+                dry_run: bool = False,
+                protected_directories: Optional[Iterable[Union[str, pathlib.Path]]] = None) -> RemoveSummary:
+    """
+    removes a directory tree, like shutil.rmtree, in one bottom up pass with unlink / rmdir relative to the directory file descriptors.
+    errors are collected in the summary and do not stop the removal - what can be removed, is removed.
+
+    keep_root:              remove only the content of path_root_directory
+    max_workers:            remove the subtrees of the root directory in parallel threads
+    dry_run:                only count what would be removed
+    protected_directories:  PermissionError, if one of these is path_root_directory or within it - default: the current directory and home
+
+    >>> # Setup
+    >>> import tempfile
+    >>> path_temp_dir = pathlib.Path(tempfile.mkdtemp())
+    >>> path_root = path_temp_dir / 'root'
+    >>> (path_root / 'sub' / 'subsub').mkdir(parents=True)
+    >>> (path_root / 'sub' / 'file.txt').touch()
+    >>> (path_temp_dir / 'outside').mkdir()
+    >>> (path_temp_dir / 'outside' / 'keep.txt').touch()
+    >>> (path_root / 'sub' / 'link').symlink_to(path_temp_dir / 'outside')
+
+    >>> # Test
+    >>> remove_tree(path_root, dry_run=True)
+    RemoveSummary(n_files_removed=2, n_directories_removed=3, n_errors=0, errors=[], dry_run=True)
+    >>> remove_tree(path_root, keep_root=True, max_workers=2)
+    RemoveSummary(n_files_removed=2, n_directories_removed=2, n_errors=0, errors=[], dry_run=False)
+    >>> sorted(path_temp_dir.rglob('*')) == [path_temp_dir / 'outside', path_temp_dir / 'outside' / 'keep.txt', path_root]
+    True
+    >>> remove_tree(path_root).n_directories_removed, path_root.exists()
+    (1, False)
+
+    >>> # Test protected
+    >>> remove_tree(path_temp_dir, protected_directories=[path_temp_dir / 'outside'])
+    Traceback (most recent call last):
+    ...
+    PermissionError: refusing to remove "...", it contains the protected directory ".../outside"
+
+    >>> # Teardown
+    >>> remove_tree(path_temp_dir).n_errors
+    0
+
+    """
+    return _remove_tree(path_root_directory, _Operation(prune_only=False, dry_run=dry_run), keep_root=keep_root, max_workers=max_workers,
+                        protected_directories=protected_directories)
+
+
+def prune_empty_directories(path_root_directory: Union[str, pathlib.Path],
+                            keep_root: bool = True,
+                            max_workers: int = 1,
+                            dry_run: bool = False,
+                            protected_directories: Optional[Iterable[Union[str, pathlib.Path]]] = None) -> RemoveSummary:
+    """
+    removes the empty directories below path_root_directory, bottom up in one pass - chains of empty directories are removed completely.
+    files and symlinks (also symlinks to empty directories) are never removed, directories containing them are kept.
+    the parameters are the same as for remove_tree, but the root directory is kept by default.
+
+    >>> # Setup
+    >>> import tempfile
+    >>> path_root = pathlib.Path(tempfile.mkdtemp())
+    >>> (path_root / 'empty' / 'chain' / 'of' / 'dirs').mkdir(parents=True)
+    >>> (path_root / 'full' / 'empty').mkdir(parents=True)
+    >>> (path_root / 'full' / 'file.txt').touch()
+
+    >>> # Test
+    >>> prune_empty_directories(path_root, dry_run=True)
+    RemoveSummary(n_files_removed=0, n_directories_removed=5, n_errors=0, errors=[], dry_run=True)
+    >>> prune_empty_directories(path_root, max_workers=2).n_directories_removed
+    5
+    >>> sorted(path.name for path in path_root.rglob('*'))
+    ['file.txt', 'full']
+
+    >>> # Teardown
+    >>> remove_tree(path_root).n_errors
+    0
+
+    """
+    return _remove_tree(path_root_directory, _Operation(prune_only=True, dry_run=dry_run), keep_root=keep_root, max_workers=max_workers,
+                        protected_directories=protected_directories)
@@ -0,0 +1,229 @@
+# STDLIB
+import collections
+import concurrent.futures
+import os
+import pathlib
+from typing import Any, Deque, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+
+# PROJ
+try:
+    from . import dir_scan
+    from . import lib_path
+    from . import path_filter as path_filter_module
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import dir_scan                         # type: ignore  # pragma: no cover
+    import lib_path                         # type: ignore  # pragma: no cover
+    import path_filter as path_filter_module  # type: ignore  # pragma: no cover
+
+# recursive directory walker, which runs the os.scandir calls concurrently on a bounded thread pool.
+# on network mounts every scandir is mostly latency, so many of them in flight at once are much faster.
+
+WALK_ORDERS = ('bfs', 'dfs')
+DEFAULT_MAX_WORKERS = 8
+
+
+class WalkResult(NamedTuple):
+    path: str
+    depth: int
+    entries: List[dir_scan.ScanEntry]
+    error: Optional[OSError] = None
+
+
+_ScanResult = Tuple[List[dir_scan.ScanEntry], Optional[Tuple[int, int]], Optional[OSError]]
+
+
+def _scan_directory(path_directory: str, follow_symlinks: bool, with_stat: bool, sort_entries: bool,
+                    path_filter: Optional['path_filter_module.PathFilter'], len_root_prefix: int) -> _ScanResult:
+    """ runs in the worker threads - never raises, the OSError is returned """
+    try:
+        dir_key = None
+        if follow_symlinks:
+            # needed to detect symlink loops
+            stat_result = os.stat(path_directory)
+            dir_key = (stat_result.st_dev, stat_result.st_ino)
+        l_entries = list(dir_scan.iter_directory_entries(path_directory, with_stat=with_stat, follow_symlinks=follow_symlinks,
+                                                         sort_by='name' if sort_entries else None))
+        if path_filter is not None:
+            # the excluded directories are dropped here, so they are never descended into
+            l_entries = [entry for entry in l_entries
+                         if path_filter.is_entry_selected(entry.path[len_root_prefix:].replace(os.sep, '/'), entry.name, entry.is_dir)]
+        return l_entries, dir_key, None
+    except OSError as exc:
+        return [], None, exc
+
+
+def walk_tree(path_root_directory: Union[str, pathlib.Path],
+              max_depth: Optional[int] = None,
+              follow_symlinks: bool = False,
+              order: str = 'bfs',
+              deterministic: bool = False,
+              with_stat: bool = False,
+              max_workers: int = DEFAULT_MAX_WORKERS,
+              max_pending: Optional[int] = None,
+              path_filter: Optional['path_filter_module.PathFilter'] = None) -> Iterator[WalkResult]:
+    """
+    walks a directory tree recursively and yields one WalkResult per directory, as soon as it is read.
+    the scandir calls run concurrently in a thread pool of max_workers threads.
+
+    max_depth:          None = unlimited, 0 = only the root directory, 1 = root and its subdirectories, ...
+    follow_symlinks:    descend into symlinked directories - symlink loops are detected and skipped
+    order:              'bfs' (breadth first) or 'dfs' (depth first) - which directories are read next
+    deterministic:      yield the directories in a reproducible order (entries sorted by name, bfs level order
+                        or dfs pre order), independent of the timing of the threads.
+                        otherwise the directories are yielded in the order they are read
+    with_stat:          include the stat result in the entries
+    max_pending:        backpressure - maximum number of directories which are read ahead of the consumer,
+                        default max_workers * 2
+    path_filter:        a PathFilter - the excluded entries are left out and excluded directories are not descended into,
+                        the patterns are matched against the path relative to path_root_directory
+
+    directories which can not be read are yielded with the OSError in WalkResult.error
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent / 'tests'
+    >>> path_test_a = path_test_dir / 'test_a'
+
+    >>> # Test deterministic
+    >>> [(pathlib.Path(result.path).name, result.depth) for result in walk_tree(path_test_a, deterministic=True)]
+    [('test_a', 0), ('.test_a_a', 1), ('.test_a_b', 1), ('test_a_a', 1), ('test_a_b', 1)]
+    >>> [entry.name for entry in next(walk_tree(path_test_a, deterministic=True, order='dfs')).entries if entry.is_file]
+    ['.file_test_a_1.txt', '.file_test_a_2.txt', 'file_test_a_1.txt', 'file_test_a_2.txt']
+
+    >>> # Test max_depth
+    >>> [result.depth for result in walk_tree(path_test_a, max_depth=0)]
+    [0]
+
+    >>> # Test unordered
+    >>> sorted(pathlib.Path(result.path).name for result in walk_tree(path_test_dir / 'dir_with_subdirs', max_workers=2))
+    ['dir_with_subdirs', 'subdir']
+
+    >>> # Test path_filter
+    >>> path_filter = path_filter_module.PathFilter(exclude=['.*', 'test_a_b/'], include=['*_1.txt'])
+    >>> [(pathlib.Path(result.path).name, [entry.name for entry in result.entries])
+    ...     for result in walk_tree(path_test_a, deterministic=True, path_filter=path_filter)]
+    [('test_a', ['file_test_a_1.txt', 'test_a_a']), ('test_a_a', ['file_test_a_a_1.txt'])]
+
+    >>> # Test wrong order
+    >>> next(walk_tree(path_test_a, order='xyz'))
+    Traceback (most recent call last):
+    ...
+    ValueError: order must be one of ('bfs', 'dfs'), got "xyz"
+
+    """
+    if order not in WALK_ORDERS:
+        raise ValueError(f'order must be one of {WALK_ORDERS}, got "{order}"')
+    if max_workers < 1:
+        raise ValueError(f'max_workers must be > 0, got {max_workers}')
+    if max_pending is None:
+        max_pending = max_workers * 2
+    max_pending = max(max_pending, 1)
+    lib_path.log_and_raise_if_not_isdir(pathlib.Path(path_root_directory))
+
+    walker = _TreeWalker(max_depth=max_depth, follow_symlinks=follow_symlinks, order=order, deterministic=deterministic,
+                         with_stat=with_stat, max_workers=max_workers, max_pending=max_pending,
+                         path_filter=path_filter, len_root_prefix=len(os.path.join(str(path_root_directory), '')))
+    try:
+        if deterministic:
+            yield from walker.walk_deterministic(str(path_root_directory))
+        else:
+            yield from walker.walk_as_completed(str(path_root_directory))
+    finally:
+        walker.shutdown()
+
+
+class _TreeWalker(object):
+    def __init__(self, max_depth: Optional[int], follow_symlinks: bool, order: str, deterministic: bool, with_stat: bool,
+                 max_workers: int, max_pending: int, path_filter: Optional['path_filter_module.PathFilter'], len_root_prefix: int) -> None:
+        self.max_depth = max_depth
+        self.follow_symlinks = follow_symlinks
+        self.is_depth_first = order == 'dfs'
+        self.deterministic = deterministic
+        self.with_stat = with_stat
+        self.max_pending = max_pending
+        self.path_filter = path_filter
+        self.len_root_prefix = len_root_prefix
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self.visited_dir_keys: Set[Tuple[int, int]] = set()
+        self.set_pending: Set['concurrent.futures.Future[_ScanResult]'] = set()
+
+    def submit(self, path_directory: str) -> 'concurrent.futures.Future[_ScanResult]':
+        future = self.executor.submit(_scan_directory, path_directory, self.follow_symlinks, self.with_stat, self.deterministic,
+                                      self.path_filter, self.len_root_prefix)
+        self.set_pending.add(future)
+        return future
+
+    def get_result(self, future: 'concurrent.futures.Future[_ScanResult]') -> _ScanResult:
+        self.set_pending.discard(future)
+        return future.result()
+
+    def shutdown(self) -> None:
+        # the consumer might stop early - dont read directories nobody asks for anymore
+        for future in self.set_pending:
+            future.cancel()
+        self.executor.shutdown(wait=True)
+
+    def is_new_directory(self, dir_key: Optional[Tuple[int, int]]) -> bool:
+        if dir_key is None:
+            return True
+        if dir_key in self.visited_dir_keys:
+            return False
+        self.visited_dir_keys.add(dir_key)
+        return True
+
+    def get_sub_directories(self, l_entries: List[dir_scan.ScanEntry], depth: int) -> List[str]:
+        if self.max_depth is not None and depth >= self.max_depth:
+            return []
+        return [entry.path for entry in l_entries if entry.is_dir]
+
+    def walk_as_completed(self, path_root_directory: str) -> Iterator[WalkResult]:
+        frontier: Deque[Tuple[str, int]] = collections.deque([(path_root_directory, 0)])
+        d_pending: Dict['concurrent.futures.Future[_ScanResult]', Tuple[str, int]] = dict()
+
+        while frontier or d_pending:
+            while frontier and len(d_pending) < self.max_pending:
+                path_directory, depth = frontier.pop() if self.is_depth_first else frontier.popleft()
+                d_pending[self.submit(path_directory)] = (path_directory, depth)
+            set_done, _ = concurrent.futures.wait(d_pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in set_done:
+                path_directory, depth = d_pending.pop(future)
+                l_entries, dir_key, error = self.get_result(future)
+                if not self.is_new_directory(dir_key):
+                    continue
+                frontier.extend((path_sub_directory, depth + 1) for path_sub_directory in self.get_sub_directories(l_entries, depth))
+                yield WalkResult(path=path_directory, depth=depth, entries=l_entries, error=error)
+
+    def walk_deterministic(self, path_root_directory: str) -> Iterator[WalkResult]:
+        # items: [path, depth, future or None] - the next item is popped from the left (bfs) or from the right (dfs)
+        # the items which will be popped next are read ahead (prefetched), up to max_pending
+        frontier: Deque[List[Any]] = collections.deque([[path_root_directory, 0, None]])
+        n_in_flight = 0
+
+        while frontier:
+            item = frontier.pop() if self.is_depth_first else frontier.popleft()
+            path_directory, depth, future = item
+            if future is None:
+                future = self.submit(path_directory)
+                n_in_flight += 1
+            l_entries, dir_key, error = self.get_result(future)
+            n_in_flight -= 1
+            if not self.is_new_directory(dir_key):
+                continue
+
+            l_path_sub_directories = self.get_sub_directories(l_entries, depth)
+            if self.is_depth_first:
+                # pushed in reverse, so the smallest name is popped first
+                frontier.extend([path_sub_directory, depth + 1, None] for path_sub_directory in reversed(l_path_sub_directories))
+            else:
+                frontier.extend([path_sub_directory, depth + 1, None] for path_sub_directory in l_path_sub_directories)
+
+            # prefetch the directories which are next in line, before the consumer gets control
+            it_next_items = reversed(frontier) if self.is_depth_first else iter(frontier)
+            for next_item in it_next_items:
+                if n_in_flight >= self.max_pending:
+                    break
+                if next_item[2] is None:
+                    next_item[2] = self.submit(next_item[0])
+                    n_in_flight += 1
+
+            yield WalkResult(path=path_directory, depth=depth, entries=l_entries, error=error)
@@ -26,3 +26,61 @@ def test_cli_commands() -> None:
     assert call_cli_command('-h')
     assert call_cli_command('info')
     assert call_cli_command('--traceback info')
+
+
+def test_cli_stats(tmp_path: pathlib.Path) -> None:
+    from lib_path import instrumentation
+    from lib_path import lib_path as lib_path_module
+
+    path_stats_file = tmp_path / 'stats.json'
+    with instrumentation.measure_instrumentation() as stats:
+        lib_path_module.has_subdirs(path_cli_command.parent)
+    instrumentation.save_instrumentation_stats(path_stats_file, stats.as_dict())
+
+    assert call_cli_command(f'stats {path_stats_file}')
+    assert call_cli_command(f'stats --json {path_stats_file}')
+    assert not call_cli_command(f'stats {tmp_path / "does_not_exist.json"}')
+
+
+def call_cli_stream_command(commandline_args: str, input_data: bytes) -> subprocess.CompletedProcess:  # type: ignore
+    command = ' '.join([sys.executable, str(path_cli_command), commandline_args])
+    return subprocess.run(command, shell=True, input=input_data, capture_output=True)
+
+
+def test_cli_stream_commands(tmp_path: pathlib.Path) -> None:
+    path_dir = tmp_path / 'dir'
+    (path_dir / 'subdir').mkdir(parents=True)
+    path_file = tmp_path / 'file with\nnewline.txt'
+    path_file.touch()
+
+    assert call_cli_stream_command('normalize', b'c:\\test\\\n //main/test/ \n').stdout == b'c:/test\n//main/test\n'
+    assert call_cli_stream_command('join test test2', b'//main\n').stdout == b'//main/test/test2\n'
+    assert not call_cli_stream_command('join', b'//main\n').returncode == 0
+
+    input_data = b'\0'.join(str(path).encode() for path in (path_dir, path_file, tmp_path / 'does_not_exist')) + b'\0'
+    assert call_cli_stream_command('check -0 --isdir', input_data).stdout == str(path_dir).encode() + b'\0'
+    assert call_cli_stream_command('check -0 --isfile --workers 2', input_data).stdout == str(path_file).encode() + b'\0'
+    assert call_cli_stream_command('check -0 --invert', input_data).stdout == str(tmp_path / 'does_not_exist').encode() + b'\0'
+    assert call_cli_stream_command('writable -0', input_data).stdout == str(path_dir).encode() + b'\0'
+
+    result = call_cli_stream_command('subdirs -0 -w 2', input_data)
+    assert result.stdout == str(path_dir / 'subdir').encode() + b'\0'
+    # the file and the not existing path are reported on stderr
+    assert result.returncode == 1
+    assert b'Not a directory' in result.stderr
+    assert b'No such file or directory' in result.stderr
+
+
+def test_cli_stream_command_closed_pipe(tmp_path: pathlib.Path) -> None:
+    # like "lib_path normalize < input.txt | head -n 1" - more output than fits into the pipe, the reader stops after the first line
+    path_input_file = tmp_path / 'input.txt'
+    path_input_file.write_bytes(b'/test/\n' * 200000)
+    with path_input_file.open('rb') as input_file:
+        process = subprocess.Popen([sys.executable, str(path_cli_command), 'normalize'], stdin=input_file, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        assert process.stdout is not None
+        assert process.stdout.readline() == b'/test\n'
+        process.stdout.close()
+        _, stderr = process.communicate()
+    # a closed pipe is no error, pipelines with "set -o pipefail" must not fail
+    assert process.returncode == 0
+    assert stderr == b''
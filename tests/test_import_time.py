@@ -0,0 +1,56 @@
+# STDLIB
+import importlib
+import inspect
+import subprocess
+import sys
+from typing import List
+
+# the import time budget for "import lib_path" in microseconds, measured with "python -X importtime".
+# about 50 ms on a developer machine, without the lazy imports it was about 400 ms - the budget leaves room for slow ci runners
+IMPORT_TIME_BUDGET_US = 250_000
+
+# these must not be loaded by "import lib_path" - only by the functions which need them
+HEAVY_MODULE_NAMES = ['lib_platform', 'ctypes', 'subprocess', 'getpass', 'binascii', 'importlib.util', 'concurrent.futures', 'asyncio',
+                      'click', 'cli_exit_tools']
+
+
+def get_loaded_modules(import_statement: str, module_names: List[str]) -> List[str]:
+    """ the modules of module_names which are loaded after import_statement, in a new interpreter """
+    code = f'import sys\n{import_statement}\nprint(",".join(name for name in {module_names!r} if name in sys.modules))'
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout.strip()
+    return output.split(',') if output else []
+
+
+def test_import_does_not_load_heavy_modules() -> None:
+    assert get_loaded_modules('import lib_path', HEAVY_MODULE_NAMES) == []
+
+
+def test_cli_import_does_not_load_heavy_modules() -> None:
+    # "lib_path --version" and "lib_path info" only need click
+    l_heavy_module_names = [module_name for module_name in HEAVY_MODULE_NAMES if module_name != 'click']
+    assert get_loaded_modules('import lib_path.lib_path_cli', l_heavy_module_names) == []
+
+
+def test_import_time_budget() -> None:
+    # best of three, the first run might fill the file system caches
+    l_import_times_us: List[int] = []
+    for _ in range(3):
+        stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import lib_path'], check=True, capture_output=True, text=True).stderr
+        # "import time: self [us] | cumulative | imported package"
+        l_import_times_us.extend(int(line.split('|')[1]) for line in stderr.splitlines() if line.split('|')[-1].strip() == 'lib_path')
+    assert min(l_import_times_us) < IMPORT_TIME_BUDGET_US
+
+
+def test_lazy_names_match_submodules() -> None:
+    import lib_path
+    d_lazy_names = lib_path._D_LAZY_NAMES
+    for module_name in sorted(set(d_lazy_names.values())):
+        module = importlib.import_module(f'lib_path.{module_name}')
+        l_public_names = [name for name, obj in vars(module).items()
+                          if not name.startswith('_') and not inspect.ismodule(obj)
+                          and getattr(obj, '__module__', module.__name__) in (module.__name__, 'builtins')]
+        for name in l_public_names:
+            assert name in d_lazy_names, f'{module_name}.{name} is missing in lib_path._D_LAZY_NAMES'
+        for name in [name for name, lazy_module_name in d_lazy_names.items() if lazy_module_name == module_name]:
+            # DEFAULT_MAX_WORKERS exists in tree_walk and dir_writable, the package exports the one of dir_writable (like the former star imports)
+            assert getattr(lib_path, name) is getattr(module, name)